@@ -23,47 +23,235 @@ sys.path.append(str(project_root))
 sys.path.append(str(current_dir))
 sys.path.append(str(scripts_dir))
 
-# Import the augment_dataset function
-try:
-    from scripts.agents import augment_dataset
-except ImportError as e:
-    print(f"Import error: {e}")
-    sys.exit(1)
-
 def main():
     """Run the data augmentation process"""
     
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Augment fine dining dataset with agent analysis")
     parser.add_argument("--workers", type=int, default=8, help="Number of worker threads (default: 8)")
+    parser.add_argument("--processes", type=int, default=1, help="Split the dataset across this many worker processes, each with --workers threads (default: 1)")
     parser.add_argument("--input", type=str, default=None, help="Input file path (default: augmented-fine-dining-dataset.json)")
     parser.add_argument("--output", type=str, default=None, help="Output file path (default: agent-augmented-fine-dining-dataset.json)")
+    parser.add_argument("--restaurant", type=str, nargs=2, action="append", metavar=("INPUT", "OUTPUT"), default=None, help="Brief this restaurant's dataset in a shared multi-restaurant run; repeat for each restaurant")
+    parser.add_argument("--manifest", type=str, default=None, help="JSON manifest of restaurants (input, output, weight, priority) to brief in one shared run")
+    parser.add_argument("--policy", type=str, choices=["fair", "priority"], default=None, help="How restaurants share API calls in a multi-restaurant run (default: the manifest's, or fair)")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Directory for cached stage outputs (default: .cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Rerun every stage instead of replaying cached outputs")
+    parser.add_argument("--no-compress", action="store_true", help="Prompt with the full reviews and email threads instead of their compressed view (default: PROMPT_COMPRESSION)")
+    parser.add_argument("--compact-schemas", action="store_true", help="Ask agents for the compact output schemas, with codes instead of prose (default: COMPACT_SCHEMAS)")
+    parser.add_argument("--validate", action="store_true", help="Validate the input dataset and exit without running any agents")
+    parser.add_argument("--plan", action="store_true", help="Estimate calls, tokens, cost and wall time without calling the API")
+    parser.add_argument("--watch", action="store_true", help="Keep running and brief new or changed reservations as the input changes")
+    parser.add_argument("--drop-dir", type=str, default=None, help="Directory of JSONL diner updates to merge into the input, for --watch")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between checks for changes, for --watch (default: 2)")
+    parser.add_argument("--serve", action="store_true", help="Run the local HTTP briefing service for on-demand briefings")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address for --serve (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve (default: 8765)")
+    parser.add_argument("--max-pending", type=int, default=16, help="Briefings running or queued before --serve sheds load (default: 16)")
+    parser.add_argument("--call-timeout", type=float, default=None, help="Seconds before an API call is abandoned (default: OPENAI_CALL_TIMEOUT or 60)")
+    parser.add_argument("--budget", type=float, default=None, help="Seconds each reservation may take before its briefing is completed with the results available")
+    parser.add_argument("--deadline", type=str, default=None, help="Finish the run by this time, as seconds from now or HH:MM; completed work is saved and the rest briefed without new API calls")
+    parser.add_argument("--trace", type=str, default=None, help="Write a Chrome trace / Perfetto JSON of the run to this path")
+    parser.add_argument("--otlp-endpoint", type=str, default=None, help="Also export the trace to an OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces")
+    parser.add_argument("--profile", type=str, nargs="?", const="profile", default=None, help="Sample CPU across all threads and write a summary and flamegraph stacks to this directory (default: profile)")
+    parser.add_argument("--profile-sampling", action="store_true", help="Profile with the stack sampler even if yappi is installed")
+    parser.add_argument("--token-attribution", type=str, nargs="?", const="token-attribution.json", default=None, help="Attribute prompt tokens by agent, prompt section and diner, and write the totals to this path (default: token-attribution.json)")
+    parser.add_argument("--endpoints", type=str, default=None, help="JSON file of OpenAI-compatible endpoints to balance API calls across (default: OPENAI_ENDPOINTS)")
+    parser.add_argument("--mock", action="store_true", help="Answer API calls with canned responses instead of calling OpenAI, e.g. to profile offline")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="Mean seconds per mocked API call, for --mock (default: 0)")
+    parser.add_argument("--mock-token-latency", type=float, default=0.0, help="Seconds added per completion token of a mocked call, for --mock (default: 0)")
+    parser.add_argument("--rpm-limit", type=int, default=None, help="Requests per minute per API key, enforced across all workers and used by --plan (default: OPENAI_RPM_LIMIT)")
+    parser.add_argument("--tpm-limit", type=int, default=None, help="Tokens per minute per API key, enforced across all workers and used by --plan (default: OPENAI_TPM_LIMIT)")
     args = parser.parse_args()
-    
-    # Check for OpenAI API key
-    if not os.environ.get("OPENAI_API_KEY"):
-        print("Error: OPENAI_API_KEY environment variable not set")
-        print("Please set your OpenAI API key with:")
-        print("export OPENAI_API_KEY=your_api_key_here")
-        sys.exit(1)
+    if (args.restaurant or args.manifest) and (args.input or args.output):
+        parser.error("--restaurant and --manifest set each restaurant's input and output; drop --input and --output")
     
     # Define input and output paths
     input_path = args.input if args.input else current_dir / "augmented-fine-dining-dataset.json"
     output_path = args.output if args.output else current_dir / "agent-augmented-fine-dining-dataset.json"
     
+    if args.validate:
+        from load_data import DinersList
+        try:
+            diners_list = DinersList.load_from_json(str(input_path))
+        except Exception as e:
+            print(f"Invalid dataset: {e}")
+            sys.exit(1)
+        num_reservations = sum(len(diner.reservations or []) for diner in diners_list.diners)
+        print(f"Valid dataset: {len(diners_list.diners)} diners, {num_reservations} reservations")
+        return
+    
+    if args.no_compress:
+        from scripts.agents.compression import set_compression
+        set_compression(False)
+    
+    if args.compact_schemas:
+        from scripts.agents.routing import set_compact_schemas
+        set_compact_schemas(True)
+    
+    if args.plan:
+        from scripts.agents import plan_dataset, print_plan
+        print_plan(plan_dataset(
+            str(input_path),
+            max_workers=args.workers,
+            cache_dir=args.cache_dir,
+            use_cache=not args.no_cache,
+            rpm_limit=args.rpm_limit,
+            tpm_limit=args.tpm_limit
+        ))
+        return
+    
+    # Keys are only needed for stages that are not replayed from the cache
+    endpoints_path = args.endpoints or os.environ.get("OPENAI_ENDPOINTS")
+    if not args.mock and not endpoints_path and not os.environ.get("OPENAI_API_KEY"):
+        print("Warning: OPENAI_API_KEY environment variable not set")
+        print("Only cached stages can be replayed; set your OpenAI API key with:")
+        print("export OPENAI_API_KEY=your_api_key_here")
+    
+    # Import the agents only once they are needed
+    try:
+        from scripts.agents import augment_dataset, augment_restaurants, watch_dataset, serve
+    except ImportError as e:
+        print(f"Import error: {e}")
+        sys.exit(1)
+    
+    if args.call_timeout:
+        from scripts.agents.sla import set_call_timeout
+        set_call_timeout(args.call_timeout)
+    
+    if args.mock:
+        from scripts.agents.base import use_client
+        from scripts.agents.mock_backend import MockClient
+        use_client(MockClient(latency=args.mock_latency, token_latency=args.mock_token_latency))
+        print(f"Using the mock backend ({args.mock_latency:g}s mean latency)")
+    elif endpoints_path:
+        from scripts.agents.base import load_api_keys, use_backends
+        from scripts.agents.backends import load_endpoints
+        pool = load_endpoints(endpoints_path, load_api_keys)
+        for name, healthy in pool.check_health().items():
+            print(f"Endpoint {name}: {'up' if healthy else 'down, out of rotation'}")
+        use_backends(pool)
+    
+    if args.serve:
+        serve(
+            str(input_path),
+            host=args.host,
+            port=args.port,
+            max_workers=args.workers,
+            max_pending=args.max_pending,
+            cache_dir=args.cache_dir,
+            use_cache=not args.no_cache,
+            budget=args.budget
+        )
+        return
+    
+    if args.watch:
+        watch_dataset(
+            str(input_path),
+            str(output_path),
+            drop_dir=args.drop_dir,
+            interval=args.interval,
+            max_workers=args.workers,
+            cache_dir=args.cache_dir,
+            use_cache=not args.no_cache,
+            budget=args.budget
+        )
+        return
+    
     # Run augmentation
     print(f"Starting augmentation process with {args.workers} workers...")
-    print(f"Input: {input_path}")
-    print(f"Output: {output_path}")
+    if not (args.manifest or args.restaurant):
+        print(f"Input: {input_path}")
+        print(f"Output: {output_path}")
+    
+    # Parse the deadline before loading anything, so it counts from the start of the run
+    deadline = None
+    if args.deadline:
+        from scripts.agents.sla import parse_deadline
+        deadline = parse_deadline(args.deadline)
+    
+    tracing = args.trace or args.otlp_endpoint
+    if tracing:
+        from scripts.agents.tracing import start_tracing, stop_tracing
+        start_tracing()
+    
+    if args.profile:
+        from scripts.agents.profiling import start_profiling, stop_profiling
+        start_profiling(sampling=args.profile_sampling)
+    
+    if args.token_attribution:
+        from scripts.agents.attribution import start_attribution, stop_attribution
+        start_attribution()
+    
+    # Several restaurants share one engine: keys, rate limits, stage cache and call slots
+    restaurants = []
+    policy = args.policy
+    if args.manifest:
+        from scripts.agents.restaurants import load_manifest
+        try:
+            restaurants, manifest_policy = load_manifest(args.manifest)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Invalid manifest: {e}")
+            sys.exit(1)
+        policy = policy or manifest_policy
+    if args.restaurant:
+        from scripts.agents.restaurants import restaurant_entry
+        restaurants += [restaurant_entry(restaurant_input, restaurant_output) for restaurant_input, restaurant_output in args.restaurant]
     
     try:
-        augment_dataset(str(input_path), str(output_path), max_workers=args.workers)
+        if args.manifest or args.restaurant:
+            if args.processes > 1:
+                print("Multi-restaurant runs use one process; ignoring --processes")
+            augment_restaurants(
+                restaurants,
+                max_workers=args.workers,
+                cache_dir=args.cache_dir,
+                use_cache=not args.no_cache,
+                budget=args.budget,
+                deadline=deadline,
+                policy=policy or "fair",
+                rpm_limit=args.rpm_limit,
+                tpm_limit=args.tpm_limit
+            )
+        else:
+            augment_dataset(
+                str(input_path),
+                str(output_path),
+                max_workers=args.workers,
+                cache_dir=args.cache_dir,
+                use_cache=not args.no_cache,
+                budget=args.budget,
+                deadline=deadline,
+                processes=args.processes,
+                rpm_limit=args.rpm_limit,
+                tpm_limit=args.tpm_limit
+            )
         print("Augmentation completed successfully!")
     except Exception as e:
         print(f"Error during augmentation: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if args.profile:
+            summary = stop_profiling().write(args.profile)
+            print(f"\n===== CPU Profile =====\n{summary}")
+            print(f"Profile written to {args.profile}")
+        if args.token_attribution:
+            summary = stop_attribution().write(args.token_attribution)
+            print(f"\n===== Prompt Token Attribution =====\n{summary}")
+            print(f"Token attribution written to {args.token_attribution}")
+        if tracing:
+            tracer = stop_tracing()
+            if args.trace:
+                tracer.write_chrome_trace(args.trace)
+                print(f"Trace written to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+            if args.otlp_endpoint:
+                try:
+                    tracer.export_otlp(args.otlp_endpoint)
+                    print(f"Trace exported to {args.otlp_endpoint}")
+                except OSError as e:
+                    print(f"Could not export trace to {args.otlp_endpoint}: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
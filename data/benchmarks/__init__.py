@@ -0,0 +1,6 @@
+"""
+Benchmarks for the restaurant data pipeline.
+
+Run from the data/ directory, e.g.:
+    python -m benchmarks.bench_columnar --reservations 200000
+"""
@@ -0,0 +1,72 @@
+"""
+Benchmark the columnar analytics engine against the dict-increment loops
+used by scripts/augment/count.py.
+
+Usage:
+    python -m benchmarks.bench_columnar [--reservations 200000]
+"""
+
+import argparse
+from datetime import date
+from typing import Dict, List
+
+from scripts.analytics.columnar import ColumnarDataset
+
+from .common import scaled_diners, timed
+
+def loop_queries(diners: List[Dict]) -> Dict:
+    """The same queries written as nested loops over the diner dictionaries"""
+    item_counts, guests_by_time, revenue_by_date, cooccurrence = {}, {}, {}, {}
+    for diner in diners:
+        for reservation in diner["reservations"]:
+            for order in reservation["orders"]:
+                item = order["item"]
+                item_counts[item] = item_counts.get(item, 0) + 1
+                time_slot = reservation["time"]
+                guests_by_time[time_slot] = guests_by_time.get(time_slot, 0) + reservation["number_of_people"]
+                day = reservation["date"]
+                revenue_by_date[day] = revenue_by_date.get(day, 0) + order["price"]
+                for tag in order["dietary_tags"]:
+                    row = cooccurrence.setdefault(tag, {})
+                    for other in order["dietary_tags"]:
+                        row[other] = row.get(other, 0) + 1
+    return {"items": item_counts, "time": guests_by_time, "revenue": revenue_by_date, "tags": cooccurrence}
+
+def columnar_queries(dataset: ColumnarDataset) -> Dict:
+    return {
+        "items": dataset.count(by="item"),
+        "time": dataset.count(by="time", weight="party_size"),
+        "revenue": dataset.revenue(by="date"),
+        "tags": dataset.tag_cooccurrence()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar analytics benchmark")
+    parser.add_argument("--reservations", type=int, default=200_000, help="Synthetic dataset size (default: 200000)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.reservations} synthetic reservations...")
+    # The queries only read reservations, so skip generating reviews and emails
+    diners = scaled_diners(args.reservations, mean_reviews=0, mean_emails=0)
+
+    results = {}
+    with timed("loops", results):
+        expected = loop_queries(diners)
+    with timed("flatten", results):
+        dataset = ColumnarDataset.from_diners(diners)
+    with timed("columnar", results):
+        actual = columnar_queries(dataset)
+
+    assert actual["items"] == expected["items"]
+    assert actual["tags"] == expected["tags"]
+    assert {day: round(total, 6) for day, total in actual["revenue"].items()} == \
+        {date.fromisoformat(day): round(total, 6) for day, total in expected["revenue"].items()}
+
+    print(f"\n===== Columnar Analytics ({len(dataset)} orders) =====")
+    print(f"Dict loops:           {results['loops']:.3f} seconds")
+    print(f"Columnar flatten:     {results['flatten']:.3f} seconds (once per dataset)")
+    print(f"Columnar queries:     {results['columnar']:.3f} seconds")
+    print(f"Query speedup:        {results['loops'] / max(results['columnar'], 1e-9):.1f}x")
+
+if __name__ == "__main__":
+    main()
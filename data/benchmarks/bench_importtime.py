@@ -0,0 +1,77 @@
+"""
+Benchmark import time of the agent package and the augment.py CLI.
+
+Each target runs in a fresh interpreter under `python -X importtime`; the
+cumulative time of the top-level imports is reported along with the heavy
+modules (OpenAI SDK, backoff, Pydantic) the target pulled in. Importing the
+agents, `--help` and `--validate` should not load the SDK at all.
+
+Usage:
+    python -m benchmarks.bench_importtime [--max-ms 150]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from .common import DATA_DIR
+
+HEAVY_MODULES = ("openai", "backoff", "pydantic")
+
+# (label, python arguments, heavy modules that must not be imported)
+TARGETS: List[Tuple[str, List[str], Tuple[str, ...]]] = [
+    ("import scripts.agents", ["-c", "import scripts.agents"], ("openai", "backoff", "pydantic")),
+    ("augment.py --help", ["augment.py", "--help"], ("openai", "backoff", "pydantic")),
+    ("augment.py --validate", ["augment.py", "--validate"], ("openai", "backoff"))
+]
+
+def import_profile(args: List[str]) -> Tuple[float, Dict[str, float]]:
+    """Run python -X importtime and return (total ms, cumulative ms per heavy module)"""
+    # No keys, so anything that builds a client eagerly fails here
+    env = {key: value for key, value in os.environ.items() if not key.startswith("OPENAI_API_KEY")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=DATA_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    heavy = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        # Nested imports are indented by two spaces per level
+        if not raw_name[1:].startswith(" "):
+            total_us += int(cumulative)
+        if name in HEAVY_MODULES:
+            heavy[name] = int(cumulative) / 1000
+    return total_us / 1000, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time benchmark")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if any target's import time exceeds this")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'Target':<26}{'Import ms':>10}  Heavy modules loaded")
+    for label, target_args, forbidden in TARGETS:
+        total_ms, heavy = import_profile(target_args)
+        loaded = ", ".join(f"{name} ({ms:.0f} ms)" for name, ms in heavy.items()) or "none"
+        print(f"{label:<26}{total_ms:>10.1f}  {loaded}")
+        for name in forbidden:
+            if name in heavy:
+                failures.append(f"{label} imported {name}")
+        if args.max_ms is not None and total_ms > args.max_ms:
+            failures.append(f"{label} took {total_ms:.1f} ms (limit {args.max_ms:.0f} ms)")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark peak memory of the in-memory dataset representations with tracemalloc.
+
+Compares the validated Pydantic DinersList (including the per-reservation
+diner.dict() copies augment_dataset used to make) against the lean __slots__
+representation in scripts/lean_data.py.
+
+Usage:
+    python -m benchmarks.bench_memory [--reservations 10000,20000,50000]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import tempfile
+import tracemalloc
+from typing import Callable, Dict
+
+from .common import parse_sizes, timed
+
+from load_data import DinersList
+from lean_data import load_lean
+from synthetic_data import SyntheticDataset
+
+def pydantic_fan_out(json_path: str):
+    """The previous augment_dataset loading pattern"""
+    diners_list = DinersList.load_from_json(json_path)
+    copies = []
+    for diner in diners_list.diners:
+        diner_dict = diner.dict()
+        for reservation in diner.reservations or []:
+            copies.append((diner_dict, reservation.dict()))
+    augmented_diners = [diner.dict() for diner in diners_list.diners]
+    return diners_list, copies, augmented_diners
+
+def shared_dicts(json_path: str):
+    """The current augment_dataset loading pattern: one dict copy, shared by reference"""
+    return [diner.dict() for diner in DinersList.load_from_json(json_path).diners]
+
+def measure(label: str, load: Callable, json_path: str, results: Dict):
+    """Record the traced peak and retained size of load(json_path)"""
+    gc.collect()
+    tracemalloc.start()
+    with timed(label, results), contextlib.redirect_stdout(io.StringIO()):
+        data = load(json_path)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    results[label] = (peak, retained, results[label])
+
+def measure_size(num_reservations: int) -> Dict:
+    """Measure every representation on a synthetic dataset of the given size"""
+    fd, json_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        SyntheticDataset(num_reservations).write_json(json_path)
+        results = {"size": os.path.getsize(json_path)}
+        measure("Pydantic + per-reservation copies", pydantic_fan_out, json_path, results)
+        measure("Pydantic + shared dicts", shared_dicts, json_path, results)
+        measure("Lean (with reviews and emails)", load_lean, json_path, results)
+        measure("Lean (reservations only)", lambda path: load_lean(path, include_text=False), json_path, results)
+    finally:
+        os.unlink(json_path)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory representation benchmark")
+    parser.add_argument("--reservations", type=parse_sizes, default=[20_000],
+                        help="Synthetic dataset sizes, comma-separated (default: 20000)")
+    args = parser.parse_args()
+
+    for num_reservations in args.reservations:
+        print(f"Generating {num_reservations} synthetic reservations...")
+        results = measure_size(num_reservations)
+        size = results.pop("size")
+
+        print(f"\n===== Memory ({num_reservations} reservations, {size / 2**20:.1f} MiB JSON) =====")
+        print(f"{'Representation':<36}{'Peak MiB':>10}{'Retained MiB':>14}{'Seconds':>10}")
+        for label, (peak, retained, seconds) in results.items():
+            print(f"{label:<36}{peak / 2**20:>10.1f}{retained / 2**20:>14.1f}{seconds:>10.2f}")
+        print()
+
+if __name__ == "__main__":
+    main()
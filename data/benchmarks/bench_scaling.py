@@ -0,0 +1,84 @@
+"""
+Benchmark how the pipeline stages scale with dataset size.
+
+For each size, a seeded synthetic dataset (scripts/synthetic_data.py) is
+written to a temporary directory. The benchmark then times
+DinersList.load_from_json, DinersList.save_to_json and the menu aggregates
+behind scripts/augment/count.py. With --augment it also times a full
+augment_dataset run against the mock backend, so agent overhead is measured
+without API calls. Seconds per 1,000 reservations should stay flat as the
+size grows.
+
+Usage:
+    python -m benchmarks.bench_scaling [--reservations 10000,100000,1000000] [--augment] [--processes 4]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from .common import parse_sizes, timed
+
+from load_data import DinersList
+from synthetic_data import SyntheticDataset
+from scripts.analytics.aggregates import update_aggregates
+
+def measure_size(num_reservations: int, augment: bool, processes: int, workers: int) -> Dict:
+    """Time each stage on a synthetic dataset of the given size"""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = str(Path(directory) / "diners.json")
+        with timed("generate", results):
+            SyntheticDataset(num_reservations).write_json(json_path)
+        results["size"] = os.path.getsize(json_path)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            with timed("load_from_json", results):
+                diners_list = DinersList.load_from_json(json_path)
+            with timed("save_to_json", results):
+                diners_list.save_to_json(str(Path(directory) / "saved.json"))
+            del diners_list
+            with timed("count aggregates", results):
+                update_aggregates(json_path)
+
+            if augment:
+                from scripts.agents import augment_dataset
+                from scripts.agents.base import use_client
+                from scripts.agents.mock_backend import MockClient
+
+                use_client(MockClient())
+                with timed("augment_dataset (mock)", results):
+                    augment_dataset(json_path, str(Path(directory) / "augmented.json"), max_workers=workers,
+                                    cache_dir=directory, use_cache=False, processes=processes)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline scaling benchmark")
+    parser.add_argument("--reservations", type=parse_sizes, default=[10_000, 50_000, 100_000],
+                        help="Synthetic dataset sizes, comma-separated (default: 10000,50000,100000)")
+    parser.add_argument("--augment", action="store_true", help="Also time augment_dataset against the mock backend")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes for --augment (default: 1)")
+    parser.add_argument("--workers", type=int, default=32, help="Threads per process for --augment (default: 32)")
+    args = parser.parse_args()
+
+    rows = []
+    for num_reservations in args.reservations:
+        print(f"Measuring {num_reservations} synthetic reservations...")
+        rows.append((num_reservations, measure_size(num_reservations, args.augment, args.processes, args.workers)))
+
+    stages = [stage for stage in rows[0][1] if stage != "size"]
+    print("\n===== Seconds (per 1,000 reservations) =====")
+    print(f"{'Reservations':>12}{'MiB':>9}" + "".join(f"{stage:>26}" for stage in stages))
+    for num_reservations, results in rows:
+        cells = "".join(
+            f"{results[stage]:>16.2f} ({1000 * results[stage] / num_reservations:>7.3f})"
+            for stage in stages
+        )
+        print(f"{num_reservations:>12}{results['size'] / 2**20:>9.1f}{cells}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Shared helpers for the benchmarks.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+DATA_DIR = Path(__file__).parent.parent
+
+sys.path.append(str(DATA_DIR / "scripts"))
+
+from synthetic_data import SyntheticDataset
+
+def scaled_diners(num_reservations: int, seed: int = 0, **settings) -> List[Dict]:
+    """Build a seeded synthetic dataset with the given number of reservations
+
+    See SyntheticDataset in scripts/synthetic_data.py for the settings.
+    """
+    return list(SyntheticDataset(num_reservations, seed=seed, **settings).iter_diners())
+
+def parse_sizes(value: str) -> List[int]:
+    """Parse a comma-separated list of dataset sizes, e.g. "10000,100000" """
+    return [int(size) for size in value.split(",")]
+
+@contextmanager
+def timed(label: str, results: Dict):
+    """Record the wall time of a block under label"""
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
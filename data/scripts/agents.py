@@ -1,4 +1,3 @@
-from openai import OpenAI
 from typing import Dict, List, Any
 import json
 import os
@@ -29,13 +28,22 @@ except ImportError as e:
     print(f"Error importing load_data: {e}")
     sys.exit(1)
 
-# Load OpenAI API key from environment
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
+# The OpenAI client is created on first use, so importing this module needs
+# neither the SDK nor an API key
+client = None
+client_lock = threading.Lock()
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+def get_client():
+    """Return the OpenAI client, creating it on first use"""
+    global client
+    with client_lock:
+        if client is None:
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable not set")
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key)
+        return client
 
 # Global counters for token usage and timing
 token_usage = {
@@ -112,7 +120,7 @@ class BaseAgent:
         
         try:
             start_time = time.time()
-            response = client.chat.completions.create(
+            response = get_client().chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are a specialized agent for a restaurant. Return only valid JSON without markdown formatting or code blocks."},
@@ -370,7 +378,7 @@ class CoordinatorAgent:
         
         try:
             start_time = time.time()
-            response = client.chat.completions.create(
+            response = get_client().chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are a coordinator agent for a restaurant. Return only valid JSON without markdown formatting or code blocks."},
@@ -4,5 +4,10 @@ Restaurant multi-agent system for analyzing and augmenting diner data.
 
 from .processor import augment_dataset, process_reservation
 from .base import reset_metrics, print_metrics
+from .planner import plan_dataset, print_plan
+from .watch import watch_dataset
+from .service import serve
+from .restaurants import augment_restaurants
 
-__all__ = ['augment_dataset', 'process_reservation', 'reset_metrics', 'print_metrics'] 
\ No newline at end of file
+__all__ = ['augment_dataset', 'process_reservation', 'reset_metrics', 'print_metrics', 'plan_dataset', 'print_plan',
+           'watch_dataset', 'serve', 'augment_restaurants'] 
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Prompt token attribution for the restaurant multi-agent system.
+
+The run summary reports total prompt tokens, but not which part of the
+prompts drives them. With attribution on, every prompt sent to the API is
+split into its sections and each section is tokenized locally:
+
+- template: the system message and the prompt text around the placeholders
+- profile: the diner's name and any other diner fields not listed below
+- reviews, emails: the diner's reviews and email threads, as prompted
+  (i.e. after compression)
+- reservations: the diner's reservation history
+- reservation: the booking being briefed
+- agent_outputs: the specialized results pasted into the coordinator prompt
+
+Tokens are added up by agent and section, and by diner, so the summary shows
+where to cut first and which guests cost the most. A prompt is counted once,
+even when escalation sends it to a second model, and section boundaries are
+tokenized separately, so the totals are close to but not exactly the
+reported prompt tokens.
+
+Attribution is off unless `start_attribution()` is called; `record_prompt()`
+is then a no-op. Worker processes collect their own and the parent merges them.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .routing import LARGE_MODEL
+
+SECTIONS = ("template", "profile", "reviews", "emails", "reservations", "reservation", "agent_outputs")
+
+# Diner fields with a section of their own; the other fields count as the profile
+DINER_SECTIONS = {"reviews": "reviews", "emails": "emails", "reservations": "reservations"}
+
+# Prompt placeholders other than diner_info, by section
+PLACEHOLDER_SECTIONS = {
+    "reservation_info": "reservation",
+    "dietary_analysis": "agent_outputs",
+    "guest_experience": "agent_outputs",
+    "special_requests": "agent_outputs",
+    "personalization": "agent_outputs"
+}
+
+def _json_tokens(value: Any) -> int:
+    from .planner import count_tokens
+    return count_tokens(json.dumps(value, default=str), LARGE_MODEL)
+
+def prompt_sections(system_message: str, prompt_template: str, values: Dict[str, Any]) -> Dict[str, int]:
+    """Count the tokens of each section of a rendered prompt
+
+    Args:
+        system_message: The system message sent with the prompt
+        prompt_template: The prompt template before formatting
+        values: The value formatted into each placeholder, e.g. {"diner_info": diner}
+    """
+    from .planner import TOKENS_PER_MESSAGE, count_tokens
+
+    static = prompt_template
+    for placeholder in values:
+        static = static.replace("{" + placeholder + "}", "")
+    sections = dict.fromkeys(SECTIONS, 0)
+    sections["template"] = (count_tokens(system_message, LARGE_MODEL) + count_tokens(static, LARGE_MODEL)
+                            + 2 * TOKENS_PER_MESSAGE)
+    for placeholder, value in values.items():
+        if placeholder != "diner_info":
+            sections[PLACEHOLDER_SECTIONS[placeholder]] += _json_tokens(value)
+            continue
+        profile = {}
+        for field, field_value in (value or {}).items():
+            if field in DINER_SECTIONS:
+                sections[DINER_SECTIONS[field]] += _json_tokens(field_value)
+            else:
+                profile[field] = field_value
+        sections["profile"] += _json_tokens(profile)
+    return sections
+
+class TokenAttribution:
+    """Prompt tokens by agent and section, and by diner"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.agents: Dict[str, Dict[str, int]] = {}
+        self.prompts: Dict[str, int] = {}
+        self.diners: Dict[str, Dict[str, int]] = {}
+
+    def record(self, agent: str, diner_name: str, sections: Dict[str, int]):
+        with self.lock:
+            self.prompts[agent] = self.prompts.get(agent, 0) + 1
+            for totals in (self.agents.setdefault(agent, dict.fromkeys(SECTIONS, 0)),
+                           self.diners.setdefault(diner_name, dict.fromkeys(SECTIONS, 0))):
+                for section, tokens in sections.items():
+                    totals[section] += tokens
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the totals, e.g. to send from a worker process"""
+        with self.lock:
+            return {
+                "agents": {agent: dict(totals) for agent, totals in self.agents.items()},
+                "prompts": dict(self.prompts),
+                "diners": {name: dict(totals) for name, totals in self.diners.items()}
+            }
+
+    def merge(self, snapshot: Dict):
+        """Add a worker process's snapshot() to these totals"""
+        with self.lock:
+            for agent, count in snapshot["prompts"].items():
+                self.prompts[agent] = self.prompts.get(agent, 0) + count
+            for mine, theirs in ((self.agents, snapshot["agents"]), (self.diners, snapshot["diners"])):
+                for name, totals in theirs.items():
+                    entry = mine.setdefault(name, dict.fromkeys(SECTIONS, 0))
+                    for section, tokens in totals.items():
+                        entry[section] += tokens
+
+    def summary(self, top: int = 10) -> str:
+        """Format the tokens by agent and section and the top diners by tokens"""
+        snapshot = self.snapshot()
+        agents, diners = snapshot["agents"], snapshot["diners"]
+        by_section = {section: sum(totals[section] for totals in agents.values()) for section in SECTIONS}
+        total = sum(by_section.values())
+
+        header = f"{'agent':<26} {'prompts':>8}" + "".join(f" {section:>13}" for section in SECTIONS) + f" {'total':>11}"
+        lines = [f"Prompts: {sum(snapshot['prompts'].values())}, attributed tokens: {total}", "", header]
+        for agent, totals in sorted(agents.items(), key=lambda item: -sum(item[1].values())):
+            lines.append(f"{agent:<26} {snapshot['prompts'][agent]:>8}"
+                         + "".join(f" {totals[section]:>13}" for section in SECTIONS)
+                         + f" {sum(totals.values()):>11}")
+        lines.append(f"{'share of tokens':<26} {'':>8}"
+                     + "".join(f" {100 * by_section[section] / max(1, total):>12.1f}%" for section in SECTIONS)
+                     + f" {'100.0%':>11}")
+
+        lines += ["", f"===== Top {top} diners by prompt tokens =====", f"{'tokens':>10} {'share':>7}  diner (largest section)"]
+        for name, totals in sorted(diners.items(), key=lambda item: -sum(item[1].values()))[:top]:
+            diner_total = sum(totals.values())
+            largest = max(SECTIONS, key=lambda section: totals[section])
+            lines.append(f"{diner_total:>10} {100 * diner_total / max(1, total):>6.1f}%  {name} "
+                         f"({largest} {100 * totals[largest] / max(1, diner_total):.0f}%)")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, top: int = 10) -> str:
+        """Write the totals as JSON with the summary next to it; returns the summary"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.snapshot(), indent=2), encoding="utf-8")
+        summary = self.summary(top)
+        path.with_suffix(".txt").write_text(summary, encoding="utf-8")
+        return summary
+
+_attribution: Optional[TokenAttribution] = None
+
+def start_attribution() -> TokenAttribution:
+    """Start attributing prompt tokens"""
+    global _attribution
+    _attribution = TokenAttribution()
+    return _attribution
+
+def stop_attribution() -> Optional[TokenAttribution]:
+    """Stop attributing prompt tokens and return the collected totals"""
+    global _attribution
+    attribution, _attribution = _attribution, None
+    return attribution
+
+def get_attribution() -> Optional[TokenAttribution]:
+    return _attribution
+
+def record_prompt(agent: str, system_message: str, prompt_template: str, values: Dict[str, Any]):
+    """Attribute the tokens of a prompt about to be sent; a no-op when attribution is off"""
+    attribution = _attribution
+    if attribution is None:
+        return
+    diner = values.get("diner_info") or {}
+    attribution.record(agent, str(diner.get("name", "unknown")), prompt_sections(system_message, prompt_template, values))
@@ -0,0 +1,395 @@
+"""
+LLM backends for the restaurant multi-agent system.
+
+Every API call goes through a `BackendPool` of OpenAI-compatible endpoints,
+e.g. the hosted API plus an on-prem inference server. Each call is routed to
+the endpoint with the lowest expected latency: its smoothed latency, scaled up
+by its current load and its recent error rate. An endpoint never has more
+calls in flight than its concurrency limit, so a saturated endpoint overflows
+to the others, and calls wait only when every endpoint is full.
+
+Endpoints that fail repeatedly are taken out of rotation for a cooldown that
+doubles on each further failure, then let back in one call at a time. A
+background thread also checks each endpoint's `/models` route, so an endpoint
+that goes down is skipped before a call fails on it. Retries (see base.py)
+pick an endpoint afresh, so a failed call usually fails over.
+
+Without configuration the pool has a single endpoint for the shared client in
+base.py. Endpoints are configured as a JSON list, passed with `--endpoints`
+or named by the OPENAI_ENDPOINTS environment variable:
+
+    [
+        {"name": "openai", "max_concurrency": 32},
+        {"name": "onprem", "base_url": "http://gpu-box:8000/v1", "api_key": "none",
+         "max_concurrency": 8, "models": {"gpt-4o-mini": "llama-3.1-8b-instruct"}},
+        {"name": "local", "mock": {"latency": 0.2}}
+    ]
+
+`api_keys` lists keys to rotate through on rate limits, and `api_key_env`
+names an environment variable holding one. Endpoints without `base_url` or
+keys use the OPENAI_API_KEY variables. `models` limits an endpoint to the
+listed models, mapping each to the name the endpoint serves it under. `mock`
+serves the endpoint in-process with a MockClient, for tests.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+from .sla import DeadlineExceeded, remaining
+
+# Weight of the newest observation in the smoothed latency and error rate
+SMOOTHING = 0.2
+
+# Consecutive failures that take an endpoint out of rotation
+FAILURE_THRESHOLD = 3
+
+# Seconds out of rotation after FAILURE_THRESHOLD failures, doubling up to the maximum
+COOLDOWN = 5.0
+MAX_COOLDOWN = 120.0
+
+# Seconds between active health checks
+HEALTH_INTERVAL = 30.0
+
+# Lowest success rate used when scoring, so failing endpoints keep a finite score
+MIN_SUCCESS_RATE = 0.05
+
+def _is_timeout(error: BaseException) -> bool:
+    # The OpenAI SDK raises APITimeoutError, which is not a TimeoutError
+    return isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError"
+
+class Endpoint:
+    """One OpenAI-compatible endpoint with its own limit, health and statistics
+
+    Args:
+        name: Label used in metrics and traces
+        base_url: API base URL, e.g. http://localhost:8000/v1; None for OpenAI
+        api_keys: Keys to rotate through on rate limits
+        client: Client to send calls through instead of building one, e.g. a MockClient
+        client_factory: Callable returning the client for each call, e.g. base.get_client
+        max_concurrency: Calls in flight at once, or None for no limit
+        models: Models this endpoint serves, mapped to the names it serves
+            them under; None serves every model under its own name
+    """
+
+    def __init__(self, name: str, base_url: Optional[str] = None, api_keys: Optional[List[str]] = None,
+                 client=None, client_factory: Optional[Callable] = None, max_concurrency: Optional[int] = None,
+                 models: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.api_keys = list(api_keys or [])
+        self.key_index = 0
+        self.client = client
+        self.injected_client = client is not None
+        self.client_factory = client_factory
+        self.max_concurrency = max_concurrency
+        self.models = models
+        self.client_lock = threading.Lock()
+
+        # Routing state, guarded by the pool's condition
+        self.inflight = 0
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN
+        self.down_until = 0.0
+
+        self._reset_statistics()
+
+    def _reset_statistics(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_inflight = 0
+
+    def __getstate__(self):
+        # Worker processes get the configuration and build their own OpenAI clients
+        state = self.__dict__.copy()
+        del state["client_lock"]
+        if not self.injected_client:
+            state["client"] = None
+        return state
+
+    def __setstate__(self, state):
+        # Copies keep the learned latency and health, but count only their own calls
+        self.__dict__.update(state)
+        self.client_lock = threading.Lock()
+        self.inflight = 0
+        self._reset_statistics()
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def get_client(self):
+        """Return the client for the next call, building an OpenAI client on first use"""
+        if self.client_factory is not None:
+            return self.client_factory()
+        with self.client_lock:
+            if self.client is None:
+                from openai import OpenAI
+                # Local servers often need no key, but the SDK requires one
+                key = self.api_keys[self.key_index] if self.api_keys else "none"
+                # Retries are left to with_retries, which may pick another endpoint
+                self.client = OpenAI(api_key=key, base_url=self.base_url, max_retries=0)
+            return self.client
+
+    def rotate_key(self):
+        """Switch to the next API key, if the endpoint has more than one"""
+        if len(self.api_keys) < 2:
+            return
+        with self.client_lock:
+            self.key_index = (self.key_index + 1) % len(self.api_keys)
+            self.client = None
+
+    def create(self, model: str, messages: List[Dict], **options):
+        """Send one chat completion request to this endpoint"""
+        served_model = self.models.get(model, model) if self.models else model
+        return self.get_client().chat.completions.create(model=served_model, messages=messages, **options)
+
+    def check_health(self, timeout: float = 5.0) -> bool:
+        """Return whether the endpoint answers its /models route
+
+        Endpoints served by an injected client have no route to check and
+        are healthy unless the client has a `healthy()` method saying otherwise.
+        """
+        if self.client_factory is not None or (self.client is not None and self.base_url is None):
+            healthy = getattr(self.client, "healthy", None)
+            return healthy() if callable(healthy) else True
+        url = f"{self.base_url or 'https://api.openai.com/v1'}/models"
+        headers = {"Authorization": f"Bearer {self.api_keys[self.key_index]}"} if self.api_keys else {}
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+                return 200 <= response.status < 300
+        except Exception:
+            return False
+
+    # The methods below are called with the pool's condition held
+
+    def is_up(self, now: float) -> bool:
+        return self.down_until <= now
+
+    def has_capacity(self) -> bool:
+        # An endpoint coming back from a cooldown takes one trial call at a time
+        limit = 1 if self.consecutive_failures >= FAILURE_THRESHOLD else self.max_concurrency
+        return limit is None or self.inflight < limit
+
+    def score(self, default_latency: float) -> float:
+        """Expected seconds for a new call: smoothed latency, scaled up by load and errors"""
+        latency = default_latency if self.latency is None else self.latency
+        load = self.inflight / self.max_concurrency if self.max_concurrency else 0.0
+        return latency * (1 + load) / max(MIN_SUCCESS_RATE, 1 - self.error_rate)
+
+    def record(self, seconds: float, error: Optional[BaseException] = None):
+        """Update the routing state and statistics after a call"""
+        self.calls += 1
+        self.total_time += seconds
+        failed = error is not None
+        self.error_rate += SMOOTHING * (failed - self.error_rate)
+        # Failures return early and say little about speed, except for timeouts
+        if not failed or _is_timeout(error):
+            self.latency = seconds if self.latency is None else self.latency + SMOOTHING * (seconds - self.latency)
+        if not failed:
+            self.consecutive_failures = 0
+            self.cooldown = COOLDOWN
+            return
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.mark_down()
+
+    def mark_down(self):
+        self.down_until = time.monotonic() + self.cooldown
+        self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+
+    def mark_up(self):
+        self.down_until = 0.0
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN
+
+    def snapshot(self) -> Dict:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "up": self.is_up(time.monotonic()),
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_time": self.total_time / max(1, self.calls),
+            "smoothed_latency": self.latency,
+            "error_rate": self.error_rate,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "max_concurrency": self.max_concurrency
+        }
+
+class BackendPool:
+    """Routes chat completion calls across endpoints
+
+    Args:
+        endpoints: Endpoints in order of preference for ties
+        health_interval: Seconds between active health checks, or 0 for none
+    """
+
+    def __init__(self, endpoints: List[Endpoint], health_interval: float = HEALTH_INTERVAL):
+        if not endpoints:
+            raise ValueError("A backend pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.health_interval = health_interval
+        self.condition = threading.Condition()
+        self._health_thread = None
+
+    def acquire(self, model: str) -> Endpoint:
+        """Reserve a slot on the best endpoint for a model, waiting while all are full
+
+        When every endpoint serving the model is out of rotation, the one due
+        back soonest gets a trial call rather than failing outright.
+
+        Raises:
+            ValueError: if no endpoint serves the model
+            DeadlineExceeded: if the current deadline passes while waiting
+        """
+        serving = [endpoint for endpoint in self.endpoints if endpoint.serves(model)]
+        if not serving:
+            raise ValueError(f"No configured endpoint serves {model}")
+        self._start_health_checks()
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                up = [endpoint for endpoint in serving if endpoint.is_up(now)]
+                if not up:
+                    up = [min(serving, key=lambda endpoint: endpoint.down_until)]
+                free = [endpoint for endpoint in up if endpoint.has_capacity()]
+                if free:
+                    # Untried endpoints are scored optimistically, at the fastest observed latency
+                    known = [endpoint.latency for endpoint in serving if endpoint.latency is not None]
+                    default_latency = min(known, default=0.0)
+                    endpoint = min(free, key=lambda endpoint: (endpoint.score(default_latency), endpoint.inflight))
+                    endpoint.inflight += 1
+                    endpoint.max_inflight = max(endpoint.max_inflight, endpoint.inflight)
+                    return endpoint
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise DeadlineExceeded("Deadline passed while waiting for a free endpoint")
+                # Wake up periodically, since a cooldown ending sends no notification
+                self.condition.wait(timeout=1.0 if left is None else min(left, 1.0))
+
+    def release(self, endpoint: Endpoint, seconds: float, error: Optional[BaseException] = None):
+        """Free the endpoint's slot and record how the call went"""
+        with self.condition:
+            endpoint.inflight -= 1
+            endpoint.record(seconds, error)
+            self.condition.notify()
+
+    def complete(self, model: str, messages: List[Dict], **options):
+        """Send a chat completion request through the best available endpoint
+
+        Returns:
+            Tuple of (response, endpoint that served it)
+        """
+        endpoint = self.acquire(model)
+        start_time = time.monotonic()
+        try:
+            response = endpoint.create(model, messages, **options)
+        except Exception as e:
+            self.release(endpoint, time.monotonic() - start_time, e)
+            if type(e).__name__ == "RateLimitError":
+                endpoint.rotate_key()
+            raise
+        self.release(endpoint, time.monotonic() - start_time)
+        return response, endpoint
+
+    def check_health(self) -> Dict[str, bool]:
+        """Check every endpoint now, taking failing ones out of rotation
+
+        Returns:
+            Dictionary of endpoint name to whether it is healthy
+        """
+        results = {endpoint.name: endpoint.check_health() for endpoint in self.endpoints}
+        with self.condition:
+            for endpoint in self.endpoints:
+                if results[endpoint.name]:
+                    if not endpoint.is_up(time.monotonic()):
+                        endpoint.mark_up()
+                elif endpoint.is_up(time.monotonic()):
+                    endpoint.consecutive_failures = FAILURE_THRESHOLD
+                    endpoint.mark_down()
+            self.condition.notify_all()
+        return results
+
+    def _start_health_checks(self):
+        if self._health_thread is not None or not self.health_interval or len(self.endpoints) < 2:
+            return
+        with self.condition:
+            if self._health_thread is not None:
+                return
+            self._health_thread = threading.Thread(target=self._health_loop, name="endpoint-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            self.check_health()
+
+    def snapshot(self) -> List[Dict]:
+        """Return per-endpoint routing state and statistics"""
+        with self.condition:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
+
+    def merge_stats(self, snapshot: List[Dict]):
+        """Add the statistics of another process's copy of this pool"""
+        with self.condition:
+            endpoints = {endpoint.name: endpoint for endpoint in self.endpoints}
+            for entry in snapshot:
+                endpoint = endpoints.get(entry["name"])
+                if endpoint is None:
+                    continue
+                endpoint.calls += entry["calls"]
+                endpoint.errors += entry["errors"]
+                endpoint.total_time += entry["avg_time"] * entry["calls"]
+                endpoint.max_inflight = max(endpoint.max_inflight, entry["max_inflight"])
+
+    def __getstate__(self):
+        return {"endpoints": self.endpoints, "health_interval": self.health_interval}
+
+    def __setstate__(self, state):
+        self.__init__(state["endpoints"], state["health_interval"])
+
+def endpoint_from_config(config: Dict, default_keys: Callable[[], List[str]]) -> Endpoint:
+    """Build an endpoint from one entry of the endpoints JSON
+
+    Args:
+        config: Endpoint settings, see the module docstring
+        default_keys: Returns the OPENAI_API_KEY keys, for endpoints without their own
+    """
+    name = config.get("name") or config.get("base_url") or "openai"
+    models = config.get("models")
+    if isinstance(models, list):
+        models = {model: model for model in models}
+    options = {"max_concurrency": config.get("max_concurrency"), "models": models}
+    if "mock" in config:
+        from .mock_backend import MockClient
+        return Endpoint(name, client=MockClient(**config["mock"]), **options)
+
+    keys = list(config.get("api_keys") or [])
+    if config.get("api_key"):
+        keys.append(config["api_key"])
+    if config.get("api_key_env"):
+        key = os.environ.get(config["api_key_env"])
+        if not key:
+            raise ValueError(f"Endpoint {name}: environment variable {config['api_key_env']} is not set")
+        keys.append(key)
+    if not keys:
+        keys = default_keys()
+        if not keys and not config.get("base_url"):
+            raise ValueError(f"Endpoint {name}: no valid OpenAI API keys found in environment variables")
+    return Endpoint(name, base_url=config.get("base_url"), api_keys=keys, **options)
+
+def load_endpoints(path: str, default_keys: Callable[[], List[str]] = lambda: []) -> BackendPool:
+    """Build a backend pool from a JSON file listing endpoints"""
+    with open(path, "r") as f:
+        configs = json.load(f)
+    if isinstance(configs, dict):
+        configs = configs.get("endpoints", [])
+    return BackendPool([endpoint_from_config(config, default_keys) for config in configs])
@@ -2,77 +2,219 @@
 Base agent class and utility functions for the restaurant multi-agent system.
 """
 
+import functools
 import json
 import time
 import threading
 import random
 import os
-from typing import Dict, Any, List
-from openai import OpenAI, RateLimitError, APIError
-import backoff
+from typing import Dict, Any, List, Optional
+from .attribution import record_prompt
+from .backends import BackendPool, Endpoint, load_endpoints
+from .cache import content_hash, prompt_version
+from .ratelimit import estimate_tokens, get_rate_limiter
+from .scheduler import call_slot
+from .sla import call_timeout, expired, remaining
+from .tracing import current_span, record_span, span
+from .routing import (
+    LARGE_MODEL,
+    MIN_CONFIDENCE,
+    TRUNCATION_RETRY_FACTOR,
+    completion_budget,
+    schema_variant,
+    model_route,
+    model_prices,
+    response_confidence,
+    validate_output
+)
 
 # Global lock for key rotation
 key_lock = threading.Lock()
 
-# Load all available API keys
-API_KEYS = [
-    os.environ.get("OPENAI_API_KEY"),
-    os.environ.get("OPENAI_API_KEY2"),
-    os.environ.get("OPENAI_API_KEY3")
-]
-# Filter out None or empty values
-API_KEYS = [key for key in API_KEYS if key]
-
-if not API_KEYS:
-    raise ValueError("No valid OpenAI API keys found in environment variables")
+# API keys and the OpenAI client are loaded on the first API call, so runs
+# that never reach the API (planning, cache replays) need neither the SDK nor keys
+API_KEYS = []
 
 # Current key index
 current_key_index = 0
 
-# Initialize the OpenAI client with the first key
-client = OpenAI(api_key=API_KEYS[current_key_index])
+client = None
+
+def load_api_keys():
+    """Return all configured OpenAI API keys"""
+    keys = [
+        os.environ.get("OPENAI_API_KEY"),
+        os.environ.get("OPENAI_API_KEY2"),
+        os.environ.get("OPENAI_API_KEY3")
+    ]
+    # Filter out None or empty values
+    return [key for key in keys if key]
+
+def get_client():
+    """Return the shared OpenAI client, creating it with the first key on first use"""
+    global API_KEYS, client
+    with key_lock:
+        if client is None:
+            API_KEYS = load_api_keys()
+            if not API_KEYS:
+                raise ValueError("No valid OpenAI API keys found in environment variables")
+            from openai import OpenAI
+            client = OpenAI(api_key=API_KEYS[current_key_index])
+        return client
+
+def use_client(new_client):
+    """Send all API calls through the given client, e.g. a MockClient, instead of OpenAI"""
+    global client
+    with key_lock:
+        client = new_client
+
+# Endpoints configured with use_backends() or OPENAI_ENDPOINTS; None routes every
+# call through the shared client above
+backend_pool = None
+default_pool = BackendPool([Endpoint("openai", client_factory=get_client)])
+
+def use_backends(pool):
+    """Route API calls across the endpoints of a BackendPool, or back to the shared client with None"""
+    global backend_pool
+    with key_lock:
+        backend_pool = pool
+
+def get_backend():
+    """Return the pool API calls are routed through, loading OPENAI_ENDPOINTS on first use"""
+    global backend_pool
+    endpoints_path = os.environ.get("OPENAI_ENDPOINTS")
+    if backend_pool is None and endpoints_path:
+        with key_lock:
+            if backend_pool is None:
+                backend_pool = load_endpoints(endpoints_path, load_api_keys)
+    return backend_pool or default_pool
 
 # Global counters for token usage and timing
 token_usage = {
     "prompt_tokens": 0,
     "completion_tokens": 0,
-    "total_tokens": 0
+    "total_tokens": 0,
+    "cached_tokens": 0
 }
 token_lock = threading.Lock()
 
+# Prompt cache pricing and prefill speed, used for cost and savings estimates
+CACHED_TOKEN_DISCOUNT = 0.5  # Cached prompt tokens are billed at half price
+PREFILL_SECONDS_PER_TOKEN = 0.0001  # Roughly 10K prompt tokens processed per second
+
 # Performance metrics
 performance_metrics = {
     "api_calls": 0,
     "api_errors": 0,
     "api_retries": 0,
+    "prepass_skips": 0,
+    "diner_analyses": 0,
+    "diner_cache_hits": 0,
+    "degraded_briefings": 0,
+    "coordinator_fallbacks": 0,
+    "compressed_diners": 0,
+    "compression_replays": 0,
     "total_api_time": 0,
     "max_api_time": 0,
     "min_api_time": float('inf')
 }
+# Calls resolved by the local pre-pass, by agent name
+prepass_skips_by_agent = {}
+# Stage outputs replayed from the stage store, by stage
+stage_replays = {}
+# Latency, tokens and escalations, by model
+model_metrics = {}
+# Latency, completion tokens and budget truncations, by agent
+agent_metrics = {}
+# Specialized results missing from degraded briefings, by stage
+missing_stages_by_name = {}
+# Diner text tokens before and after prompt compression, by section
+compression_tokens = {}
 metrics_lock = threading.Lock()
 
 def rotate_api_key():
     """Rotate to next available API key"""
     global current_key_index, client
+    get_client()
+    if not API_KEYS:
+        # An injected client (e.g. the mock backend) has no keys to rotate
+        return
     with key_lock:
+        from openai import OpenAI
         current_key_index = (current_key_index + 1) % len(API_KEYS)
         client = OpenAI(api_key=API_KEYS[current_key_index])
         print(f"Rotated to API key {current_key_index + 1}/{len(API_KEYS)}")
 
+def cached_prompt_tokens(usage_data):
+    """Return the number of prompt tokens served from the provider's prompt cache"""
+    details = getattr(usage_data, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
 def update_token_usage(usage_data):
     """Update the global token usage counters"""
     with token_lock:
         token_usage["prompt_tokens"] += usage_data.prompt_tokens
         token_usage["completion_tokens"] += usage_data.completion_tokens
         token_usage["total_tokens"] += usage_data.total_tokens
+        token_usage["cached_tokens"] += cached_prompt_tokens(usage_data)
+
+def _model_entry(model):
+    """Return the metrics entry for a model, creating it if needed (caller holds metrics_lock)"""
+    if model not in model_metrics:
+        model_metrics[model] = {
+            "calls": 0,
+            "total_time": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "escalations": 0
+        }
+    return model_metrics[model]
+
+def _agent_entry(agent):
+    """Return the metrics entry for an agent, creating it if needed (caller holds metrics_lock)"""
+    if agent not in agent_metrics:
+        agent_metrics[agent] = {
+            "calls": 0,
+            "total_time": 0,
+            "completion_tokens": 0,
+            "truncations": 0
+        }
+    return agent_metrics[agent]
+
+def update_agent_metrics(agent, api_time, usage_data):
+    """Record the latency and completion tokens of one call made for an agent"""
+    with metrics_lock:
+        entry = _agent_entry(agent)
+        entry["calls"] += 1
+        entry["total_time"] += api_time
+        entry["completion_tokens"] += usage_data.completion_tokens
 
-def update_performance_metrics(api_time):
+def increment_truncation(agent):
+    """Record an answer cut off by the agent's completion budget"""
+    with metrics_lock:
+        _agent_entry(agent)["truncations"] += 1
+
+def update_performance_metrics(api_time, model=LARGE_MODEL, usage_data=None):
     """Update the performance metrics"""
     with metrics_lock:
         performance_metrics["api_calls"] += 1
         performance_metrics["total_api_time"] += api_time
         performance_metrics["max_api_time"] = max(performance_metrics["max_api_time"], api_time)
         performance_metrics["min_api_time"] = min(performance_metrics["min_api_time"], api_time)
+        
+        entry = _model_entry(model)
+        entry["calls"] += 1
+        entry["total_time"] += api_time
+        if usage_data is not None:
+            entry["prompt_tokens"] += usage_data.prompt_tokens
+            entry["completion_tokens"] += usage_data.completion_tokens
+            entry["cached_tokens"] += cached_prompt_tokens(usage_data)
+
+def increment_escalation(model):
+    """Record a response from a model that was rejected and escalated"""
+    with metrics_lock:
+        _model_entry(model)["escalations"] += 1
 
 def increment_error_count():
     """Increment the API error counter"""
@@ -84,6 +226,48 @@ def increment_retry_count():
     with metrics_lock:
         performance_metrics["api_retries"] += 1
 
+def increment_prepass_skip(agent_name):
+    """Record an agent call that the local pre-pass resolved without the API"""
+    with metrics_lock:
+        performance_metrics["prepass_skips"] += 1
+        prepass_skips_by_agent[agent_name] = prepass_skips_by_agent.get(agent_name, 0) + 1
+
+def increment_diner_analysis(cache_hit):
+    """Record a diner-scoped analysis, noting whether it came from the cache"""
+    with metrics_lock:
+        performance_metrics["diner_analyses"] += 1
+        if cache_hit:
+            performance_metrics["diner_cache_hits"] += 1
+
+def increment_stage_replay(stage):
+    """Record a stage output replayed from the stage store"""
+    with metrics_lock:
+        stage_replays[stage] = stage_replays.get(stage, 0) + 1
+
+def increment_degraded(missing_stages, coordinator_fallback):
+    """Record a briefing made without some specialized results or without the coordinator"""
+    with metrics_lock:
+        performance_metrics["degraded_briefings"] += 1
+        if coordinator_fallback:
+            performance_metrics["coordinator_fallbacks"] += 1
+        for stage in missing_stages:
+            missing_stages_by_name[stage] = missing_stages_by_name.get(stage, 0) + 1
+
+def record_compression(tokens, replayed):
+    """Record a diner's text tokens before and after compression, noting whether the view was replayed"""
+    with metrics_lock:
+        performance_metrics["compressed_diners"] += 1
+        if replayed:
+            performance_metrics["compression_replays"] += 1
+        for key, value in tokens.items():
+            compression_tokens[key] = compression_tokens.get(key, 0) + value
+
+def strip_analysis(reservation):
+    """Return the reservation without any previous agent_analysis"""
+    if not reservation:
+        return reservation
+    return {key: value for key, value in reservation.items() if key != "agent_analysis"}
+
 def clean_json_response(response_text):
     """Clean the response text to extract valid JSON"""
     # Remove markdown code blocks if present
@@ -108,17 +292,78 @@ def clean_json_response(response_text):
 def reset_metrics():
     """Reset all metrics counters"""
     with token_lock:
-        token_usage.update({"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0})
+        token_usage.update({"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0})
     
     with metrics_lock:
         performance_metrics.update({
             "api_calls": 0,
             "api_errors": 0,
             "api_retries": 0,
+            "prepass_skips": 0,
+            "diner_analyses": 0,
+            "diner_cache_hits": 0,
+            "degraded_briefings": 0,
+            "coordinator_fallbacks": 0,
+            "compressed_diners": 0,
+            "compression_replays": 0,
             "total_api_time": 0, 
             "max_api_time": 0, 
             "min_api_time": float('inf')
         })
+        prepass_skips_by_agent.clear()
+        stage_replays.clear()
+        model_metrics.clear()
+        agent_metrics.clear()
+        missing_stages_by_name.clear()
+        compression_tokens.clear()
+
+def metrics_snapshot():
+    """Return a copy of every metrics counter, e.g. to send from a worker process"""
+    with token_lock:
+        tokens = dict(token_usage)
+    with metrics_lock:
+        snapshot = {
+            "token_usage": tokens,
+            "performance_metrics": dict(performance_metrics),
+            "prepass_skips_by_agent": dict(prepass_skips_by_agent),
+            "stage_replays": dict(stage_replays),
+            "model_metrics": {model: dict(entry) for model, entry in model_metrics.items()},
+            "agent_metrics": {agent: dict(entry) for agent, entry in agent_metrics.items()},
+            "missing_stages_by_name": dict(missing_stages_by_name),
+            "compression_tokens": dict(compression_tokens)
+        }
+    snapshot["endpoints"] = get_backend().snapshot() if backend_pool is not None else []
+    return snapshot
+
+def merge_metrics(snapshot):
+    """Add a worker process's metrics_snapshot() to this process's counters"""
+    with token_lock:
+        for key, value in snapshot["token_usage"].items():
+            token_usage[key] += value
+    with metrics_lock:
+        for key, value in snapshot["performance_metrics"].items():
+            if key == "max_api_time":
+                performance_metrics[key] = max(performance_metrics[key], value)
+            elif key == "min_api_time":
+                performance_metrics[key] = min(performance_metrics[key], value)
+            else:
+                performance_metrics[key] += value
+        for counts, worker_counts in ((prepass_skips_by_agent, snapshot["prepass_skips_by_agent"]),
+                                      (stage_replays, snapshot["stage_replays"]),
+                                      (missing_stages_by_name, snapshot["missing_stages_by_name"]),
+                                      (compression_tokens, snapshot["compression_tokens"])):
+            for key, value in worker_counts.items():
+                counts[key] = counts.get(key, 0) + value
+        for model, worker_entry in snapshot["model_metrics"].items():
+            entry = _model_entry(model)
+            for key, value in worker_entry.items():
+                entry[key] += value
+        for agent, worker_entry in snapshot["agent_metrics"].items():
+            entry = _agent_entry(agent)
+            for key, value in worker_entry.items():
+                entry[key] += value
+    if backend_pool is not None:
+        backend_pool.merge_stats(snapshot["endpoints"])
 
 def print_metrics(total_time, num_reservations):
     """Print performance metrics"""
@@ -135,17 +380,83 @@ def print_metrics(total_time, num_reservations):
     print(f"Average API call time: {avg_api_time:.2f} seconds")
     print(f"Min API call time: {performance_metrics['min_api_time']:.2f} seconds")
     print(f"Max API call time: {performance_metrics['max_api_time']:.2f} seconds")
+
+    if backend_pool is not None:
+        print("\n===== Endpoints =====")
+        for entry in backend_pool.snapshot():
+            print(f"{entry['name']}: {entry['calls']} calls, {entry['errors']} errors, avg {entry['avg_time']:.2f}s, "
+                  f"peak {entry['max_inflight']}/{entry['max_concurrency'] or 'unlimited'} in flight"
+                  f"{'' if entry['up'] else ', out of rotation'}")
+
+    print("\n===== Local Pre-pass =====")
+    skipped = performance_metrics['prepass_skips']
+    attempted = skipped + performance_metrics['api_calls']
+    print(f"Calls skipped: {skipped}/{attempted} ({100 * skipped / max(1, attempted):.1f}%)")
+    for agent_name, count in sorted(prepass_skips_by_agent.items()):
+        print(f"  {agent_name}: {count}")
+    
+    print("\n===== Prompt Compression =====")
+    print(f"Diners compressed: {performance_metrics['compressed_diners']} "
+          f"({performance_metrics['compression_replays']} replayed from the stage store)")
+    for section in ("emails", "reviews"):
+        before = compression_tokens.get(f"{section}_before", 0)
+        after = compression_tokens.get(f"{section}_after", 0)
+        print(f"  {section}: {before} -> {after} tokens, {before - after} removed "
+              f"({100 * (before - after) / max(1, before):.1f}%)")
+    
+    print("\n===== Diner-scoped Analysis =====")
+    print(f"Diner analyses: {performance_metrics['diner_analyses']}")
+    print(f"Served from cache: {performance_metrics['diner_cache_hits']}")
+    
+    print("\n===== Stage Cache =====")
+    print(f"Stage outputs replayed: {sum(stage_replays.values())}")
+    for stage, count in sorted(stage_replays.items()):
+        print(f"  {stage}: {count}")
+    
+    print("\n===== Degraded Briefings =====")
+    print(f"Briefings missing specialized results or the coordinator: {performance_metrics['degraded_briefings']}")
+    print(f"Coordinator replaced by the local fallback: {performance_metrics['coordinator_fallbacks']}")
+    for stage, count in sorted(missing_stages_by_name.items()):
+        print(f"  missing {stage}: {count}")
     
     print("\n===== Token Usage =====")
     print(f"Prompt tokens: {token_usage['prompt_tokens']}")
     print(f"Completion tokens: {token_usage['completion_tokens']}")
     print(f"Total tokens: {token_usage['total_tokens']}")
     
-    # Estimate cost (approximate based on GPT-4o pricing)
-    prompt_cost = token_usage['prompt_tokens'] * 0.00001  # $0.01 per 1K tokens
-    completion_cost = token_usage['completion_tokens'] * 0.00003  # $0.03 per 1K tokens
-    total_cost = prompt_cost + completion_cost
+    # Estimate cost from per-model pricing, billing cached prompt tokens at the discount
+    total_cost = 0
+    cost_saved = 0
+    for model, entry in model_metrics.items():
+        prompt_price, completion_price = model_prices(model)
+        uncached_tokens = entry['prompt_tokens'] - entry['cached_tokens']
+        total_cost += uncached_tokens * prompt_price
+        total_cost += entry['cached_tokens'] * prompt_price * (1 - CACHED_TOKEN_DISCOUNT)
+        total_cost += entry['completion_tokens'] * completion_price
+        cost_saved += entry['cached_tokens'] * prompt_price * CACHED_TOKEN_DISCOUNT
     print(f"Estimated cost: ${total_cost:.2f}")
+    
+    print("\n===== Prompt Cache =====")
+    cached_tokens = token_usage['cached_tokens']
+    hit_ratio = cached_tokens / max(1, token_usage['prompt_tokens'])
+    print(f"Cached prompt tokens: {cached_tokens} ({100 * hit_ratio:.1f}% of prompt tokens)")
+    print(f"Estimated cost saved: ${cost_saved:.2f}")
+    print(f"Estimated prefill time saved: {cached_tokens * PREFILL_SECONDS_PER_TOKEN:.2f} seconds")
+    
+    print("\n===== Model Routing =====")
+    for model, entry in sorted(model_metrics.items()):
+        avg_time = entry['total_time'] / max(1, entry['calls'])
+        escalation_rate = entry['escalations'] / max(1, entry['calls'])
+        print(f"{model}: {entry['calls']} calls, avg {avg_time:.2f}s, "
+              f"{entry['prompt_tokens']} prompt / {entry['completion_tokens']} completion tokens, "
+              f"escalated {entry['escalations']} ({100 * escalation_rate:.1f}%)")
+    
+    print(f"\n===== Completions by Agent ({schema_variant()} schemas) =====")
+    for agent, entry in sorted(agent_metrics.items()):
+        calls = max(1, entry['calls'])
+        print(f"{agent}: {entry['calls']} calls, {entry['completion_tokens'] / calls:.0f} completion tokens "
+              f"and {entry['total_time'] / calls:.2f}s per call, budget {completion_budget(agent) or 'unlimited'}, "
+              f"{entry['truncations']} cut off by the budget")
 
 # Define a backoff handler for API calls
 def backoff_handler(details):
@@ -156,51 +467,152 @@ def backoff_handler(details):
     
     increment_retry_count()
     print(f"Retrying API call (attempt {details['tries']})")
+    record_span("backoff", details.get("wait") or 0, tries=details["tries"], key_index=current_key_index)
+    
+    # Hold back every thread and worker process sharing the rate limit budget
+    limiter = get_rate_limiter()
+    if limiter is not None and type(details.get("exception")).__name__ == "RateLimitError":
+        limiter.pause(details.get("wait") or 0)
     
-    # Rotate to next API key
-    rotate_api_key()
+    # Rotate to next API key; configured endpoints rotate their own keys
+    if backend_pool is None:
+        rotate_api_key()
 
 # Define conditions for retrying
 def retry_if_rate_limit_or_api_error(exception):
     """Return True if we should retry, False otherwise"""
+    from openai import RateLimitError, APIError
     if isinstance(exception, (RateLimitError, APIError)):
         return True
     return False
 
+def with_retries(func):
+    """Retry rate limit, API and timeout errors with exponential backoff
+    
+    Retries stop once the current deadline (see sla.py) has passed, and no
+    backoff sleep runs past it. backoff and the OpenAI SDK are imported when
+    the wrapped function is first called rather than at import time.
+    """
+    retrying = None
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal retrying
+        if retrying is None:
+            import backoff
+            from openai import RateLimitError, APIError
+            retrying = backoff.on_exception(
+                backoff.expo, 
+                (RateLimitError, APIError, TimeoutError),
+                max_tries=10,  # Maximum number of attempts
+                max_time=remaining,  # Seconds left before the deadline, if any
+                giveup=lambda e: expired(),
+                on_backoff=backoff_handler,
+                jitter=backoff.full_jitter,  # Add randomness to the backoff
+                factor=1.5  # Multiply the base backoff by this factor
+            )(func)
+        return retrying(*args, **kwargs)
+    return wrapper
+
+class CompletionTruncated(Exception):
+    """Raised when an answer is cut off even with the raised completion budget"""
+
 class BaseAgent:
     """Base class for all specialized agents"""
     
+    # Inputs the agent depends on: diner fields, plus "reservation" for agents
+    # whose analysis is specific to a booking. Agents that do not depend on the
+    # reservation are diner-scoped and run once per diner.
+    inputs = ("name", "reviews", "reservations", "emails", "reservation")
+    
+    system_message = "You are a specialized agent for a restaurant. Return only valid JSON without markdown formatting or code blocks."
+    
+    # Models to try in order; later models are only used on escalation
+    models = [LARGE_MODEL]
+    
+    # Canonical output used to validate the shape of model responses
+    output_template: Optional[Dict] = None
+    
     def __init__(self, name: str, prompt_template: str):
         self.name = name
         self.prompt_template = prompt_template
+        self.models = model_route(name, self.models)
+        self.max_tokens = completion_budget(name)
+    
+    @property
+    def diner_scoped(self) -> bool:
+        """Whether the analysis depends only on the diner, not the booking"""
+        return "reservation" not in self.inputs
+    
+    def select_inputs(self, diner: Dict) -> Dict:
+        """Return only the diner fields this agent depends on"""
+        return {field: diner.get(field) for field in self.inputs if field != "reservation"}
     
-    @backoff.on_exception(
-        backoff.expo, 
-        (RateLimitError, APIError),
-        max_tries=10,  # Maximum number of attempts
-        on_backoff=backoff_handler,
-        jitter=backoff.full_jitter,  # Add randomness to the backoff
-        factor=1.5  # Multiply the base backoff by this factor
-    )
-    def _call_api(self, messages, temperature=0):
+    def stage_key(self, diner: Dict, reservation: Optional[Dict]) -> str:
+        """Key for this agent's output in the stage store
+        
+        Combines the prompt version with a hash of the inputs the agent reads,
+        so the key changes whenever either does. Diner-scoped agents ignore the
+        reservation, so the key depends only on the diner history.
+        """
+        inputs = {"diner": self.select_inputs(diner)}
+        if not self.diner_scoped:
+            inputs["reservation"] = strip_analysis(reservation)
+        return f"{prompt_version(self.system_message + self.prompt_template + ','.join(self.models))}:{content_hash(inputs)}"
+    
+    def prepass(self, diner: Dict, reservation: Dict) -> Optional[Dict]:
+        """Resolve the analysis locally when the inputs hold no relevant signal
+        
+        Subclasses override this with a deterministic rule. Returning a result
+        skips the API call; returning None sends the request to the model.
+        """
+        return None
+    
+    @with_retries
+    def _call_api(self, messages, temperature=0, model=LARGE_MODEL, logprobs=False, max_tokens=None):
         """Make an API call with automatic retry logic"""
-        start_time = time.time()
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                temperature=temperature
-            )
-            api_time = time.time() - start_time
-            
-            # Update metrics
-            update_token_usage(response.usage)
-            update_performance_metrics(api_time)
-            
-            return response
-        except Exception as e:
-            increment_error_count()
-            raise
+        # In a multi-restaurant run, wait for this restaurant's turn first
+        with call_slot() as slot:
+            limiter = get_rate_limiter()
+            if limiter is not None:
+                estimated_tokens = estimate_tokens(messages)
+                with span("rate_limit", tokens=estimated_tokens):
+                    limiter.acquire(estimated_tokens)
+            # Raises DeadlineExceeded without calling the API once the deadline has passed
+            timeout = call_timeout()
+            start_time = time.time()
+            with span("http", model=model, key_index=current_key_index, timeout=timeout) as http_span:
+                try:
+                    options = {"logprobs": True} if logprobs else {}
+                    if max_tokens:
+                        options["max_tokens"] = max_tokens
+                    response, endpoint = get_backend().complete(
+                        model,
+                        messages,
+                        temperature=temperature,
+                        timeout=timeout,
+                        **options
+                    )
+                    api_time = time.time() - start_time
+                
+                    # Update metrics
+                    if limiter is not None:
+                        limiter.settle(estimated_tokens, response.usage.total_tokens)
+                    update_token_usage(response.usage)
+                    update_performance_metrics(api_time, model, response.usage)
+                    update_agent_metrics(self.name, api_time, response.usage)
+                    slot.usage = response.usage
+                    http_span.set(
+                        endpoint=endpoint.name,
+                        prompt_tokens=response.usage.prompt_tokens,
+                        completion_tokens=response.usage.completion_tokens,
+                        cached_tokens=cached_prompt_tokens(response.usage)
+                    )
+                
+                    return response
+                except Exception as e:
+                    increment_error_count()
+                    raise
     
     def analyze(self, diner: Dict, reservation: Dict) -> Dict:
         """Run analysis on diner and reservation data
@@ -212,13 +624,39 @@ class BaseAgent:
         4. Tracks token usage and performance metrics
         5. Cleans and parses the JSON response
         
+        If the local pre-pass resolves the analysis, no API call is made.
+        Only the diner fields declared in `inputs` are sent to the model.
+        
         Args:
             diner: Dictionary containing diner information
-            reservation: Dictionary containing reservation information
+            reservation: Dictionary containing reservation information, or None
+                for diner-scoped agents
             
         Returns:
             Dictionary containing the agent's analysis or error information
         """
+        diner = self.select_inputs(diner)
+        if self.diner_scoped:
+            reservation = None
+        
+        local_result = self.prepass(diner, reservation)
+        if local_result is not None:
+            increment_prepass_skip(self.name)
+            current_span().set(prepass=True)
+            return local_result
+        
+        messages = self.render_messages(diner, reservation)
+        record_prompt(self.name, self.system_message, self.prompt_template,
+                      {"diner_info": diner, "reservation_info": reservation})
+        return self.complete(messages)
+    
+    def render_messages(self, diner: Dict, reservation: Optional[Dict]) -> List[Dict]:
+        """Build the chat messages for the inputs analyze() sends to the model
+        
+        Args:
+            diner: Diner fields already narrowed by select_inputs
+            reservation: Reservation dictionary, or None for diner-scoped agents
+        """
         # Create a safe version of the prompt with escaped braces
         safe_prompt = self.prompt_template.replace("{", "{{").replace("}", "}}")
         # Restore the actual placeholders we need
@@ -230,22 +668,71 @@ class BaseAgent:
             reservation_info=json.dumps(reservation, default=str)
         )
         
-        try:
-            messages = [
-                {"role": "system", "content": "You are a specialized agent for a restaurant. Return only valid JSON without markdown formatting or code blocks."},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response = self._call_api(messages)
-            
-            result = response.choices[0].message.content
-            
-            # Clean the response to extract valid JSON
-            cleaned_result = clean_json_response(result)
+        return [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def complete(self, messages: List[Dict], output_label: str = "agent") -> Dict:
+        """Send messages along the agent's model chain and parse the JSON result
+        
+        Every model but the last is asked for logprobs. Its answer is accepted
+        only if it parses, matches output_template and meets MIN_CONFIDENCE;
+        otherwise the request escalates to the next model in the chain.
+        
+        Each call is limited to the agent's completion budget. An answer cut
+        off by the budget is requested once more from the same model with
+        TRUNCATION_RETRY_FACTOR times the budget; if that is cut off too, the
+        attempt fails like an unparseable answer.
+        
+        Args:
+            messages: Chat messages to send
+            output_label: Name used in parse error messages
             
-            return json.loads(cleaned_result)
-        except json.JSONDecodeError:
-            # Fallback if the model doesn't return valid JSON
-            return {"error": "Failed to parse agent output", "raw_output": result}
-        except Exception as e:
-            return {"error": f"API error: {str(e)}"} 
\ No newline at end of file
+        Returns:
+            Dictionary containing the parsed output or error information
+        """
+        result = None
+        for attempt, model in enumerate(self.models):
+            is_last = attempt == len(self.models) - 1
+            with span("attempt", model=model, label=output_label) as attempt_span:
+                try:
+                    response = self._call_api(messages, model=model, logprobs=not is_last, max_tokens=self.max_tokens)
+                    if self.max_tokens and getattr(response.choices[0], "finish_reason", None) == "length":
+                        # A cut-off answer is not valid JSON; ask once more with a larger budget
+                        increment_truncation(self.name)
+                        attempt_span.set(truncated=True)
+                        retry_budget = self.max_tokens * TRUNCATION_RETRY_FACTOR
+                        response = self._call_api(messages, model=model, logprobs=not is_last, max_tokens=retry_budget)
+                        if getattr(response.choices[0], "finish_reason", None) == "length":
+                            increment_truncation(self.name)
+                            result = response.choices[0].message.content
+                            raise CompletionTruncated(f"{output_label} output cut off at {retry_budget} completion tokens")
+                    
+                    result = response.choices[0].message.content
+                    
+                    with span("parse"):
+                        # Clean the response to extract valid JSON
+                        cleaned_result = clean_json_response(result)
+                        
+                        parsed = json.loads(cleaned_result)
+                except json.JSONDecodeError:
+                    # Fallback if the model doesn't return valid JSON
+                    parsed = {"error": f"Failed to parse {output_label} output", "raw_output": result}
+                except CompletionTruncated as e:
+                    parsed = {"error": str(e), "raw_output": result}
+                except Exception as e:
+                    parsed = {"error": f"API error: {str(e)}"}
+                
+                # Past the deadline, escalating would only fail again
+                if is_last or ("error" in parsed and expired()):
+                    attempt_span.set(outcome="error" if "error" in parsed else "accepted")
+                    return parsed
+                
+                if validate_output(parsed, self.output_template):
+                    confidence = response_confidence(response)
+                    if confidence is None or confidence >= MIN_CONFIDENCE:
+                        attempt_span.set(outcome="accepted", confidence=confidence)
+                        return parsed
+                attempt_span.set(outcome="escalated")
+                increment_escalation(model)
@@ -0,0 +1,151 @@
+"""
+Persistent result caches for the restaurant multi-agent system.
+
+Results are stored as JSON keyed on a hash of everything that determines them,
+so a rerun can reuse analyses whose inputs have not changed.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .sla import remaining
+
+# The atomic file helper is shared with the data scripts in the parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+from atomic_file import write_json_atomic
+
+# Longest single wait for another caller's output, so deadlines are noticed
+FLIGHT_WAIT = 1.0
+
+def content_hash(value: Any) -> str:
+    """Return a stable hash of any JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+def prompt_version(prompt_template: str) -> str:
+    """Return a short version hash for a prompt template"""
+    return hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()[:12]
+
+class JsonCache:
+    """Thread-safe key/value cache persisted to a single JSON file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Any] = {}
+        self._updates: Dict[str, Any] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Ignoring unreadable cache {self.path}: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._updates[key] = value
+            self._dirty = True
+
+    def updates(self) -> Dict[str, Any]:
+        """Return the entries put since the cache was loaded"""
+        with self._lock:
+            return dict(self._updates)
+
+    def save(self):
+        """Persist the cache if anything changed since it was loaded"""
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json_atomic(self.path, self._entries)
+            self._dirty = False
+
+class StageStore:
+    """Persisted outputs of each pipeline stage, one cache file per stage
+
+    Keys include the stage's prompt version, so changing one prompt in
+    prompts.py only invalidates that stage; the others replay from storage.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._caches: Dict[str, JsonCache] = {}
+        self._flights: Dict[tuple, threading.Event] = {}
+
+    def _cache(self, stage: str) -> JsonCache:
+        with self._lock:
+            if stage not in self._caches:
+                self._caches[stage] = JsonCache(self.directory / f"{stage}.json")
+            return self._caches[stage]
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        return self._cache(stage).get(key)
+
+    def put(self, stage: str, key: str, value: Any):
+        self._cache(stage).put(key, value)
+
+    @contextmanager
+    def single_flight(self, stage: str, key: str):
+        """Yield the stored output for a key, or None if the caller should compute it
+
+        While one caller computes a key, others asking for the same key wait
+        for its put instead of making the same API calls. If it finishes
+        without a put (e.g. the stage failed), the next waiter computes the
+        key. A waiter whose deadline passes stops waiting and gets None.
+        """
+        cache = self._cache(stage)
+        flight = (stage, key)
+        while True:
+            with self._lock:
+                value = cache.get(key)
+                event = self._flights.get(flight) if value is None else None
+                if value is None and event is None:
+                    event = self._flights[flight] = threading.Event()
+                    break
+            if value is not None:
+                yield value
+                return
+            left = remaining()
+            if left is not None and left <= 0:
+                yield None
+                return
+            event.wait(FLIGHT_WAIT if left is None else min(FLIGHT_WAIT, left))
+        try:
+            yield None
+        finally:
+            with self._lock:
+                del self._flights[flight]
+            event.set()
+
+    def updates(self) -> Dict[str, Dict[str, Any]]:
+        """Return the outputs put since loading, by stage, e.g. to send from a worker process"""
+        with self._lock:
+            caches = dict(self._caches)
+        updates = {stage: cache.updates() for stage, cache in caches.items()}
+        return {stage: entries for stage, entries in updates.items() if entries}
+
+    def merge(self, updates: Dict[str, Dict[str, Any]]):
+        """Put the outputs from another store's updates()"""
+        for stage, entries in updates.items():
+            for key, value in entries.items():
+                self.put(stage, key, value)
+
+    def save(self):
+        with self._lock:
+            caches = list(self._caches.values())
+        for cache in caches:
+            cache.save()
@@ -0,0 +1,225 @@
+"""
+Local compression of diner text for the restaurant multi-agent system.
+
+Email threads and reviews are included in nearly every prompt for a diner:
+the diner-scoped agents, each reservation-scoped agent and the coordinator
+all get them. A few guests with long back-and-forth threads can dominate the
+prompt tokens of a whole run. `compress_diner` builds a prompt view of a diner
+that keeps the text agents act on:
+
+- Email threads lose quoted replies, reply headers, sign-offs, device
+  signatures and legal or mailing-list footers.
+- A sentence repeated across a diner's emails, or across their reviews, is
+  kept once.
+- Each thread and review, and each section as a whole, is capped. Over a cap,
+  sentences that mention allergies or diets, requests or occasions are kept
+  first, the rest fill the room left, and the result stays in original order.
+
+The rules are deterministic, so a view and the stage keys derived from it are
+stable across runs. Views are kept in the stage store under a hash of the
+diner's text, and the tokens removed are added to the run metrics. Set
+PROMPT_COMPRESSION=0 (or pass --no-compress) to prompt with the full text,
+e.g. to compare briefings with and without compression.
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .base import record_compression
+from .cache import StageStore, content_hash, prompt_version
+from .planner import count_tokens
+from .prepass import DIETARY_PATTERN
+from .routing import LARGE_MODEL
+
+ENABLED = os.environ.get("PROMPT_COMPRESSION", "1") != "0"
+
+# Caps in characters, per text and per section
+MAX_THREAD_CHARS = 1200
+MAX_REVIEW_CHARS = 600
+MAX_EMAIL_SECTION_CHARS = 4000
+MAX_REVIEW_SECTION_CHARS = 3000
+
+# Trailing lines after a sign-off that are treated as the signature
+SIGNATURE_LINES = 4
+
+# Stage store entries are keyed on the rules and caps as well as the text
+STAGE = "compression"
+COMPRESSION_VERSION = prompt_version(
+    f"2:{MAX_THREAD_CHARS}:{MAX_REVIEW_CHARS}:{MAX_EMAIL_SECTION_CHARS}:{MAX_REVIEW_SECTION_CHARS}:{SIGNATURE_LINES}"
+)
+
+# A line introducing a quoted or forwarded message
+REPLY_HEADER = re.compile(
+    r"^(?:On\b.{0,200}\bwrote:|-+\s*(?:Original|Forwarded) Message\s*-+|(?:From|Sent|To|Cc|Subject|Date):\s)",
+    re.IGNORECASE
+)
+SIGN_OFF = re.compile(
+    r"^(?:best|best regards|kind regards|warm regards|regards|warmly|cheers|sincerely|all the best|"
+    r"thanks|thanks so much|thanks again|many thanks|thank you|see you soon)[\s,.!]*$",
+    re.IGNORECASE
+)
+DEVICE_SIGNATURE = re.compile(r"^(?:sent from my|get outlook for)\b", re.IGNORECASE)
+# Legal and mailing-list footers; a paragraph with one of these is dropped whole
+BOILERPLATE = re.compile(
+    r"\bthis (?:e-?mail|message)\b.{0,80}\b(?:confidential|privileged|intended)|"
+    r"received this (?:e-?mail|message) in error|\bunsubscribe\b|\bprivacy policy\b|"
+    r"do not reply to this (?:e-?mail|message)",
+    re.IGNORECASE
+)
+
+# Sentences the agents act on, kept first when a cap is hit
+REQUEST_PATTERN = re.compile(
+    r"\b(?:request|please|could|would|can you|can we|prefer|arrange|table|seat|booth|window|patio|quiet|"
+    r"private|wheelchair|accessib|stroller|high ?chair|surprise|cake|dessert|candle|flower|wine|corkage|"
+    r"champagne|pairing|menu|parking|early|late|arriv)",
+    re.IGNORECASE
+)
+OCCASION_PATTERN = re.compile(
+    r"\b(?:birthday|anniversary|celebrat|engage|propos|wedding|honeymoon|graduat|promot|retire|"
+    r"valentine|reunion|farewell|christening|baby shower)",
+    re.IGNORECASE
+)
+PRIORITY_PATTERNS = (DIETARY_PATTERN, REQUEST_PATTERN, OCCASION_PATTERN)
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+def set_compression(enabled: bool):
+    """Turn prompt compression on or off for this process"""
+    global ENABLED
+    ENABLED = enabled
+
+def strip_thread(text: str) -> List[str]:
+    """Return the paragraphs of an email thread without quotes, signatures and footers"""
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", text):
+        lines = [
+            line for line in (raw.strip() for raw in block.splitlines())
+            if line and not line.startswith(">") and not REPLY_HEADER.match(line) and not DEVICE_SIGNATURE.match(line)
+        ]
+        if not lines or any(BOILERPLATE.search(line) for line in lines):
+            continue
+        # A sign-off ends the paragraph, along with the name lines after it
+        for idx, line in enumerate(lines):
+            if SIGN_OFF.match(line) and len(lines) - idx <= SIGNATURE_LINES:
+                lines = lines[:idx]
+                break
+        if lines:
+            paragraphs.append(" ".join(lines))
+    return paragraphs
+
+def split_sentences(paragraphs: List[str]) -> List[str]:
+    return [sentence for paragraph in paragraphs for sentence in SENTENCE_BREAK.split(paragraph) if sentence]
+
+def _normalize(sentence: str) -> str:
+    return " ".join(re.findall(r"\w+", sentence.lower()))
+
+def _priority(sentence: str) -> int:
+    return sum(1 for pattern in PRIORITY_PATTERNS if pattern.search(sentence))
+
+def _select(items: List[Tuple[int, Tuple[int, int], str]], cap: int) -> List[Tuple[int, Tuple[int, int], str]]:
+    """Keep the highest-priority (priority, position, sentence) items that fit the cap, in position order"""
+    if sum(len(sentence) + 1 for _, _, sentence in items) <= cap:
+        return items
+    kept = []
+    used = 0
+    for item in sorted(items, key=lambda item: (-item[0], item[1])):
+        size = len(item[2]) + 1
+        if used + size <= cap:
+            kept.append(item)
+            used += size
+    if not kept and items:
+        # Nothing fits whole: keep the start of the most relevant sentence
+        priority, position, sentence = min(items, key=lambda item: (-item[0], item[1]))
+        kept = [(priority, position, sentence[:cap])]
+    return sorted(kept, key=lambda item: item[1])
+
+def compress_section(texts: List[List[str]], text_cap: int, section_cap: int) -> List[str]:
+    """Deduplicate and cap the sentences of one section, returning one string per text
+
+    Args:
+        texts: Sentences of each text in the section (e.g. each email thread)
+        text_cap: Characters kept per text
+        section_cap: Characters kept across the section
+    """
+    seen = set()
+    per_text = []
+    for text_idx, sentences in enumerate(texts):
+        items = []
+        for sentence_idx, sentence in enumerate(sentences):
+            normalized = _normalize(sentence)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            items.append((_priority(sentence), (text_idx, sentence_idx), sentence))
+        per_text.append(_select(items, text_cap))
+
+    kept = _select([item for items in per_text for item in items], section_cap)
+    compressed = [[] for _ in texts]
+    for _, (text_idx, _), sentence in kept:
+        compressed[text_idx].append(sentence)
+    return [" ".join(sentences) for sentences in compressed]
+
+def _count(texts: List[str]) -> int:
+    return sum(count_tokens(text, LARGE_MODEL) for text in texts if text)
+
+def compress_texts(texts: Dict[str, List[str]]) -> Dict:
+    """Compress a diner's review contents and email threads
+
+    Returns:
+        Dictionary with the compressed "reviews" and "emails" lists, in input
+        order, and "tokens" before and after for each section
+    """
+    reviews = compress_section(
+        [split_sentences([" ".join(text.split())]) for text in texts["reviews"]],
+        MAX_REVIEW_CHARS, MAX_REVIEW_SECTION_CHARS
+    )
+    emails = compress_section(
+        [split_sentences(strip_thread(text)) for text in texts["emails"]],
+        MAX_THREAD_CHARS, MAX_EMAIL_SECTION_CHARS
+    )
+    return {
+        "reviews": reviews,
+        "emails": emails,
+        "tokens": {
+            "reviews_before": _count(texts["reviews"]),
+            "reviews_after": _count(reviews),
+            "emails_before": _count(texts["emails"]),
+            "emails_after": _count(emails)
+        }
+    }
+
+def compress_diner(diner: Dict, stage_store: Optional[StageStore] = None) -> Dict:
+    """Return the view of a diner used for prompting, with compressed reviews and emails
+
+    The diner itself is not modified. The view shares every other field with
+    it, so analyses are still attached to the original diner. With compression
+    turned off, or without any reviews or emails, the diner is returned as is.
+
+    Args:
+        diner: Dictionary containing diner information
+        stage_store: Optional persistent store; views are replayed from it by
+            the hash of the diner's text
+    """
+    reviews = diner.get("reviews") or []
+    emails = diner.get("emails") or []
+    if not ENABLED or not (reviews or emails):
+        return diner
+
+    texts = {
+        "reviews": [review.get("content") or "" for review in reviews],
+        "emails": [email.get("combined_thread") or "" for email in emails]
+    }
+    key = f"{COMPRESSION_VERSION}:{content_hash(texts)}"
+    compressed = stage_store.get(STAGE, key) if stage_store is not None else None
+    replayed = compressed is not None
+    if compressed is None:
+        compressed = compress_texts(texts)
+        if stage_store is not None:
+            stage_store.put(STAGE, key, compressed)
+    record_compression(compressed["tokens"], replayed)
+
+    view = dict(diner)
+    view["reviews"] = [dict(review, content=content) for review, content in zip(reviews, compressed["reviews"])]
+    view["emails"] = [dict(email, combined_thread=thread) for email, thread in zip(emails, compressed["emails"])]
+    return view
@@ -3,20 +3,110 @@ Coordinator agent for the restaurant multi-agent system.
 """
 
 import json
-import time
-from typing import Dict
+from typing import Dict, List
 from .base import (
     BaseAgent,
-    clean_json_response
+    strip_analysis
 )
-from .prompts import COORDINATOR_PROMPT
+from .attribution import record_prompt
+from .cache import content_hash, prompt_version
+from .prompts import COMPACT_COORDINATOR_SCHEMA, COORDINATOR_PROMPT
+from .routing import LARGE_MODEL, model_route, output_prompt
+
+# Shape of a valid coordinator briefing, as consumed by the timeline
+COORDINATOR_OUTPUT = {
+    "priority_alerts": [],
+    "guest_profile": {},
+    "service_recommendations": [],
+    "kitchen_notes": []
+}
+
+# Kitchen note tags for allergens and restrictions, as listed in COORDINATOR_PROMPT
+DIETARY_TAGS = {
+    "dairy free": ("dairy", "lactose", "milk", "cheese", "cream", "butter"),
+    "gluten free": ("gluten", "celiac", "coeliac", "wheat"),
+    "nut free": ("nut", "peanut", "almond", "cashew", "pecan", "pistachio", "hazelnut", "walnut")
+}
+
+def _dietary_tags(text: str) -> List[str]:
+    text = text.lower()
+    return [tag for tag, keywords in DIETARY_TAGS.items() if any(keyword in text for keyword in keywords)]
+
+def fallback_briefing(agent_results: Dict) -> Dict:
+    """Build a briefing locally from the specialized results, without the coordinator
+    
+    Used when the coordinator misses its budget or fails. Allergies and
+    restrictions become kitchen notes and alerts, and explicit requests and
+    occasions become service recommendations, so the huddle still sees the
+    safety-critical facts.
+    """
+    briefing = {"priority_alerts": [], "guest_profile": {}, "service_recommendations": [], "kitchen_notes": []}
+    dietary = agent_results.get("dietary_analysis") or {}
+    for allergy in dietary.get("allergies") or []:
+        item = str(allergy.get("item", ""))
+        briefing["priority_alerts"].append({"alert": f"Allergy: {item}", "category": "dietary", "for": "kitchen"})
+        briefing["kitchen_notes"].append({
+            "note": f"Allergy ({allergy.get('severity', 'unknown')}): {item}",
+            "dish": "all",
+            "tags": _dietary_tags(item),
+            "urgency": "red"
+        })
+    for restriction in dietary.get("dietary_restrictions") or []:
+        name = str(restriction.get("restriction", ""))
+        tags = _dietary_tags(name)
+        briefing["kitchen_notes"].append({
+            "note": f"Dietary restriction: {name}",
+            "dish": "all",
+            "tags": tags,
+            "urgency": "red" if tags else "orange"
+        })
+    for instruction in dietary.get("preparation_instructions") or []:
+        briefing["kitchen_notes"].append({
+            "note": str(instruction.get("instruction", "")),
+            "dish": str(instruction.get("dish", "")),
+            "tags": ["adjust dish"],
+            "urgency": "green"
+        })
+    
+    requests = agent_results.get("special_requests") or {}
+    for request in requests.get("explicit_requests") or []:
+        briefing["service_recommendations"].append({
+            "recommendation": str(request.get("request", "")),
+            "timing": "as requested",
+            "owner": "service"
+        })
+    for occasion in requests.get("special_occasions") or []:
+        briefing["priority_alerts"].append({
+            "alert": f"Occasion: {occasion.get('occasion', '')}",
+            "category": "experience",
+            "for": "service"
+        })
+    return briefing
 
 class CoordinatorAgent:
     """Agent that combines and prioritizes insights from specialized agents"""
     
+    system_message = "You are a coordinator agent for a restaurant. Return only valid JSON without markdown formatting or code blocks."
+    
     def __init__(self):
-        self.prompt_template = COORDINATOR_PROMPT
+        self.prompt_template = output_prompt(COORDINATOR_PROMPT, COMPACT_COORDINATOR_SCHEMA)
         self._base_agent = BaseAgent("Coordinator", "")  # Used for API calls
+        self._base_agent.models = model_route("Coordinator", [LARGE_MODEL])
+        self._base_agent.output_template = COORDINATOR_OUTPUT
+    
+    def stage_key(self, diner: Dict, reservation: Dict, agent_results: Dict) -> str:
+        """Key for the coordinator output in the stage store
+        
+        The specialized results are part of the key, so the coordinator reruns
+        when any upstream stage produced a different result.
+        """
+        inputs = {
+            "diner": diner,
+            "reservation": strip_analysis(reservation),
+            "agent_results": agent_results
+        }
+        models = ",".join(self._base_agent.models)
+        return f"{prompt_version(self.system_message + self.prompt_template + models)}:{content_hash(inputs)}"
     
     def coordinate(self, diner: Dict, reservation: Dict, agent_results: Dict) -> Dict:
         """Combine and prioritize insights from specialized agents
@@ -40,6 +130,13 @@ class CoordinatorAgent:
         Returns:
             Dictionary containing the consolidated briefing or error information
         """
+        messages = self.render_messages(diner, reservation, agent_results)
+        record_prompt("Coordinator", self.system_message, self.prompt_template,
+                      {"diner_info": diner, "reservation_info": reservation, **agent_results})
+        return self._base_agent.complete(messages, output_label="coordinator")
+    
+    def render_messages(self, diner: Dict, reservation: Dict, agent_results: Dict) -> List[Dict]:
+        """Build the chat messages coordinate() sends to the model"""
         # Create a safe version of the prompt with escaped braces
         safe_prompt = self.prompt_template.replace("{", "{{").replace("}", "}}")
         # Restore the actual placeholders we need
@@ -59,21 +156,7 @@ class CoordinatorAgent:
             personalization=json.dumps(agent_results["personalization"], default=str)
         )
         
-        try:
-            messages = [
-                {"role": "system", "content": "You are a coordinator agent for a restaurant. Return only valid JSON without markdown formatting or code blocks."},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response = self._base_agent._call_api(messages)
-            
-            result = response.choices[0].message.content
-            
-            # Clean the response to extract valid JSON
-            cleaned_result = clean_json_response(result)
-            
-            return json.loads(cleaned_result)
-        except json.JSONDecodeError:
-            return {"error": "Failed to parse coordinator output", "raw_output": result}
-        except Exception as e:
-            return {"error": f"API error: {str(e)}"} 
\ No newline at end of file
+        return [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": prompt}
+        ]
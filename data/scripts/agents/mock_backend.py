@@ -0,0 +1,207 @@
+"""
+Offline stand-in for the OpenAI chat completions client.
+
+`MockClient` answers `chat.completions.create` without the network. Each reply
+is the example JSON from the prompt it answers (see prompts.py), so responses
+parse, validate against the agents' output templates and have a realistic
+size, for the full and the compact schemas alike. Token usage is estimated at
+four characters per token, replies longer than max_tokens are cut off like a
+real model's, and small models get high-confidence logprobs so nothing
+escalates.
+
+Use it to run the pipeline at scale without keys or cost, e.g. for profiling:
+
+    python augment.py --mock --mock-latency 0.2 --no-cache --profile profile/
+
+`serve_mock` puts the same client behind an OpenAI-compatible HTTP server
+(`POST /v1/chat/completions`, `GET /v1/models`), so the real SDK, endpoint
+routing and health checks can be exercised locally:
+
+    python -m scripts.agents.mock_backend --port 8801 --latency 0.2
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+# Mean token probability reported in logprobs
+MOCK_CONFIDENCE = 0.95
+
+# The JSON format block of a prompt
+EXAMPLE_PATTERN = re.compile(r"```\n(.*?)```", re.S)
+
+class MockClient:
+    """Drop-in for `OpenAI()` that returns canned, well-formed responses
+
+    Calls that would take longer than their `timeout` raise TimeoutError
+    after it, like a stalled provider.
+
+    Args:
+        latency: Mean seconds per call; each call sleeps between half and one
+            and a half times this
+        seed: Seed for the latency jitter
+        slow_rate: Fraction of calls that take slow_latency instead
+        slow_latency: Seconds taken by a slow call
+        token_latency: Seconds added per completion token, as generation
+            is the slow part of a real call
+    """
+
+    def __init__(self, latency: float = 0.0, seed: int = 0, slow_rate: float = 0.0, slow_latency: float = 0.0,
+                 token_latency: float = 0.0):
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.token_latency = token_latency
+        self.random = random.Random(seed)
+        self.outputs = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _content(self, messages: List[Dict]) -> str:
+        example = EXAMPLE_PATTERN.search(messages[-1]["content"])
+        if not example:
+            return "{}"
+        if example.group(1) not in self.outputs:
+            self.outputs[example.group(1)] = json.dumps(json.loads(example.group(1)), indent=2)
+        return self.outputs[example.group(1)]
+
+    def delay(self, completion_tokens: int = 0) -> float:
+        """Draw the seconds a call generating this many tokens takes"""
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            return self.slow_latency
+        return self.latency * self.random.uniform(0.5, 1.5) + self.token_latency * completion_tokens
+
+    def create(self, model: str, messages: List[Dict], temperature: float = 0, logprobs: bool = False,
+               timeout: Optional[float] = None, max_tokens: Optional[int] = None, **kwargs):
+        response = self.respond(model, messages, logprobs, max_tokens)
+        delay = self.delay(response.usage.completion_tokens)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Mock call timed out after {timeout:.1f}s")
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def respond(self, model: str, messages: List[Dict], logprobs: bool = False, max_tokens: Optional[int] = None):
+        """Build the response to a call without waiting"""
+        content = self._content(messages)
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = max(1, len(content) // 4)
+        finish_reason = "stop"
+        if max_tokens and completion_tokens > max_tokens:
+            content = content[:max_tokens * 4]
+            completion_tokens = max_tokens
+            finish_reason = "length"
+        choice = SimpleNamespace(
+            message=SimpleNamespace(content=content),
+            finish_reason=finish_reason,
+            logprobs=SimpleNamespace(content=[SimpleNamespace(logprob=math.log(MOCK_CONFIDENCE))]) if logprobs else None
+        )
+        return SimpleNamespace(
+            model=model,
+            choices=[choice],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+def _response_json(response) -> Dict:
+    """Convert a MockClient response to the chat completions wire format"""
+    choice = response.choices[0]
+    logprobs = None
+    if choice.logprobs is not None:
+        logprobs = {"content": [
+            {"token": "", "logprob": token.logprob, "bytes": None, "top_logprobs": []}
+            for token in choice.logprobs.content
+        ]}
+    return {
+        "id": f"chatcmpl-mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": response.model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": choice.message.content},
+            "logprobs": logprobs,
+            "finish_reason": choice.finish_reason
+        }],
+        "usage": vars(response.usage)
+    }
+
+def make_handler(client: MockClient):
+    """Build a request handler class that answers with the given client"""
+    # random.Random is not thread-safe, and requests arrive on many threads
+    client_lock = threading.Lock()
+
+    class MockHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+            else:
+                self._send(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "Not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            response = client.respond(request.get("model", "mock"), request.get("messages", []), request.get("logprobs", False),
+                                      request.get("max_tokens"))
+            with client_lock:
+                delay = client.delay(response.usage.completion_tokens)
+            time.sleep(delay)
+            self._send(200, _response_json(response))
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockHandler
+
+def serve_mock(host: str = "127.0.0.1", port: int = 8801, **client_options) -> ThreadingHTTPServer:
+    """Start an OpenAI-compatible mock server in a background thread
+
+    Args:
+        host: Address to bind
+        port: Port to bind, or 0 for any free port (see server.server_address)
+        client_options: MockClient arguments, e.g. latency
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(MockClient(**client_options)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned chat completions over the OpenAI HTTP API")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8801, help="Port to bind (default: 8801)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds per call (default: 0)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of calls that take --slow-latency instead")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="Seconds taken by a slow call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds added per completion token (default: 0)")
+    args = parser.parse_args()
+    server = serve_mock(args.host, args.port, latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                        token_latency=args.token_latency)
+    print(f"Mock OpenAI endpoint at http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
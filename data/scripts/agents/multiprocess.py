@@ -0,0 +1,149 @@
+"""
+Multi-process execution for the restaurant multi-agent system.
+
+With enough network concurrency, a run is limited by its pure-Python work:
+Pydantic validation, prompt rendering, JSON encoding and decoding, and
+merging results all hold the GIL, so one process tops out at one core.
+`process_partitions` splits the diners across worker processes. Each worker
+validates its share and runs the usual diner and reservation thread pools
+(`process_reservations`) as its own I/O engine.
+
+- Diners are never split, so diner-scoped agents still run once per diner.
+  Partitions are balanced by reservation count.
+- Workers start with the parent's injected client (e.g. the mock backend),
+  endpoint pool, call timeout, compression and schema settings and rate limiter. The limiter's budgets live in
+  shared memory, so every process draws from the same requests and tokens
+  per minute.
+- Workers read the stage store but do not write it. Each returns its
+  augmented diners, the stage outputs it produced and its metrics, and the
+  parent merges them and saves once. Prompt token attribution is merged
+  the same way.
+
+Tracing and profiling cover the parent process only.
+"""
+
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import base, compression, routing, sla
+from .attribution import get_attribution, start_attribution
+from .base import merge_metrics, metrics_snapshot, reset_metrics, use_backends, use_client
+from .cache import StageStore
+from .ratelimit import get_rate_limiter, use_rate_limiter
+
+def partition_diners(diners: List[Dict], partitions: int) -> List[List[int]]:
+    """Split diner indices into partitions with about the same number of reservations
+
+    Returns:
+        Non-empty lists of diner indices, each in dataset order
+    """
+    # Largest diners first, each to the lightest partition so far
+    heap = [(0, partition) for partition in range(partitions)]
+    members = [[] for _ in range(partitions)]
+    by_size = sorted(range(len(diners)), key=lambda idx: -len(diners[idx].get("reservations") or []))
+    for diner_idx in by_size:
+        load, partition = heapq.heappop(heap)
+        members[partition].append(diner_idx)
+        heapq.heappush(heap, (load + max(1, len(diners[diner_idx].get("reservations") or [])), partition))
+    return [sorted(indices) for indices in members if indices]
+
+def _worker_settings() -> Dict:
+    """Collect the parent's API settings that a fresh worker process would not have"""
+    return {
+        # OpenAI clients hold connections, so workers build their own from the keys
+        "client": base.client if base.client is not None and not base.API_KEYS else None,
+        "backend_pool": base.backend_pool,
+        "call_timeout": sla.CALL_TIMEOUT,
+        "compression": compression.ENABLED,
+        "compact_schemas": routing.COMPACT_SCHEMAS,
+        "attribution": get_attribution() is not None,
+        "rate_limiter": get_rate_limiter()
+    }
+
+def _init_worker(settings: Dict):
+    if settings["client"] is not None:
+        use_client(settings["client"])
+    if settings["backend_pool"] is not None:
+        use_backends(settings["backend_pool"])
+    sla.set_call_timeout(settings["call_timeout"])
+    compression.set_compression(settings["compression"])
+    routing.set_compact_schemas(settings["compact_schemas"])
+    if settings["attribution"]:
+        start_attribution()
+    use_rate_limiter(settings["rate_limiter"])
+
+def _run_partition(diners: List[Dict], max_workers: int, stage_dir: Optional[str],
+                   budget: Optional[float], deadline: Optional[float]) -> Dict:
+    """Validate and brief one partition in a worker process"""
+    from load_data import DinersList
+    from .processor import process_reservations
+
+    augmented_diners = [diner.dict() for diner in DinersList.from_data({"diners": diners}).diners]
+    reset_metrics()
+    reservations_to_process = [
+        (diner_idx, res_idx)
+        for diner_idx, diner in enumerate(augmented_diners)
+        for res_idx in range(len(diner.get("reservations") or []))
+    ]
+    stage_store = StageStore(Path(stage_dir)) if stage_dir else None
+    analyses = process_reservations(augmented_diners, reservations_to_process, max_workers, stage_store,
+                                    budget, deadline)
+    for (diner_idx, res_idx), analysis in analyses.items():
+        augmented_diners[diner_idx]["reservations"][res_idx]["agent_analysis"] = analysis
+    return {
+        "diners": augmented_diners,
+        "stage_updates": stage_store.updates() if stage_store is not None else {},
+        "metrics": metrics_snapshot(),
+        "attribution": get_attribution().snapshot() if get_attribution() is not None else None
+    }
+
+def process_partitions(diners: List[Dict], processes: int, max_workers: int,
+                       stage_store: Optional[StageStore] = None, budget: Optional[float] = None,
+                       deadline: Optional[float] = None) -> List[Dict]:
+    """Brief every reservation of the diners across worker processes
+
+    Args:
+        diners: Raw diner dictionaries, as parsed from the dataset JSON
+        processes: Number of worker processes
+        max_workers: Maximum number of concurrent tasks in each process
+        stage_store: Optional stage store; workers replay from its directory
+            and their new outputs are merged into it
+        budget: Optional seconds each diner analysis and each reservation may take
+        deadline: Optional time.monotonic() time by which the run must finish.
+            The monotonic clock is system-wide, so it holds in every process
+
+    Returns:
+        The validated diners in dataset order, with agent_analysis attached
+        to each reservation that was briefed
+    """
+    partitions = partition_diners(diners, processes)
+    stage_dir = str(stage_store.directory) if stage_store is not None else None
+    augmented_diners: List[Optional[Dict]] = [None] * len(diners)
+
+    print(f"Briefing {len(diners)} diners in {len(partitions)} worker processes")
+    with ProcessPoolExecutor(
+        max_workers=len(partitions),
+        # Workers start clean rather than forking a parent that may hold thread locks
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(_worker_settings(),)
+    ) as executor:
+        future_to_partition = {
+            executor.submit(_run_partition, [diners[idx] for idx in indices], max_workers, stage_dir, budget, deadline): indices
+            for indices in partitions
+        }
+        for done, future in enumerate(as_completed(future_to_partition), 1):
+            indices = future_to_partition[future]
+            result = future.result()
+            for diner_idx, diner in zip(indices, result["diners"]):
+                augmented_diners[diner_idx] = diner
+            if stage_store is not None:
+                stage_store.merge(result["stage_updates"])
+            merge_metrics(result["metrics"])
+            if result["attribution"] is not None:
+                get_attribution().merge(result["attribution"])
+            print(f"[{done}/{len(partitions)}] Worker process finished {len(indices)} diners")
+    return augmented_diners
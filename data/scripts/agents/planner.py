@@ -0,0 +1,314 @@
+"""
+Dry-run planner for the restaurant multi-agent system.
+
+`plan_dataset` walks the dataset exactly as `augment_dataset` would, but
+instead of calling the API it renders each prompt that would be sent and
+counts its tokens locally. Stages replayed from the stage store and agents
+resolved by the local pre-pass are not counted. Completion tokens, latency
+and escalation rates come from the run history that `augment_dataset`
+records in the cache directory, with defaults when there is no history yet.
+
+Tokens are counted with tiktoken when it is installed, and estimated at four
+characters per token otherwise.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .base import agent_metrics, load_api_keys, model_metrics, metrics_lock
+from .cache import StageStore, write_json_atomic
+from .coordinator import CoordinatorAgent
+from .prepass import EMPTY_RESULTS
+from .routing import model_prices, schema_variant
+
+# Used for models with no recorded history
+DEFAULT_LATENCY = 4.0  # Seconds per call
+DEFAULT_COMPLETION_TOKENS = 400
+DEFAULT_ESCALATION_RATE = 0.2
+
+# Chat formatting overhead per message, as counted by the API
+TOKENS_PER_MESSAGE = 4
+
+# Per-key rate limits, used to bound the wall time estimate (unset means unlimited)
+RPM_LIMIT = os.environ.get("OPENAI_RPM_LIMIT")
+TPM_LIMIT = os.environ.get("OPENAI_TPM_LIMIT")
+
+_encoders = {}
+
+def count_tokens(text: str, model: str) -> int:
+    """Count tokens locally with tiktoken, or estimate them without it"""
+    if model not in _encoders:
+        try:
+            import tiktoken
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoders[model] = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _encoders[model] = None
+    encoder = _encoders[model]
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text))
+
+def count_message_tokens(messages: List[Dict], model: str) -> int:
+    """Count the prompt tokens of a list of chat messages"""
+    return sum(count_tokens(message["content"], model) + TOKENS_PER_MESSAGE for message in messages)
+
+def load_run_history(history_path) -> Dict:
+    """Load per-model totals recorded by previous runs"""
+    history_path = Path(history_path)
+    if not history_path.exists():
+        return {"models": {}}
+    with open(history_path) as f:
+        return json.load(f)
+
+def record_run_history(history_path):
+    """Add this run's per-model and per-agent latency, tokens and escalations to the history
+
+    Agent totals are kept per output schema variant, so print_agent_history
+    can compare the full and compact schemas.
+    """
+    history = load_run_history(history_path)
+    with metrics_lock:
+        for model, entry in model_metrics.items():
+            totals = history["models"].setdefault(model, {})
+            for field in ("calls", "total_time", "prompt_tokens", "completion_tokens", "escalations"):
+                totals[field] = totals.get(field, 0) + entry[field]
+        variant = history.setdefault("agents", {}).setdefault(schema_variant(), {})
+        for agent, entry in agent_metrics.items():
+            totals = variant.setdefault(agent, {})
+            for field in ("calls", "total_time", "completion_tokens", "truncations"):
+                totals[field] = totals.get(field, 0) + entry[field]
+    write_json_atomic(history_path, history, indent=2)
+
+def print_agent_history(history_path):
+    """Print completion tokens and latency per call for each agent and output schema variant on record"""
+    variants = load_run_history(history_path).get("agents") or {}
+    if not variants:
+        return
+    names = [name for name in ("full", "compact") if name in variants]
+    print("\n===== Completions by Agent, All Recorded Runs =====")
+    print(f"{'agent':<26}" + "".join(f" {name + ' tokens':>16} {name + ' s':>11}" for name in names))
+    for agent in sorted({agent for totals in variants.values() for agent in totals}):
+        row = f"{agent:<26}"
+        for name in names:
+            entry = variants[name].get(agent)
+            if entry and entry["calls"]:
+                row += f" {entry['completion_tokens'] / entry['calls']:>16.0f} {entry['total_time'] / entry['calls']:>11.2f}"
+            else:
+                row += f" {'-':>16} {'-':>11}"
+        print(row)
+
+class _ModelStats:
+    """Expected latency, completion length and escalation rate per model"""
+
+    def __init__(self, history: Dict):
+        self.history = history["models"]
+
+    def _entry(self, model: str) -> Optional[Dict]:
+        entry = self.history.get(model)
+        return entry if entry and entry.get("calls") else None
+
+    def latency(self, model: str) -> float:
+        entry = self._entry(model)
+        return entry["total_time"] / entry["calls"] if entry else DEFAULT_LATENCY
+
+    def completion_tokens(self, model: str) -> float:
+        entry = self._entry(model)
+        return entry["completion_tokens"] / entry["calls"] if entry else DEFAULT_COMPLETION_TOKENS
+
+    def escalation_rate(self, model: str) -> float:
+        entry = self._entry(model)
+        return entry["escalations"] / entry["calls"] if entry else DEFAULT_ESCALATION_RATE
+
+class _Plan:
+    """Running totals for a dry run"""
+
+    def __init__(self, stats: _ModelStats):
+        self.stats = stats
+        self.stages = {}
+        self.models = {}
+
+    def _stage(self, stage: str) -> Dict:
+        return self.stages.setdefault(stage, {"cached": 0, "prepass": 0, "requests": 0})
+
+    def replayed(self, stage: str):
+        self._stage(stage)["cached"] += 1
+
+    def resolved_locally(self, stage: str):
+        self._stage(stage)["prepass"] += 1
+
+    def request(self, stage: str, models: List[str], messages: List[Dict], extra_prompt_tokens: float = 0) -> float:
+        """Account for one request along a model chain; returns its expected latency"""
+        self._stage(stage)["requests"] += 1
+        reach = 1.0
+        latency = 0.0
+        for attempt, model in enumerate(models):
+            prompt_tokens = count_message_tokens(messages, model) + extra_prompt_tokens
+            entry = self.models.setdefault(model, {"calls": 0.0, "prompt_tokens": 0.0, "completion_tokens": 0.0})
+            entry["calls"] += reach
+            entry["prompt_tokens"] += reach * prompt_tokens
+            entry["completion_tokens"] += reach * self.stats.completion_tokens(model)
+            latency += reach * self.stats.latency(model)
+            if attempt < len(models) - 1:
+                reach *= self.stats.escalation_rate(model)
+        return latency
+
+def plan_dataset(input_path: str, max_workers: int = 8, cache_dir: Optional[str] = None,
+                 use_cache: bool = True, rpm_limit: Optional[int] = None,
+                 tpm_limit: Optional[int] = None) -> Dict:
+    """Estimate the calls, tokens, cost and wall time of augment_dataset without calling the API
+
+    This function:
+    1. Loads the dataset the same way augment_dataset does
+    2. For every stage, checks the stage store and the local pre-pass, and
+       renders the prompt of every stage that would reach the API
+    3. Counts prompt tokens locally and takes completion tokens, latency and
+       escalation rates from the recorded run history
+    4. Estimates wall time from the worker count, bounded below by the
+       per-key request and token rate limits
+
+    Coordinator prompts include the upstream results. When an upstream stage
+    would be called, its result is unknown; the empty result stands in and
+    that stage's expected completion length is added to the prompt.
+
+    Args:
+        input_path: Path to the input JSON file
+        max_workers: Worker count the run would use
+        cache_dir: Directory of the stage store and run history (default: data/.cache)
+        use_cache: Whether the run would replay cached stages
+        rpm_limit: Requests per minute per API key (default: OPENAI_RPM_LIMIT)
+        tpm_limit: Tokens per minute per API key (default: OPENAI_TPM_LIMIT)
+
+    Returns:
+        Dictionary with per-stage counts, per-model calls and tokens, cost and wall time
+    """
+    from .compression import compress_diner
+    from .processor import AGENT_CLASSES, resolve_paths
+    from load_data import DinersList
+
+    input_path, _, cache_dir = resolve_paths(input_path, cache_dir=cache_dir)
+
+    diners = [diner.dict() for diner in DinersList.load_from_json(str(input_path)).diners]
+    stage_store = StageStore(cache_dir / "stages") if use_cache else None
+    stats = _ModelStats(load_run_history(cache_dir / "history.json"))
+    plan = _Plan(stats)
+
+    agents = {result_key: agent_class() for result_key, agent_class in AGENT_CLASSES.items()}
+    coordinator = CoordinatorAgent()
+
+    def plan_stage(result_key: str, diner: Dict, reservation: Optional[Dict]):
+        """Return (known result or None, expected latency) for one specialized stage"""
+        agent = agents[result_key]
+        if stage_store is not None:
+            cached = stage_store.get(result_key, agent.stage_key(diner, reservation))
+            if cached is not None:
+                plan.replayed(result_key)
+                return cached, 0.0
+        inputs = agent.select_inputs(diner)
+        stage_reservation = None if agent.diner_scoped else reservation
+        if agent.prepass(inputs, stage_reservation) is not None:
+            plan.resolved_locally(result_key)
+            # The pre-pass answers without the API, so the full result is known
+            return agent.analyze(diner, reservation), 0.0
+        return None, plan.request(result_key, agent.models, agent.render_messages(inputs, stage_reservation))
+
+    diner_phase_time = 0.0
+    reservation_phase_time = 0.0
+    num_reservations = 0
+    for diner in diners:
+        if not diner.get("reservations"):
+            continue
+        diner = compress_diner(diner, stage_store)
+
+        diner_results = {}
+        diner_latency = 0.0
+        for result_key, agent in agents.items():
+            if agent.diner_scoped:
+                diner_results[result_key], latency = plan_stage(result_key, diner, None)
+                diner_latency += latency
+        diner_phase_time += diner_latency
+
+        for reservation in diner["reservations"]:
+            num_reservations += 1
+            agent_results = dict(diner_results)
+            agent_latency = 0.0
+            for result_key, agent in agents.items():
+                if not agent.diner_scoped:
+                    agent_results[result_key], latency = plan_stage(result_key, diner, reservation)
+                    agent_latency = max(agent_latency, latency)
+
+            unknown = [result_key for result_key, result in agent_results.items() if result is None]
+            if not unknown and stage_store is not None:
+                key = coordinator.stage_key(diner, reservation, agent_results)
+                if stage_store.get("coordinator", key) is not None:
+                    plan.replayed("coordinator")
+                    reservation_phase_time += agent_latency
+                    continue
+
+            placeholders = {key: EMPTY_RESULTS[key] if result is None else result for key, result in agent_results.items()}
+            messages = coordinator.render_messages(diner, reservation, placeholders)
+            models = coordinator._base_agent.models
+            extra_tokens = sum(stats.completion_tokens(agents[key].models[-1]) for key in unknown)
+            reservation_phase_time += agent_latency + plan.request("coordinator", models, messages, extra_tokens)
+
+    # Diners are analyzed in one pool, then reservations in a second
+    concurrency_time = (diner_phase_time + reservation_phase_time) / max(1, max_workers)
+
+    num_keys = max(1, len(load_api_keys()))
+    rpm_limit = rpm_limit or (int(RPM_LIMIT) if RPM_LIMIT else None)
+    tpm_limit = tpm_limit or (int(TPM_LIMIT) if TPM_LIMIT else None)
+    total_calls = sum(entry["calls"] for entry in plan.models.values())
+    total_tokens = sum(entry["prompt_tokens"] + entry["completion_tokens"] for entry in plan.models.values())
+    rate_limit_time = 0.0
+    if rpm_limit:
+        rate_limit_time = max(rate_limit_time, 60 * total_calls / (rpm_limit * num_keys))
+    if tpm_limit:
+        rate_limit_time = max(rate_limit_time, 60 * total_tokens / (tpm_limit * num_keys))
+
+    cost = 0.0
+    for model, entry in plan.models.items():
+        prompt_price, completion_price = model_prices(model)
+        cost += entry["prompt_tokens"] * prompt_price + entry["completion_tokens"] * completion_price
+
+    return {
+        "reservations": num_reservations,
+        "stages": plan.stages,
+        "models": plan.models,
+        "total_calls": total_calls,
+        "cost": cost,
+        "workers": max_workers,
+        "api_keys": num_keys,
+        "concurrency_time": concurrency_time,
+        "rate_limit_time": rate_limit_time,
+        "wall_time": max(concurrency_time, rate_limit_time),
+        "history": bool(stats.history)
+    }
+
+def print_plan(plan: Dict):
+    """Print a dry-run estimate"""
+    print("\n===== Run Plan =====")
+    print(f"Reservations: {plan['reservations']}")
+    print(f"Workers: {plan['workers']}, API keys: {plan['api_keys']}")
+    if not plan["history"]:
+        print("No run history yet; using default latency, completion length and escalation rate")
+
+    print("\n===== Stages =====")
+    for stage, counts in plan["stages"].items():
+        print(f"{stage}: {counts['requests']} requests, {counts['cached']} replayed, {counts['prepass']} resolved locally")
+
+    print("\n===== Expected Calls and Tokens =====")
+    for model, entry in plan["models"].items():
+        print(f"{model}: {entry['calls']:.0f} calls, {entry['prompt_tokens']:.0f} prompt / "
+              f"{entry['completion_tokens']:.0f} completion tokens")
+    print(f"Total API calls: {plan['total_calls']:.0f}")
+    print(f"Estimated cost: ${plan['cost']:.2f}")
+
+    print("\n===== Expected Wall Time =====")
+    print(f"From latency and workers: {plan['concurrency_time']:.0f} seconds")
+    if plan["rate_limit_time"]:
+        print(f"From rate limits: {plan['rate_limit_time']:.0f} seconds")
+    print(f"Estimate: {plan['wall_time']:.0f} seconds ({plan['wall_time'] / 60:.1f} minutes)")
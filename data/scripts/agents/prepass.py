@@ -0,0 +1,142 @@
+"""
+Deterministic local pre-pass for the restaurant multi-agent system.
+
+Each specialized agent has a rule here that inspects the diner and reservation
+data before any API call is made. When the inputs contain no signal the agent
+could act on, the rule returns the agent's canonical empty result so the call
+can be skipped entirely.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Keywords that indicate an allergy, intolerance or dietary restriction
+DIETARY_KEYWORDS = [
+    "allerg", "intoleran", "celiac", "coeliac", "anaphyla", "epipen",
+    "gluten", "dairy", "lactose", "nut", "peanut", "walnut", "almond", "cashew",
+    "pecan", "pistachio", "hazelnut", "shellfish", "crustacean", "shrimp",
+    "lobster", "crab", "oyster", "mussel", "clam", "scallop", "egg", "soy",
+    "sesame", "mustard", "sulfite", "vegan", "vegetarian", "pescatarian",
+    "kosher", "halal", "keto", "diabet", "sugar-free", "low-sodium",
+    "dietary", "restriction", "plant-based",
+    # Preferences and restrictions worded without a diet label
+    "spic", "mild", "alcohol", "avoid", "pregnan", "can't eat", "cannot eat",
+    "don't eat", "pork", "meat",
+]
+
+# Keywords match at the start of a word, so "nut" finds "nuts" but not "minute"
+DIETARY_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in DIETARY_KEYWORDS) + ")", re.IGNORECASE)
+
+# Canonical empty results, matching the JSON formats in prompts.py
+EMPTY_RESULTS = {
+    "dietary_analysis": {
+        "allergies": [],
+        "dietary_restrictions": [],
+        "preparation_instructions": []
+    },
+    "guest_experience": {
+        "past_impressions": [],
+        "service_preferences": {"style": "balanced", "evidence": "no reviews or emails on file"},
+        "conversation_topics": []
+    },
+    "special_requests": {
+        "explicit_requests": [],
+        "service_modifications": [],
+        "time_sensitive": [],
+        "special_occasions": []
+    },
+    "personalization": {
+        "personalization_opportunities": [],
+        "upsell_opportunities": [],
+        "recognition_moments": []
+    }
+}
+
+def empty_result(result_key: str) -> Dict:
+    """Return a fresh copy of the canonical empty result for an agent"""
+    empty = EMPTY_RESULTS[result_key]
+    return {key: (dict(value) if isinstance(value, dict) else []) for key, value in empty.items()}
+
+def _text_fields(diner: Dict) -> List[str]:
+    """Collect all free-text fields written by or about the diner"""
+    texts = []
+    for review in diner.get("reviews") or []:
+        texts.append(review.get("content", ""))
+    for email in diner.get("emails") or []:
+        texts.append(email.get("subject", ""))
+        texts.append(email.get("combined_thread", ""))
+    return texts
+
+# Version of the dietary pre-pass and seeding rules, part of the dietary agent's stage key
+SEED_VERSION = "3"
+
+def order_dietary_tags(reservation: Dict) -> Dict[str, List[str]]:
+    """Map each dietary tag on the reservation's orders to the dishes it was recorded on
+
+    The tags describe the dishes, not the diner: a guest who orders a vegan
+    dish is not thereby vegan.
+    """
+    tags = {}
+    for order in reservation.get("orders") or []:
+        for tag in order.get("dietary_tags") or []:
+            dishes = tags.setdefault(tag, [])
+            if order.get("item") and order["item"] not in dishes:
+                dishes.append(order["item"])
+    return tags
+
+def seed_dietary_analysis(diner: Dict, reservation: Dict) -> Dict:
+    """Build a dietary analysis containing only the dish properties known from dietary_tags
+
+    Each tagged dish on the booking gets a preparation instruction. Allergies
+    and restrictions of the diner are left empty, since only the diner's own
+    reviews and emails can state them.
+    """
+    result = empty_result("dietary_analysis")
+    for tag, dishes in order_dietary_tags(reservation).items():
+        for dish in dishes:
+            result["preparation_instructions"].append({
+                "dish": dish,
+                "instruction": f"Ordered as {tag}; ensure the dish is prepared {tag}"
+            })
+    return result
+
+def merge_dietary_seed(result: Dict, seed: Dict) -> Dict:
+    """Add seeded preparation instructions for dishes the model gave none for"""
+    if "error" in result:
+        return result
+    instructions = result.setdefault("preparation_instructions", [])
+    reported = {str(instruction.get("dish", "")).lower() for instruction in instructions}
+    for instruction in seed["preparation_instructions"]:
+        if instruction["dish"].lower() not in reported:
+            instructions.append(instruction)
+    return result
+
+def dietary_prepass(diner: Dict, reservation: Dict) -> Optional[Dict]:
+    """Resolve the dietary analysis locally when no text mentions dietary needs
+
+    Returns the seeded result (empty when there are no dietary_tags) if no review
+    or email contains an allergen or diet keyword, otherwise None.
+    """
+    if any(DIETARY_PATTERN.search(text) for text in _text_fields(diner)):
+        return None
+    return seed_dietary_analysis(diner, reservation)
+
+def guest_experience_prepass(diner: Dict, reservation: Dict) -> Optional[Dict]:
+    """Skip guest experience analysis for diners with no reviews or emails"""
+    if diner.get("reviews") or diner.get("emails"):
+        return None
+    return empty_result("guest_experience")
+
+def special_requests_prepass(diner: Dict, reservation: Dict) -> Optional[Dict]:
+    """Skip special requests analysis for diners with no email text"""
+    if any(email.get("combined_thread", "").strip() for email in diner.get("emails") or []):
+        return None
+    return empty_result("special_requests")
+
+def personalization_prepass(diner: Dict, reservation: Dict) -> Optional[Dict]:
+    """Skip personalization for diners with no reviews, emails or order history"""
+    if diner.get("reviews") or diner.get("emails"):
+        return None
+    if any(res.get("orders") for res in diner.get("reservations") or []) or reservation.get("orders"):
+        return None
+    return empty_result("personalization")
@@ -4,10 +4,11 @@ Reservation processing logic for the restaurant multi-agent system.
 
 import json
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from contextlib import nullcontext
 from datetime import date
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 import sys
 
 from .specialized import (
@@ -16,143 +17,418 @@ from .specialized import (
     SpecialRequestsAgent,
     PersonalizationAgent
 )
-from .coordinator import CoordinatorAgent
-from .base import reset_metrics, print_metrics
+from .coordinator import CoordinatorAgent, fallback_briefing
+from .base import (
+    reset_metrics,
+    print_metrics,
+    increment_degraded,
+    increment_diner_analysis,
+    increment_stage_replay,
+    load_api_keys
+)
+from .cache import StageStore
+from .compression import compress_diner
+from .prepass import empty_result, seed_dietary_analysis
+from .planner import RPM_LIMIT, TPM_LIMIT, print_agent_history, record_run_history
+from .profiling import phase
+from .ratelimit import run_rate_limiter, use_rate_limiter
+from .sla import DEADLINE_GRACE, SPECIALIST_SHARE, deadline_scope, remaining
+from .tracing import in_current_context, span
 
-# Import the data models
+# Import the data modules. DinersList (and Pydantic) is imported by
+# augment_dataset, so importing this package stays cheap.
 try:
     sys.path.append(str(Path(__file__).parent.parent))
-    from load_data import DinersList
+    from analytics.aggregates import update_aggregates
+    from analytics.timeline import build_timeline_index
 except ImportError as e:
-    print(f"Error importing load_data: {e}")
+    print(f"Error importing data modules: {e}")
     sys.exit(1)
 
-def process_reservation(diner: Dict, reservation: Dict) -> Dict:
-    """Process a single reservation with all agents"""
-    
-    # Initialize agents
-    dietary_agent = DietaryAnalysisAgent()
-    experience_agent = GuestExperienceAgent()
-    requests_agent = SpecialRequestsAgent()
-    personalization_agent = PersonalizationAgent()
-    coordinator = CoordinatorAgent()
-    
-    # Run specialized agents in parallel with more workers
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        dietary_future = executor.submit(dietary_agent.analyze, diner, reservation)
-        experience_future = executor.submit(experience_agent.analyze, diner, reservation)
-        requests_future = executor.submit(requests_agent.analyze, diner, reservation)
-        personalization_future = executor.submit(personalization_agent.analyze, diner, reservation)
+# Specialized agents keyed by the name of their result in agent_analysis
+AGENT_CLASSES = {
+    "dietary_analysis": DietaryAnalysisAgent,
+    "guest_experience": GuestExperienceAgent,
+    "special_requests": SpecialRequestsAgent,
+    "personalization": PersonalizationAgent
+}
+
+def run_stage(stage: str, agent, diner: Dict, reservation: Optional[Dict],
+              stage_store: Optional[StageStore] = None) -> Dict:
+    """Run one specialized agent, replaying its output from the stage store if possible"""
+    with span("agent", stage=stage) as stage_span:
+        if stage_store is None:
+            result = agent.analyze(diner, reservation)
+            stage_span.set(outcome="error" if "error" in result else "ok")
+            return result
         
-        # Collect results
-        agent_results = {
-            "dietary_analysis": dietary_future.result(),
-            "guest_experience": experience_future.result(),
-            "special_requests": requests_future.result(),
-            "personalization": personalization_future.result()
-        }
+        key = agent.stage_key(diner, reservation)
+        # Concurrent runs needing the same output (e.g. restaurants sharing a diner) make one call
+        with stage_store.single_flight(stage, key) as cached:
+            if cached is not None:
+                increment_stage_replay(stage)
+                stage_span.set(outcome="replayed")
+                return cached
+            
+            result = agent.analyze(diner, reservation)
+            stage_span.set(outcome="error" if "error" in result else "ok")
+            if "error" not in result:
+                stage_store.put(stage, key, result)
+            return result
+
+def analyze_diner(diner: Dict, stage_store: Optional[StageStore] = None, budget: Optional[float] = None) -> Dict:
+    """Run the diner-scoped agents once for a diner
+    
+    Results are replayed from the stage store when the diner's history and the
+    agent's prompt are unchanged, so a repeat diner costs no API calls across runs.
+    
+    Args:
+        diner: Dictionary containing diner information, as prepared for
+            prompting by compress_diner
+        stage_store: Optional persistent store of stage outputs
+        budget: Optional seconds the diner-scoped agents may take in total
+        
+    Returns:
+        Dictionary of diner-scoped agent results keyed like agent_analysis
+    """
+    results = {}
+    with span("diner", diner=diner["name"]), deadline_scope(budget):
+        for result_key, agent_class in AGENT_CLASSES.items():
+            agent = agent_class()
+            if not agent.diner_scoped:
+                continue
+            
+            cache_hit = stage_store is not None and stage_store.get(result_key, agent.stage_key(diner, None)) is not None
+            results[result_key] = run_stage(result_key, agent, diner, None, stage_store)
+            increment_diner_analysis(cache_hit=cache_hit)
+    return results
+
+def substitute_result(result_key: str, diner: Dict, reservation: Dict) -> Dict:
+    """Stand-in for a missing specialized result: the facts known locally, otherwise empty"""
+    if result_key == "dietary_analysis":
+        return seed_dietary_analysis(diner, reservation)
+    return empty_result(result_key)
+
+def process_reservation(diner: Dict, reservation: Dict, diner_results: Optional[Dict] = None,
+                        stage_store: Optional[StageStore] = None, budget: Optional[float] = None) -> Dict:
+    """Process a single reservation with all agents
     
-    # Coordinate results
-    coordinator_result = coordinator.coordinate(diner, reservation, agent_results)
+    Each stage is keyed on its prompt version and inputs. With a stage store,
+    stages whose key is unchanged replay their stored output, so a change to
+    COORDINATOR_PROMPT alone only reruns the coordinator.
+    
+    With a budget, the specialized agents get the first SPECIALIST_SHARE of it
+    and the coordinator the rest. A specialized agent that fails or misses its
+    share is left out; the coordinator briefs on the other results, with the
+    facts known locally standing in for the missing ones. If the coordinator
+    itself fails or runs out of time, fallback_briefing builds the briefing
+    locally. Either way the briefing is marked "degraded".
+    
+    Args:
+        diner: Dictionary containing diner information, as prepared for
+            prompting by compress_diner
+        reservation: Dictionary containing reservation information
+        diner_results: Diner-scoped results already computed for this diner;
+            computed here when not provided
+        stage_store: Optional persistent store of stage outputs
+        budget: Optional seconds the reservation may take, within any
+            enclosing run deadline
+    """
+    with span("reservation", diner=diner["name"], date=str(reservation["date"]), time=reservation.get("time")), \
+            deadline_scope(budget):
+        if diner_results is None:
+            diner_results = analyze_diner(diner, stage_store)
+        
+        coordinator = CoordinatorAgent()
+        
+        # The specialized agents get the first part of the time left, the coordinator the rest
+        left = remaining()
+        specialist_deadline = time.monotonic() + max(0.0, left) * SPECIALIST_SHARE if left is not None else None
+        
+        # Run the remaining specialized agents in parallel
+        executor = ThreadPoolExecutor(max_workers=len(AGENT_CLASSES), thread_name_prefix="agents")
+        try:
+            with deadline_scope(at=specialist_deadline):
+                futures = {
+                    result_key: executor.submit(in_current_context(run_stage), result_key, agent_class(), diner, reservation, stage_store)
+                    for result_key, agent_class in AGENT_CLASSES.items()
+                    if result_key not in diner_results
+                }
+            
+            # Collect results in the standard order
+            agent_results = {}
+            for result_key in AGENT_CLASSES:
+                if result_key in diner_results:
+                    agent_results[result_key] = diner_results[result_key]
+                    continue
+                timeout = None if specialist_deadline is None else max(0.0, specialist_deadline - time.monotonic()) + DEADLINE_GRACE
+                try:
+                    agent_results[result_key] = futures[result_key].result(timeout=timeout)
+                except FutureTimeoutError:
+                    agent_results[result_key] = {"error": "Timed out: missed the reservation budget"}
+        finally:
+            # A straggler's calls end at its deadline, so it is not waited for
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        missing = [result_key for result_key, result in agent_results.items() if "error" in result]
+        coordinator_inputs = {
+            result_key: substitute_result(result_key, diner, reservation) if result_key in missing else result
+            for result_key, result in agent_results.items()
+        }
+        
+        # Coordinate results
+        with span("agent", stage="coordinator") as coordinator_span:
+            coordinator_key = coordinator.stage_key(diner, reservation, coordinator_inputs)
+            flight = stage_store.single_flight("coordinator", coordinator_key) if stage_store is not None else nullcontext()
+            with flight as coordinator_result:
+                if coordinator_result is not None:
+                    increment_stage_replay("coordinator")
+                    coordinator_span.set(outcome="replayed")
+                else:
+                    coordinator_result = coordinator.coordinate(diner, reservation, coordinator_inputs)
+                    coordinator_span.set(outcome="error" if "error" in coordinator_result else "ok")
+                    if stage_store is not None and "error" not in coordinator_result:
+                        stage_store.put("coordinator", coordinator_key, coordinator_result)
+            
+            coordinator_fallback = "error" in coordinator_result
+            if coordinator_fallback:
+                coordinator_result = fallback_briefing(coordinator_inputs)
+                coordinator_span.set(outcome="fallback")
     
     # Combine all results
-    return {
+    analysis = {
         "agent_analysis": agent_results,
         "coordinator_summary": coordinator_result
     }
+    if missing or coordinator_fallback:
+        analysis["degraded"] = {"missing_stages": missing, "coordinator_fallback": coordinator_fallback}
+        increment_degraded(missing, coordinator_fallback)
+    return analysis
+
+def resolve_paths(input_path, output_path=None, cache_dir=None) -> Tuple[Path, Optional[Path], Path]:
+    """Resolve relative dataset paths against the data directory
+    
+    Returns:
+        (input path, output path or None, cache directory, default data/.cache)
+    """
+    data_dir = Path(__file__).parent.parent.parent
+    input_path = Path(input_path)
+    if not input_path.is_absolute():
+        input_path = data_dir / input_path
+    
+    if output_path is not None:
+        output_path = Path(output_path)
+        if not output_path.is_absolute():
+            output_path = data_dir / output_path
+    
+    cache_dir = Path(cache_dir) if cache_dir else data_dir / ".cache"
+    return input_path, output_path, cache_dir
+
+def process_reservations(augmented_diners: List[Dict], reservations_to_process: List[Tuple[int, int]],
+                         max_workers: int = 8, stage_store: Optional[StageStore] = None,
+                         budget: Optional[float] = None, deadline: Optional[float] = None) -> Dict[Tuple[int, int], Dict]:
+    """Run the pipeline for the given reservations
+    
+    Each diner's reviews and emails are compressed once (see compression.py),
+    the diner-scoped agents run once per diner, then each reservation is
+    processed in parallel, sharing its diner's results. The diners are not
+    modified; results are returned so they can be attached once every task is
+    done, and agents never see a sibling's analysis.
+    
+    Once the deadline passes no more API calls are made. Reservations still
+    pending are briefed from the stage store, the local pre-pass and the
+    fallback briefing, so each one gets a briefing marked degraded rather
+    than none.
+    
+    Args:
+        augmented_diners: Diner dictionaries, shared by reference with every task
+        reservations_to_process: (diner index, reservation index) pairs
+        max_workers: Maximum number of concurrent tasks
+        stage_store: Optional persistent store of stage outputs
+        budget: Optional seconds each diner analysis and each reservation may take
+        deadline: Optional time.monotonic() time by which the run must finish
+        
+    Returns:
+        Dictionary mapping (diner index, reservation index) to the analysis of
+        each reservation that was processed successfully
+    """
+    # Tasks submitted below inherit the run deadline
+    with deadline_scope(at=deadline):
+        # Run diner-scoped agents once per diner before any reservation is coordinated
+        diner_indices = sorted({diner_idx for diner_idx, _ in reservations_to_process})
+        
+        # Agents are prompted with each diner's compressed view; analyses go on the original diners
+        with phase("compress"):
+            prompt_diners = {diner_idx: compress_diner(augmented_diners[diner_idx], stage_store) for diner_idx in diner_indices}
+        
+        diner_results = {}
+        with phase("diners"), ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="diners") as executor:
+            future_to_diner = {
+                executor.submit(in_current_context(analyze_diner), prompt_diners[diner_idx], stage_store, budget): diner_idx
+                for diner_idx in diner_indices
+            }
+            for future in as_completed(future_to_diner):
+                diner_results[future_to_diner[future]] = future.result()
+    
+        # Process reservations in parallel
+        analyses = {}
+        with phase("reservations"), ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reservations") as executor:
+            # Submit all tasks
+            future_to_reservation = {
+                executor.submit(
+                    in_current_context(process_reservation),
+                    prompt_diners[diner_idx],
+                    prompt_diners[diner_idx]["reservations"][res_idx],
+                    diner_results[diner_idx],
+                    stage_store,
+                    budget
+                ): (diner_idx, res_idx)
+                for diner_idx, res_idx in reservations_to_process
+            }
+        
+            # Process results as they complete
+            for i, future in enumerate(as_completed(future_to_reservation)):
+                diner_idx, res_idx = future_to_reservation[future]
+                diner_name = augmented_diners[diner_idx]["name"]
+                reservation_date = augmented_diners[diner_idx]["reservations"][res_idx]["date"]
+            
+                try:
+                    analyses[(diner_idx, res_idx)] = future.result()
+                    print(f"[{i+1}/{len(reservations_to_process)}] Processed reservation for {diner_name} on {reservation_date}")
+                except Exception as e:
+                    print(f"Error processing reservation for {diner_name}: {e}")
+    
+    if deadline is not None and time.monotonic() >= deadline:
+        print("Run deadline reached: the remaining reservations were briefed without new API calls")
+    return analyses
+
+def save_augmented(augmented_diners: List[Dict], input_path: Path, output_path: Path):
+    """Write the augmented dataset and refresh the indexes derived from it
+    
+    The output replaces the previous file only once it has been fully written,
+    so readers never see a partial dataset.
+    """
+    from load_data import write_diners_json
+    
+    print(f"Saving augmented data to: {output_path}")
+    write_diners_json(augmented_diners, output_path)
+    
+    # Write the per-service timeline index next to the output
+    build_timeline_index(augmented_diners, output_path)
+    
+    # Refresh the precomputed dashboard aggregates for the input dataset
+    update_aggregates(input_path)
 
-def augment_dataset(input_path: str, output_path: str, max_workers: int = 8):
+def augment_dataset(input_path: str, output_path: str, max_workers: int = 8, cache_dir: Optional[str] = None,
+                    use_cache: bool = True, budget: Optional[float] = None, deadline: Optional[float] = None,
+                    processes: int = 1, rpm_limit: Optional[int] = None, tpm_limit: Optional[int] = None):
     """Process the entire dataset and add agent analysis to each reservation
     
     This function:
     1. Loads the diner data from the input file
     2. Identifies all future reservations that need processing
-    3. Processes each reservation in parallel using ThreadPoolExecutor
-    4. Updates the original data with the agent analysis results
-    5. Saves the augmented data to the output file
-    6. Reports performance metrics
+    3. Runs the diner-scoped agents once per diner with reservations to process
+    4. Processes each reservation in parallel using ThreadPoolExecutor, sharing
+       the diner-scoped results between all of a diner's reservations
+    5. Updates the original data with the agent analysis results
+    6. Saves the augmented data to the output file
+    7. Writes the per-service timeline index for the output file
+    8. Refreshes the dashboard aggregates for the input dataset
+    9. Reports performance metrics and adds them to the run history used by
+       plan_dataset, then compares completions per agent across the output
+       schema variants on record
     
     The parallelization happens at two levels:
     - Multiple reservations are processed concurrently (controlled by max_workers)
     - For each reservation, the specialized agents run in parallel
     
+    With processes > 1 the diners are also split across worker processes
+    (see multiprocess.py), each validating its share and running both levels
+    with max_workers. Every thread and process shares one rate limit budget.
+    
     Args:
         input_path: Path to the input JSON file
         output_path: Path to save the augmented JSON file
         max_workers: Maximum number of concurrent reservation processing tasks
+        cache_dir: Directory for persistent stage outputs (default: data/.cache)
+        use_cache: Replay unchanged stages from the cache directory
+        budget: Optional seconds each reservation may take before its briefing
+            is completed with the results available
+        deadline: Optional time.monotonic() time by which the run must finish;
+            completed work is saved and the rest briefed without the API
+        processes: Number of worker processes; 1 runs everything in this process
+        rpm_limit: Requests per minute per API key (default: OPENAI_RPM_LIMIT)
+        tpm_limit: Tokens per minute per API key (default: OPENAI_TPM_LIMIT)
     """
     
     # Resolve paths to be absolute if they're relative
-    data_dir = Path(__file__).parent.parent.parent
-    input_path = Path(input_path)
-    if not input_path.is_absolute():
-        input_path = data_dir / input_path
+    input_path, output_path, cache_dir = resolve_paths(input_path, output_path, cache_dir)
     
-    output_path = Path(output_path)
-    if not output_path.is_absolute():
-        output_path = data_dir / output_path
+    from load_data import DinersList
     
     print(f"Loading data from: {input_path}")
     
-    # Load data
-    diners_list = DinersList.load_from_json(str(input_path))
+    # Throttle API calls to the configured per-key limits
+    use_rate_limiter(run_rate_limiter(
+        rpm_limit or (int(RPM_LIMIT) if RPM_LIMIT else None),
+        tpm_limit or (int(TPM_LIMIT) if TPM_LIMIT else None),
+        len(load_api_keys())
+    ))
+    
+    # Load and validate the data, then keep one plain-dict copy of each diner.
+    # Every reservation task shares that copy by reference. Worker processes
+    # validate their own partitions, so in multi-process runs the parent only parses.
+    with phase("load"):
+        if processes > 1:
+            with open(input_path) as f:
+                augmented_diners = json.load(f)["diners"]
+        else:
+            augmented_diners = [diner.dict() for diner in DinersList.load_from_json(str(input_path)).diners]
     
     # Reset metrics
     reset_metrics()
     
-    # Collect all future reservations to process
+    # Collect all future reservations to process as (diner index, reservation index)
     reservations_to_process = []
-    for diner_idx, diner in enumerate(diners_list.diners):
-        diner_dict = diner.dict()
-        
-        if diner.reservations:
-            for res_idx, reservation in enumerate(diner.reservations):
-                reservation_dict = reservation.dict()
-                
-                # TODO: Remove
-                # test 3 reservations
-                # today = date.today()
-                # if reservation.date >= today:
-                #     reservations_to_process.append((diner_idx, res_idx, diner_dict, reservation_dict))
-                reservations_to_process.append((diner_idx, res_idx, diner_dict, reservation_dict))
+    for diner_idx, diner in enumerate(augmented_diners):
+        for res_idx, reservation in enumerate(diner.get("reservations") or []):
+            # TODO: Remove
+            # test 3 reservations
+            # today = date.today()
+            # if reservation["date"] >= today:
+            #     reservations_to_process.append((diner_idx, res_idx))
+            reservations_to_process.append((diner_idx, res_idx))
     
     print(f"Found {len(reservations_to_process)} future reservations to process")
     
     # Process reservations in parallel batches
     start_time = time.time()
     
-    # Create a copy of the diners list for modification
-    augmented_diners = [diner.dict() for diner in diners_list.diners]
-    
-    # Process reservations in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_reservation = {
-            executor.submit(process_reservation, diner_dict, reservation_dict): (diner_idx, res_idx)
-            for diner_idx, res_idx, diner_dict, reservation_dict in reservations_to_process
-        }
-        
-        # Process results as they complete
-        for i, future in enumerate(as_completed(future_to_reservation)):
-            diner_idx, res_idx = future_to_reservation[future]
-            diner_name = augmented_diners[diner_idx]["name"]
-            reservation_date = augmented_diners[diner_idx]["reservations"][res_idx]["date"]
+    stage_store = StageStore(cache_dir / "stages") if use_cache else None
+    with span("run", reservations=len(reservations_to_process), workers=max_workers, processes=processes):
+        if processes > 1:
+            from .multiprocess import process_partitions
+            augmented_diners = process_partitions(augmented_diners, processes, max_workers, stage_store,
+                                                  budget, deadline)
+            total_time = time.time() - start_time
+        else:
+            analyses = process_reservations(augmented_diners, reservations_to_process, max_workers, stage_store,
+                                            budget, deadline)
             
-            try:
-                analysis = future.result()
+            total_time = time.time() - start_time
+            
+            for (diner_idx, res_idx), analysis in analyses.items():
                 augmented_diners[diner_idx]["reservations"][res_idx]["agent_analysis"] = analysis
-                print(f"[{i+1}/{len(reservations_to_process)}] Processed reservation for {diner_name} on {reservation_date}")
-            except Exception as e:
-                print(f"Error processing reservation for {diner_name}: {e}")
-    
-    total_time = time.time() - start_time
-    
-    # Save augmented data
-    print(f"Saving augmented data to: {output_path}")
-    with open(output_path, "w") as f:
-        json.dump({"diners": augmented_diners}, f, indent=2, default=str)
+        
+        with span("save"), phase("save"):
+            if stage_store is not None:
+                stage_store.save()
+            
+            save_augmented(augmented_diners, input_path, output_path)
     
-    # Print performance metrics
+    # Print performance metrics and keep them for planning future runs
     print_metrics(total_time, len(reservations_to_process))
+    record_run_history(cache_dir / "history.json")
+    print_agent_history(cache_dir / "history.json")
     
     print(f"Augmented dataset saved to {output_path}") 
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""
+Multi-thread CPU profiling for the restaurant multi-agent system.
+
+A plain cProfile run does not work for this pipeline: from Python 3.12 it
+sees every thread through one shared call stack, which scrambles total times
+once the worker pools interleave, and a second profiler cannot run alongside
+it. Two profilers are available instead:
+
+- With yappi installed (`pip install yappi`), every thread is profiled
+  deterministically against its own CPU clock. Self and total CPU per function
+  are exact, and the raw output is saved as `profile.pstat`, which snakeviz,
+  flameprof and gprof2dot read.
+- Otherwise a sampler records the stack of every thread at a fixed interval
+  and weights each sample by the CPU that thread used since the previous one,
+  read from its per-thread clock. Blocked threads cost nothing, but a short
+  burst of CPU just before a thread blocks is charged to where it blocked.
+  The raw output is `cpu.folded` (stacks weighted by CPU microseconds) and
+  `wall.folded` (by sample count, including waiting threads), the
+  collapsed-stack format read by flamegraph.pl, inferno and speedscope.
+
+Either way the profile shows where CPU goes across all workers (prompt
+rendering, JSON encoding and parsing, dict copies, the final write) and how
+it splits between thread pools. Phases of a run (load, diners, reservations,
+save) record process CPU against wall time, which shows how CPU-bound each is.
+
+Profiling is off unless `start_profiling()` is called; `phase()` is then a
+no-op. `write()` saves `summary.txt` next to the raw output.
+"""
+
+import re
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.01  # Seconds between samples
+
+DATA_DIR = Path(__file__).parent.parent.parent
+
+def _thread_cpu_time(native_id: int) -> Optional[float]:
+    """Return the CPU seconds used by a thread, or None if it has exited or the platform has no per-thread clocks
+
+    The clock is derived from the kernel thread id, as glibc does, rather than
+    from pthread_getcpuclockid, which crashes on a thread that just exited.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return time.clock_gettime((~native_id << 3) | 6)
+    except OSError:
+        return None
+
+def _pool_name(thread_name: str) -> str:
+    """Group worker threads by pool, e.g. reservations_7 -> reservations"""
+    return re.sub(r"(-\d+)?(_\d+)?$", "", thread_name) or thread_name
+
+def _function_label(name: str, filename: str, lineno: int) -> str:
+    path = Path(filename)
+    try:
+        filename = str(path.relative_to(DATA_DIR))
+    except ValueError:
+        filename = "/".join(path.parts[-2:])
+    # Semicolons separate frames in folded stacks
+    return f"{name} ({filename}:{lineno})".replace(";", ",")
+
+_labels = {}
+
+def _code_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = _function_label(code.co_name, code.co_filename, code.co_firstlineno)
+    return label
+
+class Profiler(ABC):
+    """Common phase timing and summary for the profilers"""
+
+    # Explains how the numbers were measured, at the top of the summary
+    method = ""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.start_time = self.end_time = 0.0
+        self.start_cpu = self.end_cpu = 0.0
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+
+    def stop(self):
+        self.end_time = time.perf_counter()
+        self.end_cpu = time.process_time()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Record process CPU and wall time of a block"""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            with self.lock:
+                totals = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+                totals["wall"] += time.perf_counter() - wall_start
+                totals["cpu"] += time.process_time() - cpu_start
+
+    @abstractmethod
+    def function_times(self) -> Dict[str, Tuple[float, float]]:
+        """Return (self CPU, total CPU) seconds per function"""
+
+    @abstractmethod
+    def pool_times(self) -> Dict[str, float]:
+        """Return CPU seconds per thread pool"""
+
+    @abstractmethod
+    def write_raw(self, output_dir: Path) -> List[str]:
+        """Write the raw profile for flamegraph tools; returns the file names"""
+
+    def summary(self, top: int = 25) -> str:
+        """Format the hot spots, CPU by thread pool and the phase table"""
+        times = self.function_times()
+        pools = self.pool_times()
+        with self.lock:
+            phases = dict(self.phases)
+        profiled_cpu = sum(pools.values())
+        wall = (self.end_time or time.perf_counter()) - self.start_time
+        process_cpu = (self.end_cpu or time.process_time()) - self.start_cpu
+
+        lines = [f"Wall time: {wall:.2f}s, process CPU: {process_cpu:.2f}s, profiled CPU: {profiled_cpu:.2f}s", self.method]
+
+        for title, column in (("self", 0), ("total", 1)):
+            lines += ["", f"===== Top {top} functions by {title} CPU =====",
+                      f"{'self s':>9} {'total s':>9} {'total %':>8}  function"]
+            ranked = sorted(times.items(), key=lambda item: item[1][column], reverse=True)[:top]
+            for label, (self_cpu, total_cpu) in ranked:
+                share = 100 * total_cpu / profiled_cpu if profiled_cpu else 0.0
+                lines.append(f"{self_cpu:9.3f} {total_cpu:9.3f} {share:7.1f}%  {label}")
+
+        lines += ["", "===== CPU by thread pool =====", f"{'cpu s':>9} {'cpu %':>8}  threads"]
+        for pool, cpu in sorted(pools.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"{cpu:9.3f} {100 * cpu / profiled_cpu if profiled_cpu else 0.0:7.1f}%  {pool}")
+
+        if phases:
+            lines += ["", "===== Phases (process CPU vs wall) =====",
+                      f"{'wall s':>9} {'cpu s':>9} {'cores':>7}  phase"]
+            for name, totals in phases.items():
+                cores = totals["cpu"] / totals["wall"] if totals["wall"] else 0.0
+                lines.append(f"{totals['wall']:9.3f} {totals['cpu']:9.3f} {cores:7.2f}  {name}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir, top: int = 25) -> str:
+        """Write the summary and raw profile to a directory; returns the summary"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.summary(top)
+        (output_dir / "summary.txt").write_text(summary, encoding="utf-8")
+        self.write_raw(output_dir)
+        return summary
+
+class YappiProfiler(Profiler):
+    """Deterministic per-thread CPU profile recorded by yappi"""
+
+    method = "Measured by yappi against each thread's CPU clock."
+
+    def __init__(self):
+        super().__init__()
+        import yappi
+        self.yappi = yappi
+
+    def start(self):
+        super().start()
+        yappi = self.yappi
+        yappi.clear_stats()
+        yappi.set_clock_type("cpu")
+        # Name each thread's stats after the thread, so pools can be told apart
+        yappi.set_context_name_callback(lambda: threading.current_thread().name)
+        yappi.start(profile_threads=True)
+
+    def stop(self):
+        self.yappi.stop()
+        super().stop()
+
+    def function_times(self) -> Dict[str, Tuple[float, float]]:
+        times = {}
+        for stat in self.yappi.get_func_stats():
+            label = _function_label(stat.name, stat.module, stat.lineno)
+            self_cpu, total_cpu = times.get(label, (0.0, 0.0))
+            times[label] = (self_cpu + stat.tsub, total_cpu + stat.ttot)
+        return times
+
+    def pool_times(self) -> Dict[str, float]:
+        pools = defaultdict(float)
+        for stat in self.yappi.get_thread_stats():
+            pools[_pool_name(stat.name)] += stat.ttot
+        return pools
+
+    def write_raw(self, output_dir: Path) -> List[str]:
+        self.yappi.get_func_stats().save(str(output_dir / "profile.pstat"), type="pstat")
+        return ["profile.pstat"]
+
+class SamplingProfiler(Profiler):
+    """Samples the stacks of all threads on a background thread"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        # (thread name, code objects from leaf to root) -> [samples, CPU seconds]
+        self.stacks: Dict[Tuple[str, Tuple], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.samples = 0
+        self.overhead = 0.0
+        self.per_thread_clock = _thread_cpu_time(threading.get_native_id()) is not None
+        # Thread id -> (thread, its CPU seconds at the previous sample)
+        self._last_cpu: Dict[int, Tuple[threading.Thread, float]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def method(self) -> str:
+        clock = ("CPU used by a thread is charged to the stack it is in when sampled; "
+                 "threads that exit between samples are not counted."
+                 if self.per_thread_clock else "Per-thread CPU clocks are unavailable; every sample is weighted as busy.")
+        return (f"Sampled {self.samples} times every {self.interval * 1000:g} ms "
+                f"(sampler overhead {self.overhead:.2f}s CPU). {clock} Install yappi for exact times.")
+
+    def start(self):
+        # Threads that already exist only count CPU used from now on
+        for thread in threading.enumerate():
+            cpu = _thread_cpu_time(thread.native_id)
+            if cpu is not None:
+                self._last_cpu[thread.ident] = (thread, cpu)
+        super().start()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        super().stop()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(own_id)
+        self.overhead = time.thread_time()
+
+    def sample(self, own_id: int):
+        """Record the current stack of every thread but the sampler"""
+        frames = sys._current_frames()
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        with self.lock:
+            self.samples += 1
+            for thread_id, frame in frames.items():
+                thread = threads.get(thread_id)
+                if thread_id == own_id or thread is None:
+                    continue
+                if self.per_thread_clock:
+                    cpu = _thread_cpu_time(thread.native_id)
+                    if cpu is None:
+                        continue
+                    # Thread ids are reused; a thread seen for the first time started after the profiler
+                    last_thread, last_cpu = self._last_cpu.get(thread_id, (None, 0.0))
+                    used = cpu - last_cpu if last_thread is thread else cpu
+                    self._last_cpu[thread_id] = (thread, cpu)
+                else:
+                    used = self.interval
+
+                # Code objects are kept as-is; labels are only built for the report
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                entry = self.stacks[(thread.name, tuple(stack))]
+                entry[0] += 1
+                entry[1] += used
+
+    def labelled_stacks(self) -> Dict[Tuple[str, Tuple[str, ...]], List[float]]:
+        """Return [samples, CPU seconds] per thread pool and stack of function labels from root to leaf"""
+        with self.lock:
+            raw = list(self.stacks.items())
+        stacks = defaultdict(lambda: [0, 0.0])
+        for (thread_name, codes), (samples, cpu) in raw:
+            entry = stacks[(_pool_name(thread_name), tuple(_code_label(code) for code in reversed(codes)))]
+            entry[0] += samples
+            entry[1] += cpu
+        return stacks
+
+    def function_times(self) -> Dict[str, Tuple[float, float]]:
+        times = defaultdict(lambda: [0.0, 0.0])
+        for (_, stack), (_, cpu) in self.labelled_stacks().items():
+            if not stack:
+                continue
+            times[stack[-1]][0] += cpu
+            # Recursive functions count once per stack towards their total
+            for label in set(stack):
+                times[label][1] += cpu
+        return {label: tuple(entry) for label, entry in times.items()}
+
+    def pool_times(self) -> Dict[str, float]:
+        pools = defaultdict(float)
+        for (pool, _), (_, cpu) in self.labelled_stacks().items():
+            pools[pool] += cpu
+        return pools
+
+    def write_folded(self, path, weight: str = "cpu"):
+        """Write collapsed stacks weighted by CPU microseconds or by sample count"""
+        with open(path, "w", encoding="utf-8") as f:
+            for (pool, stack), (samples, cpu) in self.labelled_stacks().items():
+                value = int(cpu * 1e6) if weight == "cpu" else samples
+                if value > 0:
+                    f.write(";".join((pool,) + stack) + f" {value}\n")
+
+    def write_raw(self, output_dir: Path) -> List[str]:
+        self.write_folded(output_dir / "cpu.folded", weight="cpu")
+        self.write_folded(output_dir / "wall.folded", weight="samples")
+        return ["cpu.folded", "wall.folded"]
+
+_profiler: Optional[Profiler] = None
+
+def start_profiling(interval: float = DEFAULT_INTERVAL, sampling: bool = False) -> Profiler:
+    """Start profiling every thread, with yappi when it is installed
+
+    Args:
+        interval: Seconds between samples for the sampling profiler
+        sampling: Use the sampling profiler even if yappi is installed
+    """
+    global _profiler
+    profiler = None
+    if not sampling:
+        try:
+            profiler = YappiProfiler()
+        except ImportError:
+            pass
+    _profiler = profiler or SamplingProfiler(interval)
+    _profiler.start()
+    return _profiler
+
+def stop_profiling() -> Optional[Profiler]:
+    """Stop profiling and return the profiler"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+def phase(name: str):
+    """Time a phase of the run for the profile; a no-op when profiling is off"""
+    profiler = _profiler
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
@@ -1,6 +1,10 @@
 """
 Prompts for the restaurant multi-agent system.
 All prompts are centralized here for easy maintenance.
+
+Each prompt keeps its static instructions and JSON format first and the
+per-diner placeholders last. Every call for an agent then starts with the same
+prefix, which lets provider-side prompt caching reuse it across diners.
 """
 
 # Dietary Analysis Agent prompt
@@ -11,12 +15,6 @@ You are a Dietary Analysis Agent for a fine dining restaurant. Analyze the diner
 2. Dietary preferences (important for satisfaction)
 3. Special preparation instructions
 
-Diner Information:
-{diner_info}
-
-Upcoming Reservation:
-{reservation_info}
-
 Provide your analysis in the following JSON format:
 ```
 {
@@ -33,6 +31,12 @@ Provide your analysis in the following JSON format:
 ```
 
 Return only the JSON with no additional text.
+
+Diner Information:
+{diner_info}
+
+Upcoming Reservation:
+{reservation_info}
 """
 
 # Guest Experience Agent prompt
@@ -43,12 +47,6 @@ You are a Guest Experience Agent for a fine dining restaurant. Analyze the diner
 2. Service style preferences (attentive vs. hands-off)
 3. Conversation topics that resonated with them
 
-Diner Information:
-{diner_info}
-
-Upcoming Reservation:
-{reservation_info}
-
 Provide your analysis in the following JSON format:
 ```
 {
@@ -66,6 +64,9 @@ Provide your analysis in the following JSON format:
 ```
 
 Return only the JSON with no additional text.
+
+Diner Information:
+{diner_info}
 """
 
 # Special Requests Agent prompt
@@ -76,12 +77,6 @@ You are a Special Requests Agent for a fine dining restaurant. Analyze the diner
 2. Modifications to standard service
 3. Time-sensitive needs
 
-Diner Information:
-{diner_info}
-
-Upcoming Reservation:
-{reservation_info}
-
 Provide your analysis in the following JSON format:
 ```
 {
@@ -101,6 +96,12 @@ Provide your analysis in the following JSON format:
 ```
 
 Return only the JSON with no additional text.
+
+Diner Information:
+{diner_info}
+
+Upcoming Reservation:
+{reservation_info}
 """
 
 # Personalization Agent prompt
@@ -111,12 +112,6 @@ You are a Personalization Agent for a fine dining restaurant. Analyze the diner'
 2. Potential upsell opportunities based on preferences
 3. Recognition moments to acknowledge the guest
 
-Diner Information:
-{diner_info}
-
-Upcoming Reservation:
-{reservation_info}
-
 Provide your analysis in the following JSON format:
 ```
 {
@@ -133,31 +128,17 @@ Provide your analysis in the following JSON format:
 ```
 
 Return only the JSON with no additional text.
-"""
-
-# Coordinator Agent prompt
-COORDINATOR_PROMPT = """
-You are the Coordinator Agent for a fine dining restaurant's morning huddle system. Your job is to combine and prioritize insights from specialized agents into a cohesive briefing.
 
 Diner Information:
 {diner_info}
 
 Upcoming Reservation:
 {reservation_info}
+"""
 
-Specialized Agent Insights:
-
-Dietary Analysis:
-{dietary_analysis}
-
-Guest Experience:
-{guest_experience}
-
-Special Requests:
-{special_requests}
-
-Personalization:
-{personalization}
+# Coordinator Agent prompt
+COORDINATOR_PROMPT = """
+You are the Coordinator Agent for a fine dining restaurant's morning huddle system. Your job is to combine and prioritize insights from specialized agents into a cohesive briefing.
 
 Create a consolidated briefing in the following JSON format:
 ```
@@ -204,4 +185,115 @@ Prioritize information that is:
 3. Operationally important (timing, modifications)
 
 Return only the JSON with no additional text.
-""" 
\ No newline at end of file
+
+Diner Information:
+{diner_info}
+
+Upcoming Reservation:
+{reservation_info}
+
+Specialized Agent Insights:
+
+Dietary Analysis:
+{dietary_analysis}
+
+Guest Experience:
+{guest_experience}
+
+Special Requests:
+{special_requests}
+
+Personalization:
+{personalization}
+"""
+
+# Compact output schemas
+#
+# Each compact schema replaces the JSON format of the matching prompt above
+# (see routing.output_prompt). It keeps the same keys, so results validate and
+# merge exactly as before, but with enumerated codes in place of prose where
+# the field allows it and short phrases elsewhere. The coordinator keeps the
+# kitchen note fields and tags the timeline reads. Enabled with
+# COMPACT_SCHEMAS=1 or --compact-schemas.
+
+COMPACT_INSTRUCTIONS = """
+Where a field lists codes separated by "/", answer with exactly one of them. Keep every other text value to a short phrase of at most 10 words."""
+
+COMPACT_DIETARY_ANALYSIS_SCHEMA = """
+{
+    "allergies": [
+        {"item": "allergen", "severity": "critical/preference", "source": "review/email/order/reservation"}
+    ],
+    "dietary_restrictions": [
+        {"restriction": "restriction", "notes": "short phrase", "source": "review/email/order/reservation"}
+    ],
+    "preparation_instructions": [
+        {"dish": "dish name", "instruction": "short phrase"}
+    ]
+}
+"""
+
+COMPACT_GUEST_EXPERIENCE_SCHEMA = """
+{
+    "past_impressions": [
+        {"type": "positive/negative", "aspect": "short phrase", "source": "review/email"}
+    ],
+    "service_preferences": {
+        "style": "attentive/hands-off/balanced",
+        "evidence": "short phrase"
+    },
+    "conversation_topics": [
+        {"topic": "topic", "context": "review/email"}
+    ]
+}
+"""
+
+COMPACT_SPECIAL_REQUESTS_SCHEMA = """
+{
+    "explicit_requests": [
+        {"request": "short phrase", "priority": "high/medium/low", "source": "email/review/reservation"}
+    ],
+    "service_modifications": [
+        {"modification": "short phrase", "notes": "short phrase"}
+    ],
+    "time_sensitive": [
+        {"need": "short phrase", "timing": "before arrival/arrival/seating/main course/dessert/departure"}
+    ],
+    "special_occasions": [
+        {"occasion": "birthday/anniversary/engagement/promotion/graduation/other", "details": "short phrase"}
+    ]
+}
+"""
+
+COMPACT_PERSONALIZATION_SCHEMA = """
+{
+    "personalization_opportunities": [
+        {"opportunity": "short phrase", "implementation": "short phrase", "impact": "high/medium/low"}
+    ],
+    "upsell_opportunities": [
+        {"item": "item to suggest", "rationale": "short phrase"}
+    ],
+    "recognition_moments": [
+        {"moment": "arrival/seating/main course/dessert/departure", "approach": "short phrase"}
+    ]
+}
+"""
+
+COMPACT_COORDINATOR_SCHEMA = """
+{
+    "priority_alerts": [
+        {"alert": "short phrase", "category": "dietary/experience/request/personalization", "for": "kitchen/service/management"}
+    ],
+    "guest_profile": {
+        "dining_style": "short phrase",
+        "preferences": ["short phrase"],
+        "avoid": ["short phrase"]
+    },
+    "service_recommendations": [
+        {"recommendation": "short phrase", "timing": "arrival/seating/main course/dessert/departure", "owner": "host/server/sommelier/chef/manager"}
+    ],
+    "kitchen_notes": [
+        {"note": "short phrase", "dish": "affected dish", "tags": ["tag from the list below"], "urgency": "red/orange/green"}
+    ]
+}
+"""
@@ -0,0 +1,124 @@
+"""
+Client-side rate limiting for the restaurant multi-agent system.
+
+`RateLimiter` holds request and token budgets (per minute) as token buckets
+in shared memory, so every thread and every worker process of a run draws
+from the same budget instead of each discovering the provider's limit
+through 429 responses. A call reserves one request and its estimated prompt
+tokens before it is sent, and the estimate is corrected by the tokens the
+response reports. When any caller is rate limited anyway, `pause()` holds
+back every caller for the backoff wait.
+
+Limits are set per API key with `--rpm-limit` / `--tpm-limit` or
+OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT, the same settings `--plan` uses, and
+multiplied by the number of keys.
+"""
+
+import multiprocessing
+import time
+from typing import Dict, List, Optional
+
+from .sla import DeadlineExceeded, remaining
+
+# Longest single sleep while waiting for budget, so deadlines and pauses are noticed
+MAX_WAIT = 1.0
+
+# Indexes into the shared state
+_REQUESTS, _TOKENS, _REFILLED_AT, _PAUSED_UNTIL = range(4)
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Cheap prompt token estimate, at four characters per token"""
+    return sum(len(message["content"]) for message in messages) // 4
+
+class RateLimiter:
+    """Requests and tokens per minute, shared across threads and processes
+
+    Pass the limiter to worker processes when they start (e.g. through a
+    pool initializer); the budgets live in shared memory.
+
+    Args:
+        rpm: Requests per minute, or None for no request limit
+        tpm: Tokens per minute, or None for no token limit
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        context = multiprocessing.get_context("spawn")
+        self.lock = context.Lock()
+        # Buckets start full, so a run can burst up to one minute's budget
+        self.state = context.RawArray("d", [rpm or 0.0, tpm or 0.0, time.time(), 0.0])
+
+    def _refill(self, now: float):
+        """Add the budget accrued since the last refill (caller holds the lock)"""
+        elapsed = max(0.0, now - self.state[_REFILLED_AT])
+        self.state[_REFILLED_AT] = now
+        if self.rpm:
+            self.state[_REQUESTS] = min(self.rpm, self.state[_REQUESTS] + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.state[_TOKENS] = min(self.tpm, self.state[_TOKENS] + elapsed * self.tpm / 60)
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Seconds until a call of this size fits the budget (caller holds the lock)"""
+        wait = max(0.0, self.state[_PAUSED_UNTIL] - now)
+        if self.rpm and self.state[_REQUESTS] < 1:
+            wait = max(wait, (1 - self.state[_REQUESTS]) * 60 / self.rpm)
+        # A call larger than the whole bucket waits for a full bucket rather than forever
+        needed = min(tokens, self.tpm) if self.tpm else 0
+        if self.tpm and self.state[_TOKENS] < needed:
+            wait = max(wait, (needed - self.state[_TOKENS]) * 60 / self.tpm)
+        return wait
+
+    def acquire(self, tokens: int):
+        """Block until one request of about this many tokens fits the budget, then reserve it
+
+        Raises:
+            DeadlineExceeded: if the current deadline passes while waiting
+        """
+        while True:
+            with self.lock:
+                now = time.time()
+                self._refill(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    if self.rpm:
+                        self.state[_REQUESTS] -= 1
+                    if self.tpm:
+                        self.state[_TOKENS] -= tokens
+                    return
+            left = remaining()
+            if left is not None and left <= wait:
+                raise DeadlineExceeded("Deadline would pass while waiting for rate limit budget")
+            time.sleep(min(wait, MAX_WAIT))
+
+    def settle(self, estimated: int, actual: int):
+        """Charge the difference between a call's estimated and actual tokens"""
+        if not self.tpm:
+            return
+        with self.lock:
+            self.state[_TOKENS] -= actual - estimated
+
+    def pause(self, seconds: float):
+        """Hold back every caller for the given seconds, e.g. after a 429"""
+        with self.lock:
+            self.state[_PAUSED_UNTIL] = max(self.state[_PAUSED_UNTIL], time.time() + seconds)
+
+_limiter: Optional[RateLimiter] = None
+
+def use_rate_limiter(limiter: Optional[RateLimiter]):
+    """Throttle API calls in this process with the given limiter, or stop with None"""
+    global _limiter
+    _limiter = limiter
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    return _limiter
+
+def run_rate_limiter(rpm_limit: Optional[int], tpm_limit: Optional[int], num_keys: int) -> Optional[RateLimiter]:
+    """Build the limiter for a run from per-key limits, or None without limits"""
+    if not rpm_limit and not tpm_limit:
+        return None
+    num_keys = max(1, num_keys)
+    return RateLimiter(
+        rpm=rpm_limit * num_keys if rpm_limit else None,
+        tpm=tpm_limit * num_keys if tpm_limit else None
+    )
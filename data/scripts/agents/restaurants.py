@@ -0,0 +1,234 @@
+"""
+Multi-restaurant runs for the restaurant multi-agent system.
+
+A restaurant group briefs several datasets, one per restaurant, against the
+same API account. Separate `augment.py` processes would compete blindly for
+the same keys and rate limits. `augment_restaurants` runs them all through
+one engine instead:
+
+- One rate limiter and one set of keys or endpoints serve every restaurant.
+- One stage store caches stage outputs, so a diner who books at two
+  restaurants is analyzed once. A restaurant that needs an output another
+  is still computing waits for it (see StageStore.single_flight).
+- A `FairScheduler` (see scheduler.py) admits --workers API calls at a
+  time across all restaurants and hands out slots by weighted fair share or
+  by priority. A busy restaurant can use slots others leave idle, but
+  cannot starve them.
+- Each restaurant has its own thread pools, output file, timeline index and
+  aggregates. The run summary adds calls, tokens, slot waits and briefings
+  per restaurant.
+
+Restaurants come from input/output pairs or from a manifest:
+
+    {
+        "policy": "fair",
+        "restaurants": [
+            {"name": "laudure", "input": "laudure.json", "output": "laudure-briefed.json", "weight": 2},
+            {"name": "bistro", "input": "bistro.json", "priority": 1}
+        ]
+    }
+
+Paths in a manifest are relative to the manifest. Without an output, a
+restaurant's briefings go to "agent-<input name>" next to its input. A
+restaurant that fails does not stop the others; the run raises once they
+are saved.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .base import load_api_keys, print_metrics, reset_metrics
+from .cache import StageStore
+from .planner import RPM_LIMIT, TPM_LIMIT, record_run_history
+from .processor import process_reservations, resolve_paths, save_augmented
+from .ratelimit import run_rate_limiter, use_rate_limiter
+from .scheduler import FairScheduler, restaurant_scope, use_scheduler
+from .tracing import in_current_context, span
+
+def restaurant_entry(input_path, output_path=None, name: Optional[str] = None,
+                     weight: float = 1.0, priority: int = 0) -> Dict:
+    """Describe one restaurant of a multi-restaurant run"""
+    input_path = Path(input_path)
+    return {
+        "name": name or input_path.stem,
+        "input": str(input_path),
+        "output": str(output_path) if output_path else str(input_path.with_name(f"agent-{input_path.name}")),
+        "weight": float(weight),
+        "priority": int(priority)
+    }
+
+def load_manifest(path) -> Tuple[List[Dict], Optional[str]]:
+    """Read the restaurants of a run from a manifest file
+
+    Returns:
+        Tuple of (restaurant entries, scheduling policy or None)
+    """
+    path = Path(path).resolve()
+    with open(path) as f:
+        manifest = json.load(f)
+    entries = manifest.get("restaurants", []) if isinstance(manifest, dict) else manifest
+    restaurants = [
+        restaurant_entry(
+            path.parent / entry["input"],
+            path.parent / entry["output"] if entry.get("output") else None,
+            name=entry.get("name"),
+            weight=entry.get("weight", 1.0),
+            priority=entry.get("priority", 0)
+        )
+        for entry in entries
+    ]
+    if not restaurants:
+        raise ValueError(f"Manifest {path} lists no restaurants")
+    return restaurants, manifest.get("policy") if isinstance(manifest, dict) else None
+
+def _unique_names(restaurants: List[Dict]):
+    """Rename restaurants that share a name, and reject restaurants that share an output
+
+    Raises:
+        ValueError: if two restaurants would write the same output file
+    """
+    outputs = {}
+    for restaurant in restaurants:
+        output_path = resolve_paths(restaurant["input"], restaurant["output"])[1].resolve()
+        if output_path in outputs:
+            raise ValueError(f"Restaurants {outputs[output_path]!r} and {restaurant['name']!r} "
+                             f"both write to {output_path}")
+        outputs[output_path] = restaurant["name"]
+
+    # Names identify restaurants in the scheduler and the summary, so keep them unique
+    taken = set()
+    for restaurant in restaurants:
+        name, count = restaurant["name"], 1
+        while name in taken:
+            count += 1
+            name = f"{restaurant['name']}-{count}"
+        restaurant["name"] = name
+        taken.add(name)
+
+def _run_restaurant(restaurant: Dict, max_workers: int, stage_store: Optional[StageStore],
+                    budget: Optional[float], deadline: Optional[float]) -> Dict:
+    """Brief and save one restaurant's dataset; returns its counts"""
+    from load_data import DinersList
+
+    input_path, output_path, _ = resolve_paths(restaurant["input"], restaurant["output"])
+    start_time = time.time()
+    with restaurant_scope(restaurant["name"]), span("restaurant", restaurant=restaurant["name"]):
+        augmented_diners = [diner.dict() for diner in DinersList.load_from_json(str(input_path)).diners]
+        reservations_to_process = [
+            (diner_idx, res_idx)
+            for diner_idx, diner in enumerate(augmented_diners)
+            for res_idx in range(len(diner.get("reservations") or []))
+        ]
+        print(f"[{restaurant['name']}] Found {len(reservations_to_process)} reservations to process")
+
+        analyses = process_reservations(augmented_diners, reservations_to_process, max_workers, stage_store,
+                                        budget, deadline)
+        for (diner_idx, res_idx), analysis in analyses.items():
+            augmented_diners[diner_idx]["reservations"][res_idx]["agent_analysis"] = analysis
+
+        save_augmented(augmented_diners, input_path, output_path)
+    return {
+        "reservations": len(reservations_to_process),
+        "briefed": len(analyses),
+        "degraded": sum(1 for analysis in analyses.values() if "degraded" in analysis),
+        "time": time.time() - start_time
+    }
+
+def print_restaurant_metrics(results: Dict[str, Dict], scheduler: FairScheduler):
+    """Print briefings, calls, tokens and slot waits per restaurant"""
+    calls = scheduler.snapshot()
+    total_calls = sum(entry["calls"] for entry in calls.values())
+    print(f"\n===== Restaurants ({scheduler.policy} scheduling, {scheduler.capacity} calls at a time) =====")
+    for name, result in results.items():
+        entry = calls[name]
+        print(f"{name}: {result['briefed']}/{result['reservations']} briefed ({result['degraded']} degraded) "
+              f"in {result['time']:.2f}s, weight {entry['weight']:g}, priority {entry['priority']}")
+        print(f"  {entry['calls']} calls ({100 * entry['calls'] / max(1, total_calls):.1f}%), "
+              f"{entry['prompt_tokens']} prompt / {entry['completion_tokens']} completion tokens, "
+              f"slot wait avg {entry['wait_time'] / max(1, entry['calls']):.2f}s, max {entry['max_wait']:.2f}s")
+
+def augment_restaurants(restaurants: List[Dict], max_workers: int = 8, cache_dir: Optional[str] = None,
+                        use_cache: bool = True, budget: Optional[float] = None, deadline: Optional[float] = None,
+                        policy: str = "fair", rpm_limit: Optional[int] = None,
+                        tpm_limit: Optional[int] = None) -> Dict[str, Dict]:
+    """Brief several restaurants' datasets through one shared engine
+
+    Every restaurant runs at once, as augment_dataset would run it alone,
+    but API calls share one rate limit budget, one stage store and
+    max_workers call slots handed out by the scheduling policy.
+
+    Args:
+        restaurants: Entries from restaurant_entry or load_manifest
+        max_workers: API calls in flight at once across all restaurants, and
+            the size of each restaurant's thread pools
+        cache_dir: Directory for persistent stage outputs (default: data/.cache)
+        use_cache: Replay unchanged stages from the cache directory
+        budget: Optional seconds each reservation may take
+        deadline: Optional time.monotonic() time by which the run must finish
+        policy: "fair" (weighted fair share) or "priority"
+        rpm_limit: Requests per minute per API key (default: OPENAI_RPM_LIMIT)
+        tpm_limit: Tokens per minute per API key (default: OPENAI_TPM_LIMIT)
+
+    Returns:
+        Dictionary mapping restaurant name to its reservation, briefing and
+        degraded counts and its run time
+
+    Raises:
+        ValueError: if there are no restaurants or two share an output file
+        RuntimeError: if any restaurant failed; the others are still saved
+            and summarized
+    """
+    if not restaurants:
+        raise ValueError("No restaurants to brief")
+    _unique_names(restaurants)
+
+    _, _, cache_dir = resolve_paths(restaurants[0]["input"], cache_dir=cache_dir)
+    use_rate_limiter(run_rate_limiter(
+        rpm_limit or (int(RPM_LIMIT) if RPM_LIMIT else None),
+        tpm_limit or (int(TPM_LIMIT) if TPM_LIMIT else None),
+        len(load_api_keys())
+    ))
+    scheduler = FairScheduler(max_workers, policy)
+    for restaurant in restaurants:
+        scheduler.register(restaurant["name"], restaurant["weight"], restaurant["priority"])
+    use_scheduler(scheduler)
+    reset_metrics()
+
+    stage_store = StageStore(cache_dir / "stages") if use_cache else None
+    results = {}
+    failures = {}
+    start_time = time.time()
+    print(f"Briefing {len(restaurants)} restaurants with {max_workers} API calls at a time ({policy} scheduling)")
+    try:
+        with span("run", restaurants=len(restaurants), workers=max_workers), \
+                ThreadPoolExecutor(max_workers=len(restaurants), thread_name_prefix="restaurants") as executor:
+            future_to_name = {
+                executor.submit(in_current_context(_run_restaurant), restaurant, max_workers, stage_store,
+                                budget, deadline): restaurant["name"]
+                for restaurant in restaurants
+            }
+            for future in as_completed(future_to_name):
+                name = future_to_name[future]
+                try:
+                    results[name] = future.result()
+                    print(f"[{name}] Finished in {results[name]['time']:.2f}s")
+                except Exception as e:
+                    failures[name] = e
+                    print(f"[{name}] Failed: {e}")
+        if stage_store is not None:
+            stage_store.save()
+    finally:
+        use_scheduler(None)
+
+    total_time = time.time() - start_time
+    print_metrics(total_time, sum(result["reservations"] for result in results.values()))
+    print_restaurant_metrics({restaurant["name"]: results[restaurant["name"]]
+                              for restaurant in restaurants if restaurant["name"] in results}, scheduler)
+    record_run_history(cache_dir / "history.json")
+    if failures:
+        raise RuntimeError(f"{len(failures)} of {len(restaurants)} restaurants failed: "
+                           + "; ".join(f"{name}: {error}" for name, error in failures.items()))
+    return results
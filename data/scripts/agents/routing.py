@@ -0,0 +1,128 @@
+"""
+Model routing for the restaurant multi-agent system.
+
+Each agent has an ordered list of models. The first (small, fast) model is
+tried first; the request escalates to the next model only when the output fails
+schema validation or the confidence check.
+
+Each agent also has a completion budget (max_tokens) and may be asked for the
+compact variant of its output schema, which answers in codes and short
+phrases (see prompts.py).
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from .prompts import COMPACT_INSTRUCTIONS
+
+SMALL_MODEL = os.environ.get("SMALL_MODEL", "gpt-4o-mini")
+LARGE_MODEL = os.environ.get("LARGE_MODEL", "gpt-4o")
+
+# Minimum mean token probability for a small-model answer to be accepted
+MIN_CONFIDENCE = float(os.environ.get("MIN_CONFIDENCE", "0.8"))
+
+# Approximate (prompt, completion) price per token, by model
+MODEL_PRICES = {
+    "gpt-4o": (0.00001, 0.00003),
+    "gpt-4o-mini": (0.00000015, 0.0000006)
+}
+
+# Completion token budgets (max_tokens) per agent, for the full and the compact
+# output schemas, set well above a typical answer so only runaway output is cut
+COMPLETION_BUDGETS = {
+    "full": {
+        "Dietary Analysis Agent": 600,
+        "Guest Experience Agent": 600,
+        "Special Requests Agent": 700,
+        "Personalization Agent": 800,
+        "Coordinator": 1500
+    },
+    "compact": {
+        "Dietary Analysis Agent": 350,
+        "Guest Experience Agent": 300,
+        "Special Requests Agent": 400,
+        "Personalization Agent": 400,
+        "Coordinator": 900
+    }
+}
+
+def _compact(prompt: str, schema: str) -> str:
+    """Replace the JSON format of a prompt with a compact schema from prompts.py"""
+    start = prompt.index("```\n")
+    end = prompt.index("```", start + 4) + 3
+    return prompt[:start] + "```\n" + schema.strip("\n") + "\n```\n" + COMPACT_INSTRUCTIONS + prompt[end:]
+
+# An answer cut off by its budget is requested once more with the budget multiplied by this
+TRUNCATION_RETRY_FACTOR = 2
+
+# Ask agents for the compact output schemas in prompts.py
+COMPACT_SCHEMAS = os.environ.get("COMPACT_SCHEMAS", "0") == "1"
+
+def set_compact_schemas(enabled: bool):
+    """Use the compact (True) or full (False) output schemas for agents created from now on"""
+    global COMPACT_SCHEMAS
+    COMPACT_SCHEMAS = enabled
+
+def schema_variant() -> str:
+    return "compact" if COMPACT_SCHEMAS else "full"
+
+def output_prompt(full_prompt: str, compact_schema: str) -> str:
+    """Return the agent prompt for the current output schema variant"""
+    return _compact(full_prompt, compact_schema) if COMPACT_SCHEMAS else full_prompt
+
+def completion_budget(agent_name: str) -> Optional[int]:
+    """Return the max_tokens for an agent's calls, or None for no limit
+
+    The AGENT_MAX_TOKENS environment variable can override budgets per agent as
+    a JSON object, e.g. {"Coordinator": 2000}; 0 removes the limit.
+    """
+    overrides = os.environ.get("AGENT_MAX_TOKENS")
+    if overrides:
+        budgets = json.loads(overrides)
+        if agent_name in budgets:
+            return budgets[agent_name] or None
+    return COMPLETION_BUDGETS[schema_variant()].get(agent_name)
+
+def model_route(agent_name: str, default: List[str]) -> List[str]:
+    """Return the model chain for an agent
+
+    The AGENT_MODELS environment variable can override routes per agent as a
+    JSON object, e.g. {"Coordinator": ["gpt-4o"]}.
+    """
+    overrides = os.environ.get("AGENT_MODELS")
+    if overrides:
+        route = json.loads(overrides).get(agent_name)
+        if route:
+            return list(route)
+    return list(default)
+
+def model_prices(model: str):
+    """Return the (prompt, completion) price per token for a model"""
+    return MODEL_PRICES.get(model, MODEL_PRICES["gpt-4o"])
+
+def validate_output(result: Any, template: Optional[Dict]) -> bool:
+    """Check a parsed result against the shape of a canonical output
+
+    Every top-level key in the template must be present with the same JSON
+    type (list, object or string).
+    """
+    if not isinstance(result, dict) or "error" in result:
+        return False
+    if template is None:
+        return True
+    for key, expected in template.items():
+        if key not in result:
+            return False
+        if isinstance(expected, (list, dict, str)) and not isinstance(result[key], type(expected)):
+            return False
+    return True
+
+def response_confidence(response) -> Optional[float]:
+    """Return the mean token probability of a response, if logprobs were returned"""
+    logprobs = getattr(response.choices[0], "logprobs", None)
+    tokens = getattr(logprobs, "content", None) if logprobs else None
+    if not tokens:
+        return None
+    return math.exp(sum(token.logprob for token in tokens) / len(tokens))
@@ -0,0 +1,182 @@
+"""
+Call scheduling between restaurants for the restaurant multi-agent system.
+
+A multi-restaurant run (see restaurants.py) briefs several datasets at once
+against one set of API keys and one rate limit budget. Without a scheduler,
+whichever restaurant has the most reservations queued would take most of the
+calls. `FairScheduler` admits a fixed number of API calls at a time, and when
+a slot frees up it goes to the next waiting call chosen by policy:
+
+- "fair": weighted fair share. Each restaurant advances a virtual clock by
+  1 / weight per call, and the restaurant furthest behind goes next. A
+  restaurant that was idle rejoins at the current clock rather than
+  catching up on the calls it did not make.
+- "priority": the highest-priority restaurant with a waiting call goes
+  next. Restaurants with the same priority share fairly by weight.
+
+The restaurant a task works for lives in a context variable, so it follows
+tasks submitted through `tracing.in_current_context` into the worker pools.
+Calls made outside any restaurant, or with no scheduler active, go straight
+through.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .sla import DeadlineExceeded, remaining
+
+POLICIES = ("fair", "priority")
+
+# Longest single wait for a slot, so deadlines are noticed
+MAX_WAIT = 1.0
+
+# Restaurant the current task works for, or None
+_restaurant = contextvars.ContextVar("restaurant", default=None)
+
+class FairScheduler:
+    """Admit a fixed number of concurrent API calls, shared between restaurants by policy
+
+    Args:
+        capacity: API calls in flight at once, across all restaurants
+        policy: "fair" or "priority"
+    """
+
+    def __init__(self, capacity: int, policy: str = "fair"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.condition = threading.Condition()
+        self.inflight = 0
+        self.clock = 0.0
+        self.tenants: Dict[str, Dict] = {}
+
+    def register(self, name: str, weight: float = 1.0, priority: int = 0):
+        """Add a restaurant with its share weight and priority"""
+        with self.condition:
+            self.tenants[name] = {
+                "weight": max(weight, 1e-6),
+                "priority": priority,
+                "waiting": deque(),
+                "vtime": self.clock,
+                "calls": 0,
+                "wait_time": 0.0,
+                "max_wait": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0
+            }
+
+    def _next(self) -> Optional[object]:
+        """Return the ticket that gets the next free slot (caller holds the condition)"""
+        waiting = [(name, tenant) for name, tenant in self.tenants.items() if tenant["waiting"]]
+        if not waiting:
+            return None
+        if self.policy == "priority":
+            key = lambda item: (-item[1]["priority"], item[1]["vtime"], item[0])
+        else:
+            key = lambda item: (item[1]["vtime"], item[0])
+        return min(waiting, key=key)[1]["waiting"][0]
+
+    def acquire(self, name: str):
+        """Block until a call for this restaurant is admitted
+
+        Raises:
+            DeadlineExceeded: if the current deadline passes while waiting
+        """
+        ticket = object()
+        start = time.monotonic()
+        with self.condition:
+            tenant = self.tenants[name]
+            if not tenant["waiting"]:
+                # Rejoin at the current clock instead of replaying idle time
+                tenant["vtime"] = max(tenant["vtime"], self.clock)
+            tenant["waiting"].append(ticket)
+            try:
+                while self.inflight >= self.capacity or self._next() is not ticket:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded("Deadline passed while waiting for an API call slot")
+                    self.condition.wait(MAX_WAIT if left is None else min(MAX_WAIT, left))
+            except BaseException:
+                tenant["waiting"].remove(ticket)
+                self.condition.notify_all()
+                raise
+            tenant["waiting"].popleft()
+            self.inflight += 1
+            self.clock = tenant["vtime"]
+            tenant["vtime"] += 1 / tenant["weight"]
+            waited = time.monotonic() - start
+            tenant["calls"] += 1
+            tenant["wait_time"] += waited
+            tenant["max_wait"] = max(tenant["max_wait"], waited)
+            # The next waiting call may fit in a slot that is still free
+            self.condition.notify_all()
+
+    def release(self, name: str, usage=None):
+        """Free a call's slot, adding the tokens it used to its restaurant"""
+        with self.condition:
+            self.inflight -= 1
+            if usage is not None:
+                self.tenants[name]["prompt_tokens"] += usage.prompt_tokens
+                self.tenants[name]["completion_tokens"] += usage.completion_tokens
+            self.condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Return the calls, waits and tokens of each restaurant"""
+        with self.condition:
+            return {
+                name: {key: value for key, value in tenant.items() if key not in ("waiting", "vtime")}
+                for name, tenant in self.tenants.items()
+            }
+
+_scheduler: Optional[FairScheduler] = None
+
+def use_scheduler(scheduler: Optional[FairScheduler]):
+    """Schedule API calls in this process with the given scheduler, or stop with None"""
+    global _scheduler
+    _scheduler = scheduler
+
+def get_scheduler() -> Optional[FairScheduler]:
+    return _scheduler
+
+@contextmanager
+def restaurant_scope(name: str):
+    """Mark the calls made in this block, and in tasks it submits, as made for a restaurant"""
+    token = _restaurant.set(name)
+    try:
+        yield
+    finally:
+        _restaurant.reset(token)
+
+def current_restaurant() -> Optional[str]:
+    return _restaurant.get()
+
+class _Slot:
+    """An admitted call; set `usage` to charge the call's tokens to its restaurant"""
+
+    def __init__(self, scheduler: Optional[FairScheduler], name: Optional[str]):
+        self.scheduler = scheduler
+        self.name = name
+        self.usage = None
+
+    def __enter__(self):
+        if self.scheduler is not None:
+            self.scheduler.acquire(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self.scheduler is not None:
+            self.scheduler.release(self.name, self.usage)
+        return False
+
+def call_slot() -> _Slot:
+    """Wait for the current restaurant's turn to call the API; a no-op outside a scheduled run"""
+    scheduler = _scheduler
+    name = _restaurant.get()
+    if scheduler is None or name not in scheduler.tenants:
+        return _Slot(None, None)
+    return _Slot(scheduler, name)
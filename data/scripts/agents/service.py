@@ -0,0 +1,278 @@
+"""
+Local HTTP briefing service for the restaurant multi-agent system.
+
+Runs `process_reservation` on demand for one reservation, backed by the stage
+store, so staff can refresh a single briefing without a batch run.
+
+Endpoints:
+    POST /briefings   {"name": ..., "date": "YYYY-MM-DD", "time": "19:00"} briefs a
+                      reservation from the dataset; {"diner": {...}, "reservation": {...}}
+                      briefs an ad-hoc booking
+    GET  /metrics     per-endpoint latency, coalescing and load shedding counters,
+                      and the state of each LLM backend endpoint
+    GET  /health      liveness check
+
+Concurrent requests for the same diner and booking share one pipeline run.
+At most `max_pending` distinct briefings run or wait at once; beyond that the
+service answers 503 with Retry-After instead of queueing without bound. New
+stage outputs are saved every SAVE_INTERVAL seconds and at shutdown, not
+after each briefing.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from .base import get_backend, performance_metrics, metrics_lock, strip_analysis
+from .cache import StageStore, content_hash
+from .compression import compress_diner
+from .processor import process_reservation, resolve_paths
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_WINDOW = 1000
+
+# Seconds between saves of new stage outputs while serving
+SAVE_INTERVAL = 30.0
+
+# Endpoint metrics key of requests to unknown paths, so they cannot add a key per path
+UNKNOWN_ENDPOINT = "(unknown)"
+
+class Overloaded(Exception):
+    """Raised when the briefing queue is full"""
+
+class EndpointMetrics:
+    """Thread-safe request counts and latency percentiles for one endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, latency: float, status: int):
+        with self.lock:
+            self.requests += 1
+            self.total_time += latency
+            self.max_time = max(self.max_time, latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.samples.append(latency)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            samples = sorted(self.samples)
+            percentile = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+            return {
+                "requests": self.requests,
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+                "avg_seconds": self.total_time / max(1, self.requests),
+                "p50_seconds": percentile(0.50),
+                "p95_seconds": percentile(0.95),
+                "max_seconds": self.max_time
+            }
+
+class BriefingService:
+    """Coalescing, load-shedding front end to process_reservation"""
+
+    def __init__(self, dataset_path: str, max_workers: int = 4, max_pending: int = 16,
+                 cache_dir: Optional[str] = None, use_cache: bool = True, budget: Optional[float] = None):
+        self.dataset_path, _, cache_dir = resolve_paths(dataset_path, cache_dir=cache_dir)
+        self.stage_store = StageStore(cache_dir / "stages") if use_cache else None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_pending = max_pending
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.inflight: Dict[str, Future] = {}
+        self.counters = {"briefings": 0, "coalesced": 0, "shed": 0}
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self._load_lock = threading.Lock()
+        self._dataset_signature = None
+        self._diners = []
+        self._stopped = threading.Event()
+
+    def endpoint(self, path: str) -> EndpointMetrics:
+        with self.lock:
+            return self.endpoints.setdefault(path, EndpointMetrics())
+
+    def _load_diners(self):
+        """Reload the dataset when the file has changed"""
+        from load_data import DinersList
+
+        # One thread reloads while the others wait for its result
+        with self._load_lock:
+            stat = os.stat(self.dataset_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature != self._dataset_signature:
+                self._diners = [diner.dict() for diner in DinersList.load_from_json(str(self.dataset_path)).diners]
+                self._dataset_signature = signature
+            return self._diners
+
+    def find_reservation(self, name: str, date: str, time_slot: Optional[str] = None) -> Optional[Tuple[Dict, Dict]]:
+        """Return (diner, reservation) for a booking in the dataset"""
+        for diner in self._load_diners():
+            if diner["name"] != name:
+                continue
+            for reservation in diner.get("reservations") or []:
+                if str(reservation["date"]) == date and (time_slot is None or reservation.get("time") == time_slot):
+                    return diner, reservation
+        return None
+
+    def _run(self, key: str, diner: Dict, reservation: Dict) -> Dict:
+        try:
+            prompt_diner = compress_diner(diner, self.stage_store)
+            return process_reservation(prompt_diner, reservation, stage_store=self.stage_store, budget=self.budget)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def brief(self, diner: Dict, reservation: Dict) -> Tuple[Dict, bool]:
+        """Brief one reservation, sharing the run with identical concurrent requests
+
+        Returns:
+            (briefing, whether this request joined a run already in flight)
+
+        Raises:
+            Overloaded: if max_pending distinct briefings are already running or queued
+        """
+        reservation = strip_analysis(reservation)
+        key = content_hash({"diner": diner, "reservation": reservation})
+        with self.lock:
+            future = self.inflight.get(key)
+            coalesced = future is not None
+            if coalesced:
+                self.counters["coalesced"] += 1
+            elif len(self.inflight) >= self.max_pending:
+                self.counters["shed"] += 1
+                raise Overloaded(f"{len(self.inflight)} briefings already in progress")
+            else:
+                self.counters["briefings"] += 1
+                future = self.inflight[key] = self.executor.submit(self._run, key, diner, reservation)
+        return future.result(), coalesced
+
+    def save_periodically(self, interval: float = SAVE_INTERVAL):
+        """Save new stage outputs every interval seconds until close() is called"""
+        while not self._stopped.wait(interval):
+            if self.stage_store is not None:
+                self.stage_store.save()
+
+    def close(self):
+        """Stop taking briefings and save the stage outputs"""
+        self._stopped.set()
+        self.executor.shutdown(wait=False)
+        if self.stage_store is not None:
+            self.stage_store.save()
+
+    def metrics(self) -> Dict:
+        with self.lock:
+            counters = dict(self.counters, inflight=len(self.inflight), max_pending=self.max_pending)
+            endpoints = dict(self.endpoints)
+        with metrics_lock:
+            api = {key: performance_metrics[key] for key in ("api_calls", "api_errors", "api_retries", "prepass_skips")}
+        return {
+            "briefings": counters,
+            "api": api,
+            "endpoints": {path: metrics.snapshot() for path, metrics in endpoints.items()},
+            "backends": get_backend().snapshot()
+        }
+
+def make_handler(service: BriefingService):
+    """Build a request handler class bound to a service"""
+
+    class BriefingHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict, headers: Optional[Dict] = None):
+            encoded = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+            return status
+
+        def _timed(self, handler, path: Optional[str] = None):
+            start = time.perf_counter()
+            status = 500
+            try:
+                status = handler()
+            except Exception as e:
+                status = self._send(500, {"error": f"Briefing failed: {e}"})
+            finally:
+                path = path or self.path.split("?")[0]
+                service.endpoint(f"{self.command} {path}").record(time.perf_counter() - start, status)
+
+        def _unknown(self):
+            path = self.path.split("?")[0]
+            self._timed(lambda: self._send(404, {"error": f"Unknown endpoint {path}"}), UNKNOWN_ENDPOINT)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                self._timed(lambda: self._send(200, service.metrics()))
+            elif path == "/health":
+                self._timed(lambda: self._send(200, {"status": "ok"}))
+            else:
+                self._unknown()
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/briefings":
+                self._unknown()
+                return
+            self._timed(self._briefing)
+
+        def _briefing(self) -> int:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, {"error": "Request body must be JSON"})
+
+            if "diner" in request and "reservation" in request:
+                from load_data import Diner, Reservation
+
+                try:
+                    diner = Diner(**request["diner"]).dict()
+                    reservation = Reservation(**request["reservation"]).dict()
+                except (TypeError, ValueError) as e:
+                    return self._send(400, {"error": f"Invalid diner or reservation: {e}"})
+            elif "name" in request and "date" in request:
+                found = service.find_reservation(request["name"], request["date"], request.get("time"))
+                if found is None:
+                    return self._send(404, {"error": f"No reservation for {request['name']} on {request['date']}"})
+                diner, reservation = found
+            else:
+                return self._send(400, {"error": "Expected name and date, or diner and reservation"})
+
+            try:
+                briefing, coalesced = service.brief(diner, reservation)
+            except Overloaded as e:
+                return self._send(503, {"error": f"Service saturated: {e}"}, {"Retry-After": "5"})
+            return self._send(200, {"briefing": briefing, "coalesced": coalesced})
+
+        def log_message(self, format, *args):
+            # Request latency is reported through /metrics instead
+            pass
+
+    return BriefingHandler
+
+def serve(dataset_path: str, host: str = "127.0.0.1", port: int = 8765, max_workers: int = 4,
+          max_pending: int = 16, cache_dir: Optional[str] = None, use_cache: bool = True,
+          budget: Optional[float] = None):
+    """Run the briefing service until interrupted"""
+    service = BriefingService(dataset_path, max_workers, max_pending, cache_dir, use_cache, budget)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    threading.Thread(target=service.save_periodically, name="stage-saver", daemon=True).start()
+    print(f"Briefing service for {service.dataset_path} listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping briefing service")
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,107 @@
+"""
+Latency budgets for the restaurant multi-agent system.
+
+Three limits keep a slow provider from stalling a run:
+
+- Every API call has a timeout (`OPENAI_CALL_TIMEOUT`, default 60 seconds).
+- A reservation can be given a latency budget. The specialized agents get
+  the first part of it, and the coordinator the rest. An agent that misses
+  its share is left out, and the coordinator briefs on the results that
+  arrived.
+- A run can be given a deadline. Once it passes, no new API calls are made:
+  stages are only replayed from the stage store or resolved locally, so every
+  remaining reservation still gets a (degraded) briefing and the run saves
+  what it has.
+
+Deadlines live in a context variable, so they follow tasks submitted through
+`tracing.in_current_context` into the worker pools. Nested scopes keep the
+earliest deadline. Retries give up, and backoff sleeps are cut short, when
+the deadline passes, and each call's timeout never runs past it.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Seconds before a single API call is abandoned
+CALL_TIMEOUT = float(os.environ.get("OPENAI_CALL_TIMEOUT", "60"))
+
+# Share of a reservation's budget given to the specialized agents
+SPECIALIST_SHARE = 2 / 3
+
+# Extra seconds to wait for a stage past its deadline, for calls to return
+DEADLINE_GRACE = 1.0
+
+# Absolute time.monotonic() deadline of the current task, or None
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """Raised instead of making an API call once the deadline has passed"""
+
+def set_call_timeout(seconds: float):
+    """Change the timeout of every API call"""
+    global CALL_TIMEOUT
+    CALL_TIMEOUT = seconds
+
+def current_deadline() -> Optional[float]:
+    """Return the monotonic deadline of the current task, if any"""
+    return _deadline.get()
+
+def remaining() -> Optional[float]:
+    """Return the seconds left before the current deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def expired() -> bool:
+    """Whether the current deadline has passed"""
+    left = remaining()
+    return left is not None and left <= 0
+
+def call_timeout() -> float:
+    """Return the timeout for an API call starting now
+
+    Raises:
+        DeadlineExceeded: if the current deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return CALL_TIMEOUT
+    if left <= 0:
+        raise DeadlineExceeded("Deadline passed before the API call")
+    return min(CALL_TIMEOUT, left)
+
+@contextmanager
+def deadline_scope(seconds: Optional[float] = None, at: Optional[float] = None):
+    """Run a block under a deadline, seconds from now or at a monotonic time
+
+    The earlier of the new deadline and any enclosing one applies. With
+    neither argument the block runs under the enclosing deadline unchanged.
+    """
+    deadline = _deadline.get()
+    for candidate in (at, None if seconds is None else time.monotonic() + seconds):
+        if candidate is not None and (deadline is None or candidate < deadline):
+            deadline = candidate
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+def parse_deadline(value: str) -> float:
+    """Convert a run deadline to a monotonic time
+
+    Args:
+        value: Seconds from now (e.g. "900"), or a local clock time (e.g.
+            "15:30") that is today, or tomorrow if it has already passed
+    """
+    if ":" not in value:
+        return time.monotonic() + float(value)
+    now = datetime.now()
+    hour, minute = (int(part) for part in value.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return time.monotonic() + (target - now).total_seconds()
@@ -2,37 +2,89 @@
 Specialized agent implementations for the restaurant multi-agent system.
 """
 
+from typing import Dict, Optional
 from .base import BaseAgent
+from .routing import SMALL_MODEL, LARGE_MODEL, output_prompt
 from .prompts import (
     DIETARY_ANALYSIS_PROMPT,
     GUEST_EXPERIENCE_PROMPT,
     SPECIAL_REQUESTS_PROMPT,
-    PERSONALIZATION_PROMPT
+    PERSONALIZATION_PROMPT,
+    COMPACT_DIETARY_ANALYSIS_SCHEMA,
+    COMPACT_GUEST_EXPERIENCE_SCHEMA,
+    COMPACT_SPECIAL_REQUESTS_SCHEMA,
+    COMPACT_PERSONALIZATION_SCHEMA
+)
+from .prepass import (
+    dietary_prepass,
+    guest_experience_prepass,
+    special_requests_prepass,
+    personalization_prepass,
+    seed_dietary_analysis,
+    merge_dietary_seed,
+    EMPTY_RESULTS,
+    SEED_VERSION
 )
 
 class DietaryAnalysisAgent(BaseAgent):
     """Agent focused on dietary restrictions, allergies, and preferences"""
-    
+
+    models = [SMALL_MODEL, LARGE_MODEL]
+    output_template = EMPTY_RESULTS["dietary_analysis"]
+
     def __init__(self):
-        super().__init__("Dietary Analysis Agent", DIETARY_ANALYSIS_PROMPT)
+        super().__init__("Dietary Analysis Agent", output_prompt(DIETARY_ANALYSIS_PROMPT, COMPACT_DIETARY_ANALYSIS_SCHEMA))
+
+    def prepass(self, diner: Dict, reservation: Dict) -> Optional[Dict]:
+        return dietary_prepass(diner, reservation)
+
+    def stage_key(self, diner: Dict, reservation: Optional[Dict]) -> str:
+        # Stored outputs include the seeded instructions, so the seeding rules are part of the key
+        return f"{SEED_VERSION}:{super().stage_key(diner, reservation)}"
+
+    def analyze(self, diner: Dict, reservation: Dict) -> Dict:
+        """Run the dietary analysis, then seed in preparation instructions known from dietary_tags"""
+        result = super().analyze(diner, reservation)
+        return merge_dietary_seed(result, seed_dietary_analysis(diner, reservation))
 
 
 class GuestExperienceAgent(BaseAgent):
     """Agent focused on past experiences, preferences, and service style"""
-    
+
+    # Depends only on the diner's history, so it runs once per diner
+    inputs = ("name", "reviews", "emails")
+
+    models = [SMALL_MODEL, LARGE_MODEL]
+    output_template = EMPTY_RESULTS["guest_experience"]
+
     def __init__(self):
-        super().__init__("Guest Experience Agent", GUEST_EXPERIENCE_PROMPT)
+        super().__init__("Guest Experience Agent", output_prompt(GUEST_EXPERIENCE_PROMPT, COMPACT_GUEST_EXPERIENCE_SCHEMA))
+
+    def prepass(self, diner: Dict, reservation: Dict) -> Optional[Dict]:
+        return guest_experience_prepass(diner, reservation)
 
 
 class SpecialRequestsAgent(BaseAgent):
     """Agent focused on explicit requests, modifications, and time-sensitive needs"""
-    
+
+    models = [SMALL_MODEL, LARGE_MODEL]
+    output_template = EMPTY_RESULTS["special_requests"]
+
     def __init__(self):
-        super().__init__("Special Requests Agent", SPECIAL_REQUESTS_PROMPT)
+        super().__init__("Special Requests Agent", output_prompt(SPECIAL_REQUESTS_PROMPT, COMPACT_SPECIAL_REQUESTS_SCHEMA))
+
+    def prepass(self, diner: Dict, reservation: Dict) -> Optional[Dict]:
+        return special_requests_prepass(diner, reservation)
 
 
 class PersonalizationAgent(BaseAgent):
     """Agent focused on personalization opportunities and upsell potential"""
-    
+
+    models = [LARGE_MODEL]
+    output_template = EMPTY_RESULTS["personalization"]
+
     def __init__(self):
-        super().__init__("Personalization Agent", PERSONALIZATION_PROMPT) 
\ No newline at end of file
+        super().__init__("Personalization Agent", output_prompt(PERSONALIZATION_PROMPT, COMPACT_PERSONALIZATION_SCHEMA))
+
+    def prepass(self, diner: Dict, reservation: Dict) -> Optional[Dict]:
+        return personalization_prepass(diner, reservation)
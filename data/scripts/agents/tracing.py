@@ -0,0 +1,237 @@
+"""
+Lightweight tracing for the restaurant multi-agent system.
+
+Spans form the hierarchy run → diner / reservation → agent → attempt → http,
+with backoff sleeps and JSON parsing as their own spans. Each span records its
+thread, and tasks submitted to a thread pool record how long they queued.
+Spans carry tags such as the model, API key index, token counts and outcome.
+
+Tracing is off unless `start_tracing()` is called; `span()` then costs one
+global lookup. Traces export as Chrome trace JSON, which chrome://tracing and
+https://ui.perfetto.dev open directly, and optionally to an OTLP/HTTP
+collector (e.g. http://localhost:4318/v1/traces) without extra dependencies.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_queue_wait = contextvars.ContextVar("queue_wait", default=None)
+
+class Span:
+    """One timed operation; use as a context manager"""
+
+    __slots__ = ("tracer", "name", "span_id", "parent_id", "thread_id", "start_ns", "end_ns", "attrs", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = tracer.next_id()
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+        self.start_ns = self.end_ns = 0
+        self._token = None
+
+    def set(self, **attrs):
+        """Add tags to the span"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        wait = _queue_wait.get()
+        if wait is not None:
+            self.attrs["queue_wait_ms"] = wait / 1e6
+            _queue_wait.set(None)
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs.setdefault("outcome", "error")
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.finish(self)
+        return False
+
+class _NullSpan:
+    """Stands in for a span when tracing is off"""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """Collects finished spans from every thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans: List[Span] = []
+        self.thread_names: Dict[int, str] = {}
+        self._next_id = 0
+        # Anchor perf_counter to wall time so spans can be exported with Unix timestamps
+        self.epoch_ns = time.time_ns() - time.perf_counter_ns()
+        self.trace_id = os.urandom(16).hex()
+
+    def next_id(self) -> int:
+        with self.lock:
+            self._next_id += 1
+            return self._next_id
+
+    def finish(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+            self.thread_names.setdefault(span.thread_id, threading.current_thread().name)
+
+    def to_chrome_trace(self) -> Dict:
+        """Return the spans as Chrome trace events"""
+        with self.lock:
+            spans = list(self.spans)
+            thread_names = dict(self.thread_names)
+        base_ns = min((span.start_ns for span in spans), default=0)
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        for span in sorted(spans, key=lambda span: span.start_ns):
+            args = dict(span.attrs, span_id=span.span_id)
+            if span.parent_id is not None:
+                args["parent_id"] = span.parent_id
+            events.append({
+                "name": span.name,
+                "cat": span.name,
+                "ph": "X",
+                "ts": (span.start_ns - base_ns) / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Write the trace as Chrome trace / Perfetto JSON"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+
+    def to_otlp(self, service_name: str = "laudure-agents") -> Dict:
+        """Return the spans as an OTLP/JSON ExportTraceServiceRequest"""
+        with self.lock:
+            spans = list(self.spans)
+        # OTLP span ids are 8 bytes; prefix the local counter with the trace id
+        span_id = lambda local_id: f"{self.trace_id[:8]}{local_id:08x}"
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span_id(span.span_id),
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(self.epoch_ns + span.start_ns),
+                "endTimeUnixNano": str(self.epoch_ns + span.end_ns),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attrs.items() if value is not None]
+                + [_otlp_attribute("thread.id", span.thread_id)]
+            }
+            if span.parent_id is not None:
+                otlp_span["parentSpanId"] = span_id(span.parent_id)
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}]
+            }]
+        }
+
+    def export_otlp(self, endpoint: str, timeout: float = 10.0):
+        """POST the spans to an OTLP/HTTP collector"""
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps(self.to_otlp(), default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+def _otlp_attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+_tracer: Optional[Tracer] = None
+
+def start_tracing() -> Tracer:
+    """Start collecting spans"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop collecting spans and return the tracer that collected them"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+def span(name: str, **attrs):
+    """Open a span under the current one; a no-op when tracing is off"""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return Span(tracer, name, attrs)
+
+def current_span():
+    """Return the innermost open span, or a no-op span"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _current_span.get() or _NULL_SPAN
+
+def record_span(name: str, duration: float, **attrs):
+    """Record a span starting now that lasts duration seconds, e.g. a backoff sleep about to happen"""
+    tracer = _tracer
+    if tracer is None:
+        return
+    recorded = Span(tracer, name, attrs)
+    recorded.start_ns = time.perf_counter_ns()
+    recorded.end_ns = recorded.start_ns + int(duration * 1e9)
+    tracer.finish(recorded)
+
+def in_current_context(func):
+    """Wrap func to run in the caller's context, e.g. in a thread pool
+
+    The call sees the caller's current span and deadline. With tracing on, it
+    also records how long it waited for a worker on its first span.
+    """
+    context = contextvars.copy_context()
+    if _tracer is None:
+        # Each submission gets its own copy, so concurrent tasks never share a context
+        return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+    submitted_ns = time.perf_counter_ns()
+
+    def run(*args, **kwargs):
+        def call():
+            _queue_wait.set(time.perf_counter_ns() - submitted_ns)
+            return func(*args, **kwargs)
+        return context.copy().run(call)
+    return run
@@ -0,0 +1,230 @@
+"""
+Watch mode for the restaurant multi-agent system.
+
+`watch_dataset` keeps the augmented output in step with the input dataset.
+Every few seconds it checks the input file, and optionally a drop directory of
+JSONL updates, and runs the pipeline only for reservations that are new or
+whose diner or booking changed since they were last briefed. The augmented
+output and the indexes derived from it are then replaced atomically.
+
+The last processed state is the augmented output itself: each briefed
+reservation is identified by a fingerprint of its diner and booking content,
+so restarting the watcher does not reprocess anything.
+
+Drop directory files (`*.jsonl`) hold one diner per line in the dataset
+format. Their reservations, reviews and emails are merged into the input
+dataset; a reservation with the same date and time as an existing one
+replaces it. Applied files are moved to `processed/`, unreadable ones to
+`failed/`.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .base import reset_metrics, strip_analysis
+from .cache import StageStore, content_hash
+from .planner import record_run_history
+from .processor import process_reservations, resolve_paths, save_augmented
+
+def diner_fingerprint(diner: Dict) -> str:
+    """Hash a diner's content, ignoring any agent analysis"""
+    content = dict(diner)
+    content["reservations"] = [strip_analysis(reservation) for reservation in diner.get("reservations") or []]
+    return content_hash(content)
+
+def briefing_fingerprint(diner_hash: str, reservation: Dict) -> str:
+    """Identify the inputs of one reservation's briefing"""
+    return content_hash([diner_hash, strip_analysis(reservation)])
+
+def merge_updates(diners: List[Dict], updates: List[Dict]) -> int:
+    """Merge diner updates into a list of diner dictionaries in place
+
+    Returns:
+        Number of reservations added or replaced
+    """
+    by_name = {diner["name"]: diner for diner in diners}
+    changed = 0
+    for update in updates:
+        diner = by_name.get(update["name"])
+        if diner is None:
+            diners.append(update)
+            by_name[update["name"]] = update
+            changed += len(update.get("reservations") or [])
+            continue
+
+        for field in ("reviews", "emails"):
+            existing = diner.get(field) or []
+            existing.extend(item for item in update.get(field) or [] if item not in existing)
+            if existing:
+                diner[field] = existing
+
+        reservations = diner.get("reservations") or []
+        for reservation in update.get("reservations") or []:
+            slot = (str(reservation["date"]), reservation.get("time", "19:00"))
+            for idx, current in enumerate(reservations):
+                if (str(current["date"]), current.get("time", "19:00")) == slot:
+                    reservations[idx] = reservation
+                    break
+            else:
+                reservations.append(reservation)
+            changed += 1
+        diner["reservations"] = reservations
+    return changed
+
+class DatasetWatcher:
+    """Incrementally brief reservations as the input dataset changes"""
+
+    def __init__(self, input_path: str, output_path: str, drop_dir: Optional[str] = None,
+                 max_workers: int = 8, cache_dir: Optional[str] = None, use_cache: bool = True,
+                 budget: Optional[float] = None):
+        self.input_path, self.output_path, self.cache_dir = resolve_paths(input_path, output_path, cache_dir)
+        self.drop_dir = Path(drop_dir) if drop_dir else None
+        self.max_workers = max_workers
+        self.budget = budget
+        self.stage_store = StageStore(self.cache_dir / "stages") if use_cache else None
+        self._input_signature = None
+        self.briefings = self._load_briefings()
+
+    def _load_briefings(self) -> Dict[str, Dict]:
+        """Map the fingerprint of each reservation already briefed to its analysis"""
+        from load_data import iter_diner_dicts
+
+        briefings = {}
+        if not self.output_path.exists():
+            return briefings
+        for diner in iter_diner_dicts(str(self.output_path)):
+            diner_hash = diner_fingerprint(diner)
+            for reservation in diner.get("reservations") or []:
+                if reservation.get("agent_analysis"):
+                    briefings[briefing_fingerprint(diner_hash, reservation)] = reservation["agent_analysis"]
+        return briefings
+
+    def apply_drops(self) -> int:
+        """Merge pending drop directory files into the input dataset
+
+        Returns:
+            Number of files applied
+        """
+        if self.drop_dir is None or not self.drop_dir.is_dir():
+            return 0
+        from load_data import iter_diner_dicts, write_diners_json
+
+        drops = sorted(self.drop_dir.glob("*.jsonl"))
+        if not drops:
+            return 0
+
+        diners = list(iter_diner_dicts(str(self.input_path)))
+        applied = 0
+        for drop in drops:
+            try:
+                with open(drop, encoding="utf-8") as f:
+                    updates = [json.loads(line) for line in f if line.strip()]
+                changed = merge_updates(diners, updates)
+                destination = "processed"
+                applied += 1
+                print(f"Applied {drop.name}: {changed} reservations added or updated")
+            except (ValueError, KeyError, TypeError) as e:
+                destination = "failed"
+                print(f"Could not apply {drop.name}: {e}")
+            (self.drop_dir / destination).mkdir(exist_ok=True)
+            os.replace(drop, self.drop_dir / destination / drop.name)
+
+        if applied:
+            write_diners_json(diners, str(self.input_path))
+        return applied
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.input_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def sync(self) -> int:
+        """Brief any new or changed reservations and rewrite the output
+
+        Returns:
+            Number of reservations sent through the pipeline
+        """
+        from load_data import DinersList
+
+        self.apply_drops()
+        signature = self._signature()
+        if signature is None or signature == self._input_signature:
+            return 0
+        self._input_signature = signature
+
+        try:
+            augmented_diners = [diner.dict() for diner in DinersList.load_from_json(str(self.input_path)).diners]
+        except Exception as e:
+            # Most likely a write in progress; the next change retriggers a sync
+            print(f"Skipping unreadable dataset: {e}")
+            return 0
+
+        fingerprints = {}
+        reservations_to_process = []
+        for diner_idx, diner in enumerate(augmented_diners):
+            diner_hash = diner_fingerprint(diner)
+            for res_idx, reservation in enumerate(diner.get("reservations") or []):
+                fingerprint = briefing_fingerprint(diner_hash, reservation)
+                fingerprints[(diner_idx, res_idx)] = fingerprint
+                if fingerprint in self.briefings:
+                    reservation["agent_analysis"] = self.briefings[fingerprint]
+                else:
+                    reservations_to_process.append((diner_idx, res_idx))
+
+        current = set(fingerprints.values())
+        if not reservations_to_process and current == set(self.briefings) and self.output_path.exists():
+            return 0
+
+        start_time = time.time()
+        reset_metrics()
+        analyses = process_reservations(augmented_diners, reservations_to_process, self.max_workers, self.stage_store,
+                                        self.budget)
+        for (diner_idx, res_idx), analysis in analyses.items():
+            augmented_diners[diner_idx]["reservations"][res_idx]["agent_analysis"] = analysis
+
+        if self.stage_store is not None:
+            self.stage_store.save()
+        save_augmented(augmented_diners, self.input_path, self.output_path)
+        if reservations_to_process:
+            record_run_history(self.cache_dir / "history.json")
+
+        # Briefings for reservations that no longer exist are dropped
+        self.briefings = {
+            fingerprints[position]: augmented_diners[position[0]]["reservations"][position[1]]["agent_analysis"]
+            for position in fingerprints
+            if augmented_diners[position[0]]["reservations"][position[1]].get("agent_analysis")
+        }
+        print(f"Briefed {len(analyses)}/{len(reservations_to_process)} new or changed reservations "
+              f"in {time.time() - start_time:.1f} seconds")
+        return len(reservations_to_process)
+
+def watch_dataset(input_path: str, output_path: str, drop_dir: Optional[str] = None, interval: float = 2.0,
+                  max_workers: int = 8, cache_dir: Optional[str] = None, use_cache: bool = True,
+                  budget: Optional[float] = None):
+    """Keep the augmented output up to date until interrupted
+
+    Args:
+        input_path: Path to the input JSON file
+        output_path: Path of the augmented JSON file to maintain
+        drop_dir: Optional directory of JSONL diner updates to merge into the input
+        interval: Seconds between checks for changes
+        max_workers: Maximum number of concurrent reservation processing tasks
+        cache_dir: Directory for persistent stage outputs (default: data/.cache)
+        use_cache: Replay unchanged stages from the cache directory
+        budget: Optional seconds each reservation may take
+    """
+    watcher = DatasetWatcher(input_path, output_path, drop_dir, max_workers, cache_dir, use_cache, budget)
+    print(f"Watching {watcher.input_path}" + (f" and {watcher.drop_dir}" if watcher.drop_dir else "")
+          + f" every {interval:g} seconds (Ctrl+C to stop)")
+    print(f"{len(watcher.briefings)} reservations already briefed in {watcher.output_path}")
+    try:
+        while True:
+            watcher.sync()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
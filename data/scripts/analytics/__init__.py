@@ -0,0 +1,3 @@
+"""
+Precomputed analytics for the restaurant dashboards.
+"""
@@ -0,0 +1,218 @@
+"""
+Menu and volume aggregates for the dashboard API routes.
+
+The aggregates are computed once per dataset version and written next to the
+dataset as `<dataset>.aggregates.json`. The Next.js routes read that file
+instead of scanning every reservation on each request.
+
+Every aggregate is a sum of per-reservation contributions, so new reservations
+can be folded into an existing artifact without rescanning the dataset. The
+fingerprints of reservations already counted are kept in a separate
+`<dataset>.aggregates.index.json` so the artifact the dashboards read stays small.
+
+Usage:
+    python -m scripts.analytics.aggregates [dataset.json]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# The atomic file helper is shared with the data scripts in the parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+from atomic_file import write_json_atomic
+
+# Bump when the artifact layout changes
+AGGREGATES_VERSION = 1
+
+TASTING_MENU = "Chef's Tasting Menu"
+
+# Must match menuCategories in src/lib/utils.ts
+MENU_CATEGORIES = {
+    "appetizers": ["Escargots", "Foie Gras", "Salmon Tartare", "Lobster Bisque", "Salade Niçoise"],
+    "mains": ["Beef Bourguignon", "Coq au Vin", "Duck Confit", "Rabbit Roulade", "Salmon en Papillote"],
+    "desserts": ["Chocolate Soufflé", "Crème Brûlée", "Tarte Tatin", "Profiteroles", "Mousse au Chocolat"]
+}
+
+# 30-minute service slots from 18:00 to 22:00, as in src/lib/volume-utils.ts
+TIME_SLOTS = ["18:00", "18:30", "19:00", "19:30", "20:00", "20:30", "21:00", "21:30", "22:00"]
+
+ITEM_CATEGORY = {item: category for category, items in MENU_CATEGORIES.items() for item in items}
+
+def aggregates_path(dataset_path) -> Path:
+    """Return the aggregates artifact path for a dataset"""
+    dataset_path = Path(dataset_path)
+    return dataset_path.with_name(f"{dataset_path.stem}.aggregates.json")
+
+def _index_path(dataset_path) -> Path:
+    dataset_path = Path(dataset_path)
+    return dataset_path.with_name(f"{dataset_path.stem}.aggregates.index.json")
+
+def file_hash(path) -> str:
+    """Return a hash of a file's bytes, used as the dataset version"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def reservation_fingerprint(diner_name: str, reservation: Dict) -> str:
+    """Identify a reservation by its diner and booking content, ignoring agent output"""
+    content = {key: value for key, value in reservation.items() if key != "agent_analysis"}
+    encoded = json.dumps([diner_name, content], sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+def empty_aggregates() -> Dict:
+    """Return aggregates for an empty dataset"""
+    return {
+        "version": AGGREGATES_VERSION,
+        "dataset_hash": None,
+        "reservations": 0,
+        "time_slots": TIME_SLOTS,
+        # Orders per item, as printed by scripts/augment/count.py
+        "item_counts": {},
+        # Guests per item (party size per order), as used by /api/menu-analytics
+        "item_covers": {},
+        "tasting_menu_covers": 0,
+        # Guests per item in each course
+        "course_covers": {category: {} for category in MENU_CATEGORIES},
+        # Guests per item per time slot, orders split evenly across the party,
+        # as used by /api/volume-data
+        "slot_volume": {
+            category: {item: [0] * len(TIME_SLOTS) for item in items + [TASTING_MENU]}
+            for category, items in MENU_CATEGORIES.items()
+        }
+    }
+
+def add_reservation(aggregates: Dict, reservation: Dict, sign: int = 1):
+    """Add (or with sign=-1, remove) one reservation's contribution"""
+    people = reservation.get("number_of_people") or 1
+    orders = reservation.get("orders") or []
+    aggregates["reservations"] += sign
+
+    courses = {category: [] for category in MENU_CATEGORIES}
+    has_tasting_menu = False
+    for order in orders:
+        item = order["item"]
+        aggregates["item_counts"][item] = aggregates["item_counts"].get(item, 0) + sign
+        if item == TASTING_MENU:
+            aggregates["tasting_menu_covers"] += sign * people
+            has_tasting_menu = True
+            continue
+        aggregates["item_covers"][item] = aggregates["item_covers"].get(item, 0) + sign * people
+        category = ITEM_CATEGORY.get(item)
+        if category:
+            covers = aggregates["course_covers"][category]
+            covers[item] = covers.get(item, 0) + sign * people
+            courses[category].append(item)
+
+    if reservation.get("time") not in TIME_SLOTS:
+        return
+    slot = TIME_SLOTS.index(reservation["time"])
+    for category, items in courses.items():
+        volume = aggregates["slot_volume"][category]
+        if has_tasting_menu:
+            volume[TASTING_MENU][slot] += sign * people
+        # Split the party evenly across the dishes ordered in this course
+        for item in items:
+            volume[item][slot] += sign * people / len(items)
+
+def _iter_reservations(data: Dict) -> Iterable[Tuple[str, Dict]]:
+    for diner in data["diners"]:
+        for reservation in diner.get("reservations") or []:
+            yield diner["name"], reservation
+
+def _save(dataset_path, aggregates: Dict, fingerprints: List[str]):
+    write_json_atomic(aggregates_path(dataset_path), aggregates)
+    write_json_atomic(_index_path(dataset_path), fingerprints)
+
+def build_aggregates(dataset_path) -> Dict:
+    """Compute aggregates from scratch and write the artifact"""
+    with open(dataset_path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    aggregates = empty_aggregates()
+    fingerprints = []
+    for diner_name, reservation in _iter_reservations(data):
+        add_reservation(aggregates, reservation)
+        fingerprints.append(reservation_fingerprint(diner_name, reservation))
+    aggregates["dataset_hash"] = file_hash(dataset_path)
+
+    _save(dataset_path, aggregates, fingerprints)
+    return aggregates
+
+def update_aggregates(dataset_path, new_reservations: Optional[List[Tuple[str, Dict]]] = None) -> Dict:
+    """Bring the artifact up to date with the dataset
+
+    This function:
+    1. Returns the existing artifact if the dataset version is unchanged,
+       touching it so it is not older than the dataset file
+    2. Folds in only reservations not counted yet, matching each occurrence
+       of a fingerprint against one counted occurrence
+    3. Falls back to a full rebuild if reservations were removed or changed,
+       or if no usable artifact exists
+
+    Args:
+        dataset_path: Path to the diners JSON file
+        new_reservations: Optional (diner name, reservation) pairs known to be new.
+            When given, the dataset is not rescanned.
+
+    Returns:
+        The up-to-date aggregates
+    """
+    artifact = aggregates_path(dataset_path)
+    index = _index_path(dataset_path)
+    if not artifact.exists() or not index.exists():
+        return build_aggregates(dataset_path)
+
+    with open(artifact, encoding="utf-8") as f:
+        aggregates = json.load(f)
+    with open(index) as f:
+        fingerprints = json.load(f)
+    if aggregates.get("version") != AGGREGATES_VERSION:
+        return build_aggregates(dataset_path)
+
+    dataset_hash = file_hash(dataset_path)
+    if aggregates.get("dataset_hash") == dataset_hash:
+        # The dashboards trust the artifact only if it is newer than the dataset
+        os.utime(artifact)
+        return aggregates
+
+    # Identical reservations share a fingerprint, so occurrences are counted
+    counted = Counter(fingerprints)
+    if new_reservations is None:
+        with open(dataset_path, encoding="utf-8") as f:
+            data = json.load(f)
+        current = [(reservation_fingerprint(name, res), res) for name, res in _iter_reservations(data)]
+        if counted - Counter(fingerprint for fingerprint, _ in current):
+            # Something was removed or edited; contributions cannot be recovered
+            return build_aggregates(dataset_path)
+    else:
+        # The caller vouches these are new, even if identical to one already counted
+        counted = Counter()
+        current = [(reservation_fingerprint(name, res), res) for name, res in new_reservations]
+
+    added = 0
+    for fingerprint, reservation in current:
+        if counted[fingerprint] > 0:
+            # This occurrence is already in the aggregates
+            counted[fingerprint] -= 1
+            continue
+        add_reservation(aggregates, reservation)
+        fingerprints.append(fingerprint)
+        added += 1
+    aggregates["dataset_hash"] = dataset_hash
+
+    _save(dataset_path, aggregates, fingerprints)
+    print(f"Folded {added} new reservations into {artifact.name}")
+    return aggregates
+
+if __name__ == "__main__":
+    data_dir = Path(__file__).parent.parent.parent
+    dataset = Path(sys.argv[1]) if len(sys.argv) > 1 else data_dir / "augmented-fine-dining-dataset.json"
+    result = update_aggregates(dataset)
+    print(f"Aggregates for {result['reservations']} reservations written to {aggregates_path(dataset)}")
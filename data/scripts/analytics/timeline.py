@@ -0,0 +1,154 @@
+"""
+Per-service timeline index for the /api/timeline-data route.
+
+The index is written at augmentation time next to the augmented dataset, as a
+`<dataset>.timeline/` directory with one partition per service date:
+
+    index.json          manifest: dates, reservation counts and tag/allergen rollups
+    2024-05-20.json     that night's reservations, sorted by time
+
+Each partition holds only the fields the timeline needs, in the same shape as
+ReservationDetail in src/types/index.ts, so fetching one night's service reads
+one small file instead of the full augmented dataset.
+
+Usage:
+    python -m scripts.analytics.timeline [agent-augmented-dataset.json]
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# The atomic file helper is shared with the data scripts in the parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+from atomic_file import write_json_atomic
+
+# Bump when the partition layout changes
+TIMELINE_INDEX_VERSION = 1
+
+URGENCY_RANK = {"green": 0, "orange": 1, "red": 2}
+STATUS_BY_URGENCY = {"red": "urgent", "orange": "attention", "green": "normal"}
+
+def timeline_index_dir(dataset_path) -> Path:
+    """Return the timeline index directory for an augmented dataset"""
+    dataset_path = Path(dataset_path)
+    return dataset_path.with_name(f"{dataset_path.stem}.timeline")
+
+def _time_key(time: str) -> int:
+    # Same ordering as the timeline route: "18:30" sorts as 1830
+    return int(time.replace(":", ""))
+
+def reservation_detail(diner: Dict, reservation: Dict, reservation_id: int) -> Optional[Dict]:
+    """Build the timeline entry for a reservation, or None if it has no kitchen notes
+
+    Mirrors getReservationDetails in src/lib/timeline-utils.ts.
+    """
+    analysis = reservation.get("agent_analysis")
+    if not analysis:
+        return None
+    # Like the TypeScript `||`, fall back to chef_notes only when kitchen_notes
+    # is missing; an empty list is kept and leaves the reservation off the timeline
+    kitchen_notes = (analysis.get("coordinator_summary") or {}).get("kitchen_notes")
+    if kitchen_notes is None:
+        kitchen_notes = analysis.get("chef_notes") or []
+    if not kitchen_notes:
+        return None
+
+    tags = []
+    most_urgent = "green"
+    for note in kitchen_notes:
+        for tag in note.get("tags") or []:
+            if tag not in tags:
+                tags.append(tag)
+        if URGENCY_RANK.get(note.get("urgency"), 0) > URGENCY_RANK[most_urgent]:
+            most_urgent = note["urgency"]
+
+    return {
+        "id": reservation_id,
+        "name": diner["name"],
+        "people": reservation["number_of_people"],
+        "time": reservation["time"],
+        "date": str(reservation["date"]),
+        "status": STATUS_BY_URGENCY[most_urgent],
+        "tags": tags,
+        "dishes": [order["item"] for order in reservation.get("orders") or []],
+        "notes": [
+            {
+                "note": note.get("note"),
+                "dish": note.get("dish"),
+                "tags": note.get("tags") or [],
+                "urgency": note.get("urgency")
+            }
+            for note in kitchen_notes
+        ]
+    }
+
+def _allergens(reservation: Dict) -> List[str]:
+    dietary = ((reservation.get("agent_analysis") or {}).get("agent_analysis") or {}).get("dietary_analysis") or {}
+    return [str(allergy["item"]).lower() for allergy in dietary.get("allergies") or [] if allergy.get("item")]
+
+def build_timeline_index(diners: List[Dict], dataset_path) -> Dict:
+    """Partition augmented reservations by service date and write the index
+
+    This function:
+    1. Builds a timeline entry for every reservation with kitchen notes,
+       numbering them in dataset order like the timeline route does
+    2. Groups entries by service date and sorts each partition by time
+    3. Rolls up tag and allergen counts per date for the manifest
+    4. Writes each partition atomically, then the manifest last, and removes
+       partitions for dates that no longer have reservations
+
+    Args:
+        diners: Augmented diner dictionaries
+        dataset_path: Path of the augmented dataset the index belongs to
+
+    Returns:
+        The manifest that was written
+    """
+    partitions: Dict[str, List[Dict]] = {}
+    rollups: Dict[str, Dict] = {}
+    next_id = 1
+    for diner in diners:
+        for reservation in diner.get("reservations") or []:
+            detail = reservation_detail(diner, reservation, next_id)
+            if detail is None:
+                continue
+            next_id += 1
+            service_date = detail["date"]
+            partitions.setdefault(service_date, []).append(detail)
+
+            rollup = rollups.setdefault(service_date, {"reservations": 0, "guests": 0, "urgent": 0, "tags": {}, "allergens": {}})
+            rollup["reservations"] += 1
+            rollup["guests"] += detail["people"]
+            rollup["urgent"] += detail["status"] == "urgent"
+            for tag in detail["tags"]:
+                rollup["tags"][tag] = rollup["tags"].get(tag, 0) + 1
+            for allergen in _allergens(reservation):
+                rollup["allergens"][allergen] = rollup["allergens"].get(allergen, 0) + 1
+
+    index_dir = timeline_index_dir(dataset_path)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    for service_date, entries in partitions.items():
+        entries.sort(key=lambda entry: _time_key(entry["time"]))
+        write_json_atomic(index_dir / f"{service_date}.json", entries)
+
+    manifest = {
+        "version": TIMELINE_INDEX_VERSION,
+        "dates": {service_date: rollups[service_date] for service_date in sorted(partitions)}
+    }
+    write_json_atomic(index_dir / "index.json", manifest)
+
+    for partition in index_dir.glob("*.json"):
+        if partition.name != "index.json" and partition.stem not in partitions:
+            partition.unlink()
+
+    return manifest
+
+if __name__ == "__main__":
+    data_dir = Path(__file__).parent.parent.parent
+    dataset = Path(sys.argv[1]) if len(sys.argv) > 1 else data_dir / "agent-augmented-fine-dining-dataset.json"
+    with open(dataset, encoding="utf-8") as f:
+        data = json.load(f)
+    result = build_timeline_index(data["diners"], dataset)
+    print(f"Timeline index for {len(result['dates'])} service dates written to {timeline_index_dir(dataset)}")
@@ -0,0 +1,45 @@
+"""
+Atomic file writes for the dataset, cache and artifact files.
+
+A file is written to a temporary file in the same directory, which replaces
+the target only once it is complete, so readers never see a partial file.
+"""
+
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+# Mode of a file written where none existed, readable by the dashboard server
+NEW_FILE_MODE = 0o644
+
+@contextmanager
+def atomic_write(path, encoding: str = "utf-8"):
+    """Open a temporary file for writing text, and move it over path if the block succeeds
+
+    mkstemp creates files readable by their owner only, so the temporary file
+    gets the mode of the file it replaces, or NEW_FILE_MODE for a new file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def write_json_atomic(path, data: Any, indent: Optional[int] = None):
+    """Write JSON to a temporary file and move it into place"""
+    with atomic_write(path) as f:
+        json.dump(data, f, indent=indent, default=str)
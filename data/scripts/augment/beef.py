@@ -1,23 +1,20 @@
-import json
-import os
+import sys
+from pathlib import Path
+
+# Make the normalization stage importable when run as a plain script
+sys.path.append(str(Path(__file__).parent))
+
+from normalize import normalize_dataset
 
 # Path to your JSON file
 file_path = 'augmented-fine-dining-dataset.json'
 
-# Read the file
+# Apply the menu alias table (menu_aliases.json) to menu fields only
 try:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        
-    # Make the replacements
-    updated_content = content.replace('Beef Bourguignon/Boeuf Bourguignon', 'Beef Bourguignon')
-    updated_content = updated_content.replace('Boeuf Bourguignon', 'Beef Bourguignon')
-    
-    # Write the updated content back to the file
-    with open(file_path, 'w', encoding='utf-8') as file:
-        file.write(updated_content)
-    
+    counts = normalize_dataset(file_path)
+    for alias, count in counts.items():
+        print(f'- {alias}: {count}')
     print('Replacements completed successfully.')
-    
+
 except Exception as e:
     print(f'Error: {e}')
@@ -1,21 +1,14 @@
-import json
+import sys
+from pathlib import Path
 
-# Load the JSON data
-with open('fine-dining-dataset.json', 'r') as file:
-    data = json.load(file)
+# Make the scripts package importable when run as a plain script
+sys.path.append(str(Path(__file__).parent.parent.parent))
 
-# Create a dictionary to store items and their counts
-item_counts = {}
+from scripts.analytics.aggregates import update_aggregates
 
-# Extract items from each diner's reservations
-for diner in data['diners']:
-    for reservation in diner['reservations']:
-        for order in reservation['orders']:
-            item = order['item']
-            if item in item_counts:
-                item_counts[item] += 1
-            else:
-                item_counts[item] = 1
+# Load the precomputed aggregates, rebuilding them only if the dataset changed
+aggregates = update_aggregates('fine-dining-dataset.json')
+item_counts = aggregates['item_counts']
 
 # Print all items and their counts
 print(f"Total unique items: {len(item_counts)}")
@@ -0,0 +1,99 @@
+"""
+Menu name normalization over parsed diner data.
+
+Aliases are loaded from a JSON table ({"alias": "canonical name"}) and applied
+in one pass with a single compiled pattern, however many aliases there are.
+Only menu fields are rewritten: Order.item, plus the dish names in kitchen notes
+and preparation instructions of any agent_analysis. Reviews, emails and other
+free text are never touched.
+
+Diners are streamed through one at a time and written to a temporary file that
+replaces the original only once the whole dataset has been written.
+
+Usage:
+    python scripts/augment/normalize.py [dataset.json] [--aliases menu_aliases.json] [--output out.json]
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from load_data import iter_diner_dicts, write_diners_json
+
+DEFAULT_ALIASES = Path(__file__).parent / "menu_aliases.json"
+
+class MenuNormalizer:
+    """Apply an alias table to menu fields and count replacements per alias"""
+
+    def __init__(self, aliases: Dict[str, str]):
+        self.aliases = aliases
+        self.counts = {alias: 0 for alias in aliases}
+        # Longest aliases first so "A/B" wins over its substring "B"
+        alternatives = sorted(aliases, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(alias) for alias in alternatives) + r")(?!\w)"
+        ) if aliases else None
+
+    @classmethod
+    def from_file(cls, path) -> "MenuNormalizer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _replace(self, match):
+        alias = match.group(0)
+        self.counts[alias] += 1
+        return self.aliases[alias]
+
+    def normalize_name(self, name):
+        if self.pattern is None or not isinstance(name, str):
+            return name
+        return self.pattern.sub(self._replace, name)
+
+    def normalize_diner(self, diner: Dict) -> Dict:
+        """Normalize menu fields of one diner in place"""
+        for reservation in diner.get("reservations") or []:
+            for order in reservation.get("orders") or []:
+                order["item"] = self.normalize_name(order.get("item"))
+
+            analysis = reservation.get("agent_analysis") or {}
+            kitchen_notes = (analysis.get("coordinator_summary") or {}).get("kitchen_notes") or []
+            dietary = (analysis.get("agent_analysis") or {}).get("dietary_analysis") or {}
+            for entry in kitchen_notes + (dietary.get("preparation_instructions") or []):
+                if isinstance(entry, dict) and "dish" in entry:
+                    entry["dish"] = self.normalize_name(entry["dish"])
+        return diner
+
+def normalize_dataset(input_path, output_path=None, aliases_path=DEFAULT_ALIASES) -> Dict[str, int]:
+    """Normalize menu names in a dataset in one streaming pass
+
+    Args:
+        input_path: Path to the diners JSON file
+        output_path: Where to write the result (default: rewrite input_path)
+        aliases_path: Path to the JSON alias table
+
+    Returns:
+        Number of replacements made per alias
+    """
+    normalizer = MenuNormalizer.from_file(aliases_path)
+    diners = (normalizer.normalize_diner(diner) for diner in iter_diner_dicts(str(input_path)))
+    write_diners_json(diners, Path(output_path or input_path))
+    return normalizer.counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize menu item names with an alias table")
+    parser.add_argument("input", nargs="?", default="augmented-fine-dining-dataset.json", help="Dataset to normalize")
+    parser.add_argument("--aliases", default=str(DEFAULT_ALIASES), help="JSON alias table (default: menu_aliases.json)")
+    parser.add_argument("--output", default=None, help="Output path (default: rewrite the input in place)")
+    args = parser.parse_args()
+
+    with open(args.aliases, encoding="utf-8") as f:
+        aliases = json.load(f)
+    counts = normalize_dataset(args.input, args.output, args.aliases)
+    for alias, count in counts.items():
+        print(f"- {alias} -> {aliases[alias]}: {count}")
+    print(f"Normalization completed: {sum(counts.values())} replacements.")
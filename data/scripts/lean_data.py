@@ -0,0 +1,208 @@
+"""
+Compact read-only representation of the diners dataset.
+
+The Pydantic models in load_data.py validate input but cost several hundred
+bytes per object plus a dict per instance. Analytics and scheduling code only
+reads the data, so it can use these `__slots__` classes instead:
+
+- Strings that repeat across the dataset (item names, tags, times, names) are
+  interned, and dates are shared per distinct day
+- Orders are immutable and identical orders share one object
+- Each reservation holds a reference to its diner rather than a copy
+
+The classes also answer `obj["field"]`, `obj.get("field")`, `keys()` and
+`items()`, with `items()` giving nested objects as plain values, so the
+aggregates, timeline and columnar code written against the JSON dictionaries
+reads them unchanged and computes the same results and fingerprints.
+
+Example:
+    dataset = load_lean("fine-dining-dataset.json", include_text=False)
+    for reservation in dataset.iter_reservations():
+        print(reservation.diner.name, reservation.time)
+"""
+
+import sys
+from datetime import date
+from typing import Dict, Iterator, Optional, Tuple
+
+from load_data import iter_diner_dicts
+
+class _Lean:
+    """Read-only mapping access over the fields listed in FIELDS"""
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def items(self):
+        """Return (field, value) pairs with nested objects as plain values, as in to_dict()"""
+        return self.to_dict().items()
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def _init(self, **values):
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def to_dict(self) -> Dict:
+        """Return the object as a plain dictionary in the JSON dataset layout"""
+        result = {}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if isinstance(value, tuple) and value and isinstance(value[0], _Lean):
+                value = [item.to_dict() for item in value]
+            elif isinstance(value, tuple):
+                value = list(value)
+            result[key] = value
+        return result
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.FIELDS[:2])
+        return f"{type(self).__name__}({fields}, ...)"
+
+class LeanReview(_Lean):
+    __slots__ = ("restaurant_name", "date", "rating", "content")
+    FIELDS = __slots__
+
+    def __init__(self, restaurant_name: str, date: date, rating: int, content: str):
+        self._init(restaurant_name=restaurant_name, date=date, rating=rating, content=content)
+
+class LeanEmail(_Lean):
+    __slots__ = ("date", "subject", "combined_thread")
+    FIELDS = __slots__
+
+    def __init__(self, date: date, subject: str, combined_thread: str):
+        self._init(date=date, subject=subject, combined_thread=combined_thread)
+
+class LeanOrder(_Lean):
+    __slots__ = ("item", "dietary_tags", "price")
+    FIELDS = __slots__
+
+    def __init__(self, item: str, dietary_tags: Tuple[str, ...], price: float):
+        self._init(item=item, dietary_tags=dietary_tags, price=price)
+
+class LeanReservation(_Lean):
+    __slots__ = ("diner", "date", "time", "number_of_people", "orders", "agent_analysis")
+    FIELDS = ("date", "number_of_people", "orders", "time", "agent_analysis")
+
+    def __init__(self, diner: "LeanDiner", date: date, time: str, number_of_people: int,
+                 orders: Tuple[LeanOrder, ...], agent_analysis: Optional[Dict] = None):
+        self._init(diner=diner, date=date, time=time, number_of_people=number_of_people,
+                   orders=orders, agent_analysis=agent_analysis)
+
+class LeanDiner(_Lean):
+    __slots__ = ("name", "reviews", "reservations", "emails")
+    FIELDS = __slots__
+
+    def __init__(self, name: str):
+        self._init(name=name, reviews=(), reservations=(), emails=())
+
+class LeanDataset:
+    """All diners in lean form, with shared strings, dates and orders"""
+    __slots__ = ("diners",)
+
+    def __init__(self, diners: Tuple[LeanDiner, ...]):
+        self.diners = diners
+
+    def __len__(self):
+        return len(self.diners)
+
+    def __iter__(self):
+        return iter(self.diners)
+
+    def iter_reservations(self) -> Iterator[LeanReservation]:
+        """Yield every reservation; each one links back to its diner"""
+        for diner in self.diners:
+            yield from diner.reservations
+
+    def reservations_on(self, service_date: date):
+        """Return the reservations for one service date, sorted by time"""
+        return sorted(
+            (res for res in self.iter_reservations() if res.date == service_date),
+            key=lambda res: res.time
+        )
+
+class _Interner:
+    """Canonical instances for values that repeat across the dataset"""
+
+    def __init__(self):
+        self.dates: Dict[str, date] = {}
+        self.tags: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self.orders: Dict[Tuple, LeanOrder] = {}
+
+    def date(self, value) -> date:
+        value = str(value)
+        cached = self.dates.get(value)
+        if cached is None:
+            cached = self.dates[value] = date.fromisoformat(value)
+        return cached
+
+    def order(self, order: Dict) -> LeanOrder:
+        tags = tuple(sys.intern(tag) for tag in order.get("dietary_tags") or ())
+        tags = self.tags.setdefault(tags, tags)
+        key = (order["item"], tags, order["price"])
+        cached = self.orders.get(key)
+        if cached is None:
+            cached = self.orders[key] = LeanOrder(sys.intern(order["item"]), tags, float(order["price"]))
+        return cached
+
+def lean_diner(diner: Dict, interner: Optional[_Interner] = None, include_text: bool = True) -> LeanDiner:
+    """Convert one diner dictionary (or Diner model) to lean form
+
+    Args:
+        diner: Diner dictionary as found in the JSON files, or a Diner model
+        interner: Shared interner, so values are shared across diners
+        include_text: Keep reviews and emails; analytics that only read
+            reservations can drop them to save most of the memory
+    """
+    if hasattr(diner, "dict"):
+        diner = diner.dict()
+    interner = interner or _Interner()
+    lean = LeanDiner(sys.intern(diner["name"]))
+
+    reservations = tuple(
+        LeanReservation(
+            lean,
+            interner.date(res["date"]),
+            sys.intern(res.get("time") or "19:00"),
+            res["number_of_people"],
+            tuple(interner.order(order) for order in res.get("orders") or ()),
+            res.get("agent_analysis")
+        )
+        for res in diner.get("reservations") or ()
+    )
+    object.__setattr__(lean, "reservations", reservations)
+
+    if include_text:
+        object.__setattr__(lean, "reviews", tuple(
+            LeanReview(sys.intern(review["restaurant_name"]), interner.date(review["date"]), review["rating"], review["content"])
+            for review in diner.get("reviews") or ()
+        ))
+        object.__setattr__(lean, "emails", tuple(
+            LeanEmail(interner.date(email["date"]), email["subject"], email["combined_thread"])
+            for email in diner.get("emails") or ()
+        ))
+    return lean
+
+def load_lean(json_path: str, include_text: bool = True) -> LeanDataset:
+    """Stream a diners JSON file into a LeanDataset
+
+    The file is read one diner at a time, so the raw JSON for the whole dataset
+    is never held in memory. The input is not validated; use
+    DinersList.load_from_json for that.
+    """
+    interner = _Interner()
+    return LeanDataset(tuple(lean_diner(diner, interner, include_text) for diner in iter_diner_dicts(json_path)))
@@ -1,10 +1,11 @@
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 from pydantic import BaseModel, Field
 from datetime import date, datetime
 import json
-import os
 from pathlib import Path
 
+from atomic_file import atomic_write
+
 class Review(BaseModel):
     restaurant_name: str
     date: date
@@ -60,7 +61,16 @@ class DinersList(BaseModel):
         
         with open(json_path) as f:
             data = json.load(f)
-            
+        
+        return cls.from_data(data)
+    
+    @classmethod
+    def from_data(cls, data: Dict) -> "DinersList":
+        """Validate a {"diners": [...]} dictionary as parsed from JSON
+        
+        Converts string dates to datetime.date objects and adds the default
+        time to reservations without one, as load_from_json does.
+        """
         # Convert date strings to date objects and ensure all required fields exist
         for diner in data["diners"]:
             if diner.get("reviews"):
@@ -90,7 +100,109 @@ class DinersList(BaseModel):
             json.dump(self.dict(), f, indent=2, default=str)
         
         print(f"Data saved to: {json_path}")
+
+    @classmethod
+    def load_from_sqlite(cls, db_path: str) -> "DinersList":
+        """Load diners data from an indexed SQLite store (see scripts/sqlite_store.py)"""
+        from sqlite_store import SQLiteStore
+
+        print(f"Loading data from: {db_path}")
+        with SQLiteStore(db_path) as store:
+            return cls(diners=[Diner(**diner) for diner in store.iter_diners()])
+
+    def save_to_sqlite(self, db_path: str):
+        """Save the diners list to an indexed SQLite store, replacing its contents"""
+        from sqlite_store import SQLiteStore
+
+        with SQLiteStore(db_path) as store:
+            store.replace_diners(diner.dict() for diner in self.diners)
+
+        print(f"Data saved to: {db_path}")
+
+def iter_diner_dicts(json_path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Stream raw diner dictionaries from a {"diners": [...]} JSON file
+    
+    Only one diner is held in memory at a time, so large exports can be
+    processed in a single linear pass without loading the whole file.
+    
+    Args:
+        json_path: Path to the JSON file containing diner data
+        chunk_size: Number of characters read from the file at a time
+        
+    Yields:
+        Each diner as a plain dictionary, with dates left as strings
+    """
+    decoder = json.JSONDecoder()
+    with open(json_path, encoding="utf-8") as f:
+        buffer = ""
+        position = 0
+        
+        def fill():
+            nonlocal buffer, position
+            chunk = f.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            return bool(chunk)
+        
+        def skip_whitespace():
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer) or not fill():
+                    return
+        
+        def expect(token):
+            nonlocal position
+            skip_whitespace()
+            if not buffer.startswith(token, position):
+                raise ValueError(f"Expected {token!r} at diner stream position {position} in {json_path}")
+            position += len(token)
+        
+        fill()
+        expect("{")
+        expect('"diners"')
+        expect(":")
+        expect("[")
+        skip_whitespace()
+        if buffer.startswith("]", position):
+            return
+        while True:
+            skip_whitespace()
+            while True:
+                try:
+                    diner, end = decoder.raw_decode(buffer, position)
+                    break
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+            position = end
+            yield diner
+            skip_whitespace()
+            if buffer.startswith(",", position):
+                position += 1
+            else:
+                expect("]")
+                return
+
+def write_diners_json(diners: Iterable[Dict], json_path: str):
+    """Stream diners into a {"diners": [...]} JSON file
+    
+    Diners are written one at a time to a temporary file in the same directory,
+    which replaces json_path only once every diner has been written. The layout
+    matches the existing dataset files (two-space indentation).
     
+    Args:
+        diners: Diner dictionaries, consumed lazily
+        json_path: Path of the file to write
+    """
+    with atomic_write(json_path) as f:
+        f.write('{\n  "diners": [')
+        for i, diner in enumerate(diners):
+            encoded = json.dumps(diner, indent=2, default=str).replace("\n", "\n    ")
+            f.write(("," if i else "") + "\n    " + encoded)
+        f.write("\n  ]\n}")
+
 if __name__ == "__main__":
     # Test loading
     script_dir = Path(__file__).parent
@@ -0,0 +1,272 @@
+"""
+Indexed SQLite storage backend for DinersList.
+
+Diners, reviews, emails, reservations, orders and agent analyses live in
+normalized tables, with indexes on reservation date/time and diner name.
+Writing one reservation's agent_analysis updates one row, and date-range
+queries use the index instead of scanning the whole dataset.
+
+The JSON files remain the interchange format: `import_json` and `export_json`
+convert in both directions, streaming one diner at a time. An import replaces
+whatever the database held, in a single transaction.
+
+Usage:
+    python scripts/sqlite_store.py import augmented-fine-dining-dataset.json diners.db
+    python scripts/sqlite_store.py export diners.db agent-augmented-fine-dining-dataset.json
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from load_data import iter_diner_dicts, write_diners_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS diners (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    diner_id INTEGER NOT NULL REFERENCES diners(id),
+    restaurant_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS emails (
+    id INTEGER PRIMARY KEY,
+    diner_id INTEGER NOT NULL REFERENCES diners(id),
+    date TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    combined_thread TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY,
+    diner_id INTEGER NOT NULL REFERENCES diners(id),
+    date TEXT NOT NULL,
+    time TEXT NOT NULL DEFAULT '19:00',
+    number_of_people INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    reservation_id INTEGER NOT NULL REFERENCES reservations(id),
+    item TEXT NOT NULL,
+    dietary_tags TEXT NOT NULL,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agent_analyses (
+    reservation_id INTEGER PRIMARY KEY REFERENCES reservations(id),
+    analysis TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_diners_name ON diners(name);
+CREATE INDEX IF NOT EXISTS idx_reservations_date_time ON reservations(date, time);
+CREATE INDEX IF NOT EXISTS idx_reservations_diner ON reservations(diner_id);
+CREATE INDEX IF NOT EXISTS idx_orders_reservation ON orders(reservation_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_diner ON reviews(diner_id);
+CREATE INDEX IF NOT EXISTS idx_emails_diner ON emails(diner_id);
+"""
+
+class SQLiteStore:
+    """DinersList data stored in normalized SQLite tables
+
+    Row ids preserve the order of the source JSON. An export writes the layout
+    of the augmented dataset files, adds the default time to reservations
+    without one and leaves out empty lists, so a file already in that form,
+    such as augmented-fine-dining-dataset.json, round-trips byte-for-byte.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----- Import / export -----
+
+    def add_diner(self, diner: Dict) -> int:
+        """Insert one diner and everything attached to it; returns the diner id"""
+        with self._lock, self.conn:
+            return self._insert_diner(diner)
+
+    def _insert_diner(self, diner: Dict) -> int:
+        cur = self.conn.execute("INSERT INTO diners (name) VALUES (?)", (diner["name"],))
+        diner_id = cur.lastrowid
+        self.conn.executemany(
+            "INSERT INTO reviews (diner_id, restaurant_name, date, rating, content) VALUES (?, ?, ?, ?, ?)",
+            [(diner_id, r["restaurant_name"], str(r["date"]), r["rating"], r["content"]) for r in diner.get("reviews") or []]
+        )
+        self.conn.executemany(
+            "INSERT INTO emails (diner_id, date, subject, combined_thread) VALUES (?, ?, ?, ?)",
+            [(diner_id, str(e["date"]), e["subject"], e["combined_thread"]) for e in diner.get("emails") or []]
+        )
+        for reservation in diner.get("reservations") or []:
+            cur = self.conn.execute(
+                "INSERT INTO reservations (diner_id, date, time, number_of_people) VALUES (?, ?, ?, ?)",
+                (diner_id, str(reservation["date"]), reservation.get("time") or "19:00", reservation["number_of_people"])
+            )
+            reservation_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO orders (reservation_id, item, dietary_tags, price) VALUES (?, ?, ?, ?)",
+                [(reservation_id, o["item"], json.dumps(o["dietary_tags"]), o["price"]) for o in reservation.get("orders") or []]
+            )
+            if reservation.get("agent_analysis") is not None:
+                self.conn.execute(
+                    "INSERT INTO agent_analyses (reservation_id, analysis) VALUES (?, ?)",
+                    (reservation_id, json.dumps(reservation["agent_analysis"], default=str))
+                )
+        return diner_id
+
+    def replace_diners(self, diners: Iterable[Dict]) -> int:
+        """Replace every stored diner with the given diners in one transaction
+
+        Returns:
+            Number of diners written
+        """
+        count = 0
+        with self._lock, self.conn:
+            for table in ("agent_analyses", "orders", "reservations", "reviews", "emails", "diners"):
+                self.conn.execute(f"DELETE FROM {table}")
+            for diner in diners:
+                self._insert_diner(diner)
+                count += 1
+        return count
+
+    def import_json(self, json_path: str) -> int:
+        """Replace the stored diners with a {"diners": [...]} JSON file
+
+        Diners are streamed from the file into one transaction, so an error
+        part-way through leaves the store as it was.
+
+        Returns:
+            Number of diners imported
+        """
+        return self.replace_diners(iter_diner_dicts(json_path))
+
+    def export_json(self, json_path: str):
+        """Write every diner back out in the JSON dataset format"""
+        write_diners_json(self.iter_diners(), json_path)
+
+    # ----- Reads -----
+
+    def _reservation_dicts(self, reservation_rows: List[sqlite3.Row]) -> List[Tuple[int, Dict]]:
+        """Attach orders and agent analyses to reservation rows"""
+        if not reservation_rows:
+            return []
+        ids = [row["id"] for row in reservation_rows]
+        placeholders = ",".join("?" * len(ids))
+        orders: Dict[int, List[Dict]] = {}
+        for row in self.conn.execute(
+            f"SELECT reservation_id, item, dietary_tags, price FROM orders WHERE reservation_id IN ({placeholders}) ORDER BY id", ids
+        ):
+            orders.setdefault(row["reservation_id"], []).append(
+                {"item": row["item"], "dietary_tags": json.loads(row["dietary_tags"]), "price": row["price"]}
+            )
+        analyses = {
+            row["reservation_id"]: json.loads(row["analysis"])
+            for row in self.conn.execute(
+                f"SELECT reservation_id, analysis FROM agent_analyses WHERE reservation_id IN ({placeholders})", ids
+            )
+        }
+        result = []
+        for row in reservation_rows:
+            reservation = {
+                "date": row["date"],
+                "number_of_people": row["number_of_people"],
+                "orders": orders.get(row["id"], []),
+                "time": row["time"]
+            }
+            if row["id"] in analyses:
+                reservation["agent_analysis"] = analyses[row["id"]]
+            result.append((row["id"], reservation))
+        return result
+
+    def _diner_dict(self, diner_row: sqlite3.Row) -> Dict:
+        diner_id = diner_row["id"]
+        reviews = [
+            {"restaurant_name": r["restaurant_name"], "date": r["date"], "rating": r["rating"], "content": r["content"]}
+            for r in self.conn.execute("SELECT * FROM reviews WHERE diner_id = ? ORDER BY id", (diner_id,))
+        ]
+        reservation_rows = self.conn.execute("SELECT * FROM reservations WHERE diner_id = ? ORDER BY id", (diner_id,)).fetchall()
+        emails = [
+            {"date": e["date"], "subject": e["subject"], "combined_thread": e["combined_thread"]}
+            for e in self.conn.execute("SELECT * FROM emails WHERE diner_id = ? ORDER BY id", (diner_id,))
+        ]
+        return {
+            "name": diner_row["name"],
+            "reviews": reviews or None,
+            "reservations": [reservation for _, reservation in self._reservation_dicts(reservation_rows)] or None,
+            "emails": emails or None
+        }
+
+    def iter_diners(self) -> Iterator[Dict]:
+        """Yield every diner as a dictionary in the JSON dataset format"""
+        with self._lock:
+            diner_rows = self.conn.execute("SELECT * FROM diners ORDER BY id").fetchall()
+        for diner_row in diner_rows:
+            with self._lock:
+                diner = self._diner_dict(diner_row)
+            yield {key: value for key, value in diner.items() if value is not None}
+
+    def find_diners(self, name: str) -> List[Dict]:
+        """Return diners with an exact name match, using the name index"""
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM diners WHERE name = ? ORDER BY id", (name,)).fetchall()
+            return [self._diner_dict(row) for row in rows]
+
+    def reservations_between(self, start: date, end: date) -> List[Tuple[int, str, Dict]]:
+        """Return (reservation id, diner name, reservation) for bookings from start to end inclusive
+
+        Uses the (date, time) index; results are ordered by date and time.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT reservations.*, diners.name AS diner_name FROM reservations "
+                "JOIN diners ON diners.id = reservations.diner_id "
+                "WHERE reservations.date BETWEEN ? AND ? ORDER BY reservations.date, reservations.time",
+                (str(start), str(end))
+            ).fetchall()
+            names = {row["id"]: row["diner_name"] for row in rows}
+            return [(res_id, names[res_id], reservation) for res_id, reservation in self._reservation_dicts(rows)]
+
+    # ----- Writes -----
+
+    def set_agent_analysis(self, reservation_id: int, analysis: Optional[Dict]):
+        """Store (or with None, clear) one reservation's agent_analysis as a single row write"""
+        with self._lock, self.conn:
+            if analysis is None:
+                self.conn.execute("DELETE FROM agent_analyses WHERE reservation_id = ?", (reservation_id,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO agent_analyses (reservation_id, analysis) VALUES (?, ?) "
+                    "ON CONFLICT(reservation_id) DO UPDATE SET analysis = excluded.analysis",
+                    (reservation_id, json.dumps(analysis, default=str))
+                )
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print(__doc__)
+        sys.exit(1)
+    command, source, target = sys.argv[1:]
+    if command == "import":
+        with SQLiteStore(target) as store:
+            print(f"Imported {store.import_json(source)} diners into {target}")
+    else:
+        with SQLiteStore(source) as store:
+            store.export_json(target)
+        print(f"Exported {source} to {target}")
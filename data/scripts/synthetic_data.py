@@ -0,0 +1,312 @@
+"""
+Seeded synthetic diners data at any scale.
+
+`SyntheticDataset` generates diners that validate as a `DinersList`, from a
+few thousand reservations up to millions, so loading, augmenting, saving
+and counting can be measured on realistic sizes. Menu items and prices,
+restaurant names, review texts and email subjects are drawn from
+fine-dining-dataset.json, so item and tag cardinality match the real data.
+The generator is deterministic for a given seed and settings and streams
+one diner at a time, so memory stays flat at any scale.
+
+The settings control the distributions that drive the cost of each stage:
+
+- repeat_rate / mean_repeat_bookings: the share of diners who book more than
+  once, and how often they return (reservations per diner)
+- mean_reviews: the length of each diner's review history
+- mean_emails / mean_thread_messages: the number of email threads per diner
+  and the messages in each thread. Later messages quote the earlier ones, and
+  carry signatures and restaurant boilerplate, like real threads
+- dietary_rate / restriction_rate: the share of orders with dietary tags, and
+  of diners with a standing restriction that appears in every order and email
+
+Usage:
+    python scripts/synthetic_data.py --reservations 100000 --output synthetic.json
+    python scripts/synthetic_data.py --reservations 1000000 --format jsonl --output synthetic.jsonl
+    python scripts/synthetic_data.py --reservations 1000000 --format shards --shard-size 100000 --output synthetic/
+"""
+
+import argparse
+import json
+import math
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from atomic_file import atomic_write
+from load_data import write_diners_json
+
+BASE_DATASET = Path(__file__).parent.parent / "fine-dining-dataset.json"
+
+FIRST_NAMES = [
+    "Emily", "James", "Sofia", "Liam", "Olivia", "Noah", "Ava", "Ethan", "Mia", "Lucas", "Chloe", "Mateo",
+    "Grace", "Daniel", "Zoe", "Henry", "Aria", "Samuel", "Nora", "Leo", "Isabel", "Owen", "Hana", "Elias",
+    "Priya", "Marcus", "Yuki", "Andre", "Fatima", "Diego", "Ingrid", "Kwame", "Lena", "Rafael", "Mei", "Omar"
+]
+LAST_NAMES = [
+    "Chen", "Martin", "Garcia", "Nguyen", "Okafor", "Rossi", "Kim", "Dubois", "Patel", "Johansson", "Silva",
+    "Hayes", "Cohen", "Tanaka", "Moreau", "Novak", "Mensah", "Schmidt", "Alvarez", "Brown", "Ivanova",
+    "Wright", "Kowalski", "Haddad", "Murphy", "Costa", "Lindqvist", "Osei", "Fischer", "Reyes", "Sato", "Olsen"
+]
+
+DIETARY_TAGS = ["gluten-free", "nut-free", "dairy-free", "shellfish-free", "pescatarian", "vegetarian", "vegan"]
+# Relative frequency of each tag on tagged orders
+TAG_WEIGHTS = [5, 4, 3, 2, 3, 2, 1]
+
+TIMES = ["17:30", "18:00", "18:30", "19:00", "19:30", "20:00", "20:30", "21:00", "21:30"]
+TIME_WEIGHTS = [1, 3, 5, 8, 8, 6, 4, 2, 1]
+PARTY_SIZES = [1, 2, 3, 4, 5, 6, 8, 10]
+PARTY_WEIGHTS = [3, 40, 8, 12, 3, 3, 2, 1]
+
+OCCASIONS = ["a birthday", "an anniversary", "a promotion", "an engagement", "a graduation", "a retirement",
+             "a family reunion"]
+REQUESTS = [
+    "Could we have a quiet corner table?",
+    "We'd love a window seat if one is available.",
+    "Is the private dining room free that evening?",
+    "One of our guests uses a wheelchair, so step-free access would be wonderful.",
+    "Could you recommend a wine pairing for the tasting menu?",
+    "We'll bring our own bottle; what is the corkage fee?",
+    "Would it be possible to arrange flowers on the table?",
+    "Please seat us away from the kitchen doors."
+]
+RESTRICTION_LINES = {
+    "gluten-free": "I have celiac disease, so everything I eat needs to be strictly gluten-free.",
+    "nut-free": "I have a severe nut allergy; please make sure the kitchen avoids any cross-contact.",
+    "dairy-free": "I'm lactose intolerant, so dairy-free dishes would be appreciated.",
+    "shellfish-free": "I'm allergic to shellfish, please keep it off my plate entirely.",
+    "pescatarian": "I eat fish but no meat, so a pescatarian menu would be ideal.",
+    "vegetarian": "I'm vegetarian; could the chef adapt the tasting menu?",
+    "vegan": "I follow a vegan diet; are there plant-based options for every course?"
+}
+SIGNATURES = ["Best regards,\n{first}", "Thanks so much,\n{first}", "Warmly,\n{first} {last}",
+              "Cheers,\n{first}\nSent from my iPhone"]
+RESTAURANT_REPLIES = [
+    "Thank you for reaching out. We have noted your request and look forward to welcoming you.",
+    "Certainly. Our team will take care of this and confirm the details the day before.",
+    "We would be delighted to help. Could you let us know the exact arrival time?",
+    "Noted with thanks. The chef has been informed."
+]
+RESTAURANT_FOOTER = ("French Laudure Reservations\n"
+                     "This email and any attachments are confidential and intended solely for the addressee.")
+
+def _count(rng: random.Random, mean: float, minimum: int = 0) -> int:
+    """Draw a long-tailed count (geometric) with the given mean and minimum"""
+    extra = mean - minimum
+    if extra <= 0:
+        return minimum
+    # Geometric number of failures before a success, with mean `extra`
+    return minimum + int(math.log(1.0 - rng.random()) / math.log(extra / (extra + 1)))
+
+class _BasePools:
+    """Menu, restaurant, review and subject pools drawn from the base dataset"""
+
+    def __init__(self, base_path: Path):
+        with open(base_path, encoding="utf-8") as f:
+            diners = json.load(f)["diners"]
+        self.menu: Dict[str, List[float]] = {}
+        for diner in diners:
+            for reservation in diner.get("reservations") or []:
+                for order in reservation["orders"]:
+                    self.menu.setdefault(order["item"], []).append(order["price"])
+        self.items = sorted(self.menu)
+        self.restaurants = sorted({review["restaurant_name"] for diner in diners for review in diner.get("reviews") or []})
+        self.reviews = [review["content"] for diner in diners for review in diner.get("reviews") or []]
+        self.subjects = [email["subject"] for diner in diners for email in diner.get("emails") or []]
+        self.messages = [email["combined_thread"] for diner in diners for email in diner.get("emails") or []]
+
+class SyntheticDataset:
+    """Deterministic generator of schema-valid diners
+
+    Args:
+        reservations: Total number of reservations to generate
+        seed: Random seed; the same seed and settings give the same data
+        repeat_rate: Share of diners with more than one booking
+        mean_repeat_bookings: Mean bookings of a repeat diner (at least 2)
+        mean_reviews: Mean reviews per diner
+        mean_emails: Mean email threads per diner
+        mean_thread_messages: Mean messages per email thread (at least 1)
+        dietary_rate: Share of orders tagged with a dietary tag
+        restriction_rate: Share of diners with a standing dietary restriction
+        start: First reservation date
+        days: Number of days reservations are spread over
+        base_path: Dataset the menu, restaurants and texts are drawn from
+    """
+
+    def __init__(self, reservations: int, seed: int = 0, repeat_rate: float = 0.3,
+                 mean_repeat_bookings: float = 3.0, mean_reviews: float = 2.0, mean_emails: float = 1.0,
+                 mean_thread_messages: float = 2.0, dietary_rate: float = 0.15, restriction_rate: float = 0.2,
+                 start: date = date(2024, 1, 1), days: int = 730, base_path: Path = BASE_DATASET):
+        self.reservations = reservations
+        self.seed = seed
+        self.repeat_rate = repeat_rate
+        self.mean_repeat_bookings = max(2.0, mean_repeat_bookings)
+        self.mean_reviews = mean_reviews
+        self.mean_emails = mean_emails
+        self.mean_thread_messages = max(1.0, mean_thread_messages)
+        self.dietary_rate = dietary_rate
+        self.restriction_rate = restriction_rate
+        self.start = start
+        self.days = days
+        self.pools = _BasePools(base_path)
+
+    def _name(self, index: int):
+        """Return (first, last, unique full name) for the index-th diner"""
+        combinations = len(FIRST_NAMES) * len(LAST_NAMES)
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        return first, last, f"{first} {last}" if index < combinations else f"{first} {last} #{index // combinations}"
+
+    def _order(self, rng: random.Random, restriction: Optional[str]) -> Dict:
+        item = rng.choice(self.pools.items)
+        tags = []
+        if restriction is not None:
+            tags.append(restriction)
+        elif rng.random() < self.dietary_rate:
+            tags.append(rng.choices(DIETARY_TAGS, TAG_WEIGHTS)[0])
+        return {"item": item, "dietary_tags": tags, "price": rng.choice(self.pools.menu[item])}
+
+    def _reservation(self, rng: random.Random, day: date, restriction: Optional[str]) -> Dict:
+        party_size = rng.choices(PARTY_SIZES, PARTY_WEIGHTS)[0]
+        return {
+            "date": day.isoformat(),
+            "time": rng.choices(TIMES, TIME_WEIGHTS)[0],
+            "number_of_people": party_size,
+            "orders": [self._order(rng, restriction) for _ in range(rng.randint(1, min(6, party_size + 1)))]
+        }
+
+    def _review(self, rng: random.Random, before: date) -> Dict:
+        content = rng.choice(self.pools.reviews)
+        if rng.random() < 0.3:
+            content += " " + rng.choice(self.pools.reviews)
+        return {
+            "restaurant_name": rng.choice(self.pools.restaurants),
+            "date": (before - timedelta(days=rng.randrange(1, 730))).isoformat(),
+            "rating": rng.choices([1, 2, 3, 4, 5], [1, 2, 4, 8, 10])[0],
+            "content": content
+        }
+
+    def _guest_message(self, rng: random.Random, first: str, last: str, restriction: Optional[str]) -> str:
+        lines = [rng.choice(self.pools.messages)]
+        if restriction is not None and rng.random() < 0.7:
+            lines.append(RESTRICTION_LINES[restriction])
+        if rng.random() < 0.4:
+            lines.append(rng.choice(REQUESTS))
+        if rng.random() < 0.25:
+            lines.append(f"It's {rng.choice(OCCASIONS)} celebration, so anything special would mean a lot.")
+        return " ".join(lines) + "\n\n" + rng.choice(SIGNATURES).format(first=first, last=last)
+
+    def _email(self, rng: random.Random, first: str, last: str, sent: date, restriction: Optional[str]) -> Dict:
+        messages = []
+        previous_author = None
+        for position in range(_count(rng, self.mean_thread_messages, 1)):
+            if position % 2 == 0:
+                message = self._guest_message(rng, first, last, restriction)
+                author = f"{first} {last}"
+            else:
+                message = rng.choice(RESTAURANT_REPLIES) + "\n\n" + RESTAURANT_FOOTER
+                author = "French Laudure"
+            if messages:
+                # Replies quote the whole thread so far, as mail clients do
+                quoted = "\n".join("> " + line for line in messages[-1].splitlines())
+                message += f"\n\nOn {sent.isoformat()}, {previous_author} wrote:\n{quoted}"
+            messages.append(message)
+            previous_author = author
+        return {
+            "date": sent.isoformat(),
+            "subject": rng.choice(self.pools.subjects),
+            "combined_thread": "\n\n".join(messages)
+        }
+
+    def iter_diners(self) -> Iterator[Dict]:
+        """Yield diners until the requested number of reservations is reached"""
+        rng = random.Random(self.seed)
+        remaining = self.reservations
+        index = 0
+        while remaining > 0:
+            first, last, name = self._name(index)
+            bookings = _count(rng, self.mean_repeat_bookings, 2) if rng.random() < self.repeat_rate else 1
+            bookings = min(bookings, remaining)
+            restriction = rng.choices(DIETARY_TAGS, TAG_WEIGHTS)[0] if rng.random() < self.restriction_rate else None
+
+            days = sorted(self.start + timedelta(days=rng.randrange(self.days)) for _ in range(bookings))
+            reservations = [self._reservation(rng, day, restriction) for day in days]
+            reviews = [self._review(rng, days[0]) for _ in range(_count(rng, self.mean_reviews))]
+            emails = [
+                self._email(rng, first, last, rng.choice(days) - timedelta(days=rng.randrange(1, 15)), restriction)
+                for _ in range(_count(rng, self.mean_emails))
+            ]
+            yield {"name": name, "reviews": reviews, "reservations": reservations, "emails": emails}
+            remaining -= bookings
+            index += 1
+
+    def write_json(self, path: str):
+        """Write a single {"diners": [...]} file, like the base dataset"""
+        write_diners_json(self.iter_diners(), path)
+
+    def write_jsonl(self, path: str):
+        """Write one diner per line"""
+        with atomic_write(path) as f:
+            for diner in self.iter_diners():
+                f.write(json.dumps(diner) + "\n")
+
+    def write_shards(self, directory: str, shard_size: int) -> List[Path]:
+        """Write {"diners": [...]} files of about shard_size reservations each
+
+        Diners are never split across shards.
+
+        Returns:
+            Paths of the shards written, in order
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths, shard, shard_reservations = [], [], 0
+        for diner in self.iter_diners():
+            shard.append(diner)
+            shard_reservations += len(diner["reservations"])
+            if shard_reservations >= shard_size:
+                paths.append(directory / f"diners-{len(paths):05d}.json")
+                write_diners_json(shard, paths[-1])
+                shard, shard_reservations = [], 0
+        if shard:
+            paths.append(directory / f"diners-{len(paths):05d}.json")
+            write_diners_json(shard, paths[-1])
+        return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic diners dataset")
+    parser.add_argument("--reservations", type=int, default=10_000, help="Number of reservations (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", type=str, required=True, help="Output file, or directory for --format shards")
+    parser.add_argument("--format", choices=["json", "jsonl", "shards"], default="json", help="Output format (default: json)")
+    parser.add_argument("--shard-size", type=int, default=100_000, help="Reservations per shard, for --format shards (default: 100000)")
+    parser.add_argument("--repeat-rate", type=float, default=0.3, help="Share of diners with more than one booking (default: 0.3)")
+    parser.add_argument("--mean-repeat-bookings", type=float, default=3.0, help="Mean bookings of a repeat diner (default: 3)")
+    parser.add_argument("--mean-reviews", type=float, default=2.0, help="Mean reviews per diner (default: 2)")
+    parser.add_argument("--mean-emails", type=float, default=1.0, help="Mean email threads per diner (default: 1)")
+    parser.add_argument("--mean-thread-messages", type=float, default=2.0, help="Mean messages per email thread (default: 2)")
+    parser.add_argument("--dietary-rate", type=float, default=0.15, help="Share of orders with a dietary tag (default: 0.15)")
+    parser.add_argument("--restriction-rate", type=float, default=0.2, help="Share of diners with a standing restriction (default: 0.2)")
+    args = parser.parse_args()
+
+    dataset = SyntheticDataset(
+        args.reservations,
+        seed=args.seed,
+        repeat_rate=args.repeat_rate,
+        mean_repeat_bookings=args.mean_repeat_bookings,
+        mean_reviews=args.mean_reviews,
+        mean_emails=args.mean_emails,
+        mean_thread_messages=args.mean_thread_messages,
+        dietary_rate=args.dietary_rate,
+        restriction_rate=args.restriction_rate
+    )
+    if args.format == "shards":
+        paths = dataset.write_shards(args.output, args.shard_size)
+        print(f"Wrote {args.reservations} reservations to {len(paths)} shards in {args.output}")
+    else:
+        (dataset.write_jsonl if args.format == "jsonl" else dataset.write_json)(args.output)
+        print(f"Wrote {args.reservations} reservations to {args.output}")
+
+if __name__ == "__main__":
+    main()
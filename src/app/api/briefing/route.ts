@@ -0,0 +1,54 @@
+/**
+ * Briefing API Route
+ *
+ * This API endpoint requests a fresh briefing for a single reservation from the local
+ * briefing service (`python augment.py --serve` in the data directory). Identical concurrent
+ * requests are coalesced by the service, so several devices can ask for the same briefing
+ * without multiplying LLM calls.
+ *
+ * Endpoint: POST /api/briefing
+ *
+ * Request body:
+ * - name: diner name
+ * - date: reservation date (YYYY-MM-DD)
+ * - time (optional): reservation time (HH:MM)
+ *
+ * Response:
+ * - { briefing, coalesced } where briefing has the same shape as a reservation's agent_analysis
+ *
+ * Error handling:
+ * - Passes through 400, 404 and 503 (with Retry-After) from the briefing service
+ * - Returns 502 status if the briefing service cannot be reached
+ */
+
+import { NextResponse } from "next/server";
+
+const BRIEFING_SERVICE_URL =
+  process.env.BRIEFING_SERVICE_URL ?? "http://127.0.0.1:8765";
+
+export async function POST(request: Request) {
+  try {
+    const body = await request.json();
+    const response = await fetch(`${BRIEFING_SERVICE_URL}/briefings`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+
+    const headers: Record<string, string> = {};
+    const retryAfter = response.headers.get("Retry-After");
+    if (retryAfter) {
+      headers["Retry-After"] = retryAfter;
+    }
+    return NextResponse.json(await response.json(), {
+      status: response.status,
+      headers,
+    });
+  } catch (error) {
+    console.error("Error requesting briefing:", error);
+    return NextResponse.json(
+      { error: "Briefing service unavailable" },
+      { status: 502 }
+    );
+  }
+}
@@ -2,8 +2,9 @@
  * Menu Analytics API Route
  *
  * This API endpoint provides processed menu analytics data for visualizing menu item popularity.
- * It loads the dining dataset and transforms it into a format optimized for menu analytics
- * visualizations.
+ * It reads the precomputed aggregates written by the Python data layer, falling back to
+ * loading the dining dataset when they are missing or stale, and transforms them into a
+ * format optimized for menu analytics visualizations.
  *
  * Endpoint: GET /api/menu-analytics
  *
@@ -18,17 +19,19 @@
 import { NextResponse } from "next/server";
 import {
   loadDinersData,
+  loadDatasetAggregates,
   getMenuAnalytics,
+  getMenuAnalyticsFromAggregates,
   addColorsToMenuAnalytics,
 } from "@/lib/menu-utils";
 
 export async function GET() {
   try {
-    // Load data
-    const data = await loadDinersData();
-
-    // Process data
-    const menuAnalytics = getMenuAnalytics(data);
+    // Prefer precomputed aggregates over a full scan of the dataset
+    const aggregates = await loadDatasetAggregates();
+    const menuAnalytics = aggregates
+      ? getMenuAnalyticsFromAggregates(aggregates)
+      : getMenuAnalytics(await loadDinersData());
 
     // Add colors
     const coloredAnalytics = addColorsToMenuAnalytics(menuAnalytics);
@@ -2,11 +2,14 @@
  * Timeline Data API Route
  *
  * This API endpoint provides processed reservation data for the restaurant timeline visualization.
- * It loads the agent-augmented dining dataset and transforms it into a format optimized for
- * the timeline interface.
+ * It reads the per-service timeline index written at augmentation time, falling back to
+ * loading the agent-augmented dining dataset when the index is missing or stale.
  *
  * Endpoint: GET /api/timeline-data
  *
+ * Query parameters:
+ * - date (optional): service date (YYYY-MM-DD); only that night's partition is read
+ *
  * Response:
  * - Array of ReservationDetail objects containing comprehensive information about each reservation
  *   including guest details, time, status, tags, dishes, and kitchen notes
@@ -18,16 +21,22 @@
 import { NextResponse } from "next/server";
 import {
   loadAgentAugmentedData,
+  loadTimelineIndex,
   getReservationDetails,
 } from "@/lib/timeline-utils";
 
-export async function GET() {
+export async function GET(request: Request) {
   try {
-    // Load agent-augmented data
-    const data = await loadAgentAugmentedData();
+    const date = new URL(request.url).searchParams.get("date") ?? undefined;
 
-    // Process reservation details
-    const reservationDetails = getReservationDetails(data);
+    // Prefer the precomputed timeline index over reshaping the full dataset
+    let reservationDetails = await loadTimelineIndex(date);
+    if (!reservationDetails) {
+      const data = await loadAgentAugmentedData();
+      reservationDetails = getReservationDetails(data).filter(
+        (reservation) => !date || reservation.date === date
+      );
+    }
 
     // Return processed data
     return NextResponse.json(reservationDetails);
@@ -2,8 +2,9 @@
  * Volume Data API Route
  *
  * This API endpoint provides processed dining volume data for time-based visualizations.
- * It loads the dining dataset and transforms it into a format optimized for volume charts
- * showing the distribution of orders across time slots.
+ * It reads the precomputed aggregates written by the Python data layer, falling back to
+ * loading the dining dataset when they are missing or stale, and transforms them into a
+ * format optimized for volume charts showing the distribution of orders across time slots.
  *
  * Endpoint: GET /api/volume-data
  *
@@ -16,16 +17,19 @@
  */
 
 import { NextResponse } from "next/server";
-import { loadDinersData } from "@/lib/menu-utils";
-import { getDetailedVolumeData } from "@/lib/volume-utils";
+import { loadDinersData, loadDatasetAggregates } from "@/lib/menu-utils";
+import {
+  getDetailedVolumeData,
+  getDetailedVolumeDataFromAggregates,
+} from "@/lib/volume-utils";
 
 export async function GET() {
   try {
-    // Load data
-    const data = await loadDinersData();
-
-    // Process detailed data for volume charts
-    const detailedData = getDetailedVolumeData(data);
+    // Prefer precomputed aggregates over a full scan of the dataset
+    const aggregates = await loadDatasetAggregates();
+    const detailedData = aggregates
+      ? getDetailedVolumeDataFromAggregates(aggregates)
+      : getDetailedVolumeData(await loadDinersData());
 
     // Return processed data
     return NextResponse.json(detailedData);
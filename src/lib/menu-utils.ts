@@ -7,7 +7,9 @@
  *
  * Key functions:
  * - loadDinersData: Loads the augmented dining dataset
+ * - loadDatasetAggregates: Loads the precomputed aggregates written by the Python data layer
  * - getMenuAnalytics: Processes data to get menu item popularity counts
+ * - getMenuAnalyticsFromAggregates: Builds the same counts from precomputed aggregates
  * - addColorsToMenuAnalytics: Enhances analytics with consistent color schemes
  *
  * The module supports:
@@ -17,7 +19,7 @@
  * - Application of consistent color schemes for visualization
  */
 
-import { DinersList, MenuAnalytics } from "@/types/api";
+import { DatasetAggregates, DinersList, MenuAnalytics } from "@/types/api";
 import path from "path";
 import fs from "fs";
 import { menuCategories, colorSchemes } from "@/lib/utils";
@@ -33,6 +35,39 @@ export async function loadDinersData(): Promise<DinersList> {
   return JSON.parse(fileContents) as DinersList;
 }
 
+// Load precomputed aggregates, or null if they are missing or older than the dataset
+export async function loadDatasetAggregates(): Promise<DatasetAggregates | null> {
+  const datasetPath = path.join(
+    process.cwd(),
+    "data",
+    "augmented-fine-dining-dataset.json"
+  );
+  const aggregatesPath = path.join(
+    process.cwd(),
+    "data",
+    "augmented-fine-dining-dataset.aggregates.json"
+  );
+  try {
+    const aggregatesStat = fs.statSync(aggregatesPath);
+    const datasetStat = fs.statSync(datasetPath);
+    if (aggregatesStat.mtimeMs < datasetStat.mtimeMs) return null;
+    const fileContents = fs.readFileSync(aggregatesPath, "utf8");
+    return JSON.parse(fileContents) as DatasetAggregates;
+  } catch {
+    return null;
+  }
+}
+
+// Build menu item counts from precomputed aggregates
+export function getMenuAnalyticsFromAggregates(
+  aggregates: DatasetAggregates
+): MenuAnalytics {
+  return buildMenuAnalytics(
+    { ...aggregates.item_covers },
+    aggregates.tasting_menu_covers
+  );
+}
+
 // Process data to get menu item counts
 export function getMenuAnalytics(data: DinersList): MenuAnalytics {
   const itemCounts: Record<string, number> = {};
@@ -57,6 +92,14 @@ export function getMenuAnalytics(data: DinersList): MenuAnalytics {
     });
   });
 
+  return buildMenuAnalytics(itemCounts, chefsTastingMenuCount);
+}
+
+// Distribute tasting menu guests and organize item counts by category
+function buildMenuAnalytics(
+  itemCounts: Record<string, number>,
+  chefsTastingMenuCount: number
+): MenuAnalytics {
   // Distribute Chef's Tasting Menu counts across all dishes
   if (chefsTastingMenuCount > 0) {
     // Add 0.2 to each dish for every person who ordered Chef's Tasting Menu
@@ -7,6 +7,7 @@
  *
  * Key functions:
  * - loadAgentAugmentedData: Loads the AI-augmented dining dataset
+ * - loadTimelineIndex: Loads reservation details from the per-service timeline index
  * - getKitchenNotes: Extracts and processes kitchen notes from the dataset
  * - getReservationDetails: Creates comprehensive reservation objects with all relevant details
  *
@@ -40,6 +41,54 @@ export async function loadAgentAugmentedData() {
   return JSON.parse(fileContents) as DinerData;
 }
 
+// Load reservation details from the per-service timeline index written at
+// augmentation time. Reads a single partition when a date is given. Returns
+// null if the index is missing or older than the augmented dataset.
+export async function loadTimelineIndex(
+  date?: string
+): Promise<ReservationDetail[] | null> {
+  const dataDir = path.join(process.cwd(), "data");
+  const datasetPath = path.join(
+    dataDir,
+    "agent-augmented-fine-dining-dataset.json"
+  );
+  const indexDir = path.join(
+    dataDir,
+    "agent-augmented-fine-dining-dataset.timeline"
+  );
+  const manifestPath = path.join(indexDir, "index.json");
+
+  try {
+    if (fs.statSync(manifestPath).mtimeMs < fs.statSync(datasetPath).mtimeMs) {
+      return null;
+    }
+    const manifest = JSON.parse(fs.readFileSync(manifestPath, "utf8")) as {
+      dates: Record<string, unknown>;
+    };
+
+    const dates = date ? [date] : Object.keys(manifest.dates);
+    const reservationDetails = dates
+      .filter((serviceDate) => serviceDate in manifest.dates)
+      .flatMap(
+        (serviceDate) =>
+          JSON.parse(
+            fs.readFileSync(path.join(indexDir, `${serviceDate}.json`), "utf8")
+          ) as ReservationDetail[]
+      );
+
+    // Restore dataset order, then sort by time as getReservationDetails does
+    return reservationDetails
+      .sort((a, b) => a.id - b.id)
+      .sort((a, b) => {
+        const timeA = parseInt(a.time.replace(":", ""));
+        const timeB = parseInt(b.time.replace(":", ""));
+        return timeA - timeB;
+      });
+  } catch {
+    return null;
+  }
+}
+
 // Extract kitchen notes from agent-augmented data
 export function getKitchenNotes(data: DinerData) {
   const kitchenNotes: ProcessedKitchenNote[] = [];
@@ -8,6 +8,7 @@
  * Key functions:
  * - getVolumeData: Processes reservation data into time-based volume counts by meal category
  * - getDetailedVolumeData: Creates detailed time-series data for each specific menu item
+ * - getDetailedVolumeDataFromAggregates: Formats the same data from precomputed aggregates
  *
  * The module supports:
  * - Time-slot based aggregation (30-minute intervals from 18:00 to 22:00)
@@ -16,7 +17,7 @@
  * - Color scheme application for consistent visualization
  */
 
-import { DinersList } from "@/types/api";
+import { DatasetAggregates, DinersList } from "@/types/api";
 import { menuCategories, colorSchemes } from "@/lib/utils";
 
 // Process data for volume chart
@@ -190,6 +191,29 @@ export function getDetailedVolumeData(data: DinersList) {
     });
   });
 
+  return formatDetailedVolumeData(timeSlots, result);
+}
+
+// Format detailed volume data from precomputed aggregates
+export function getDetailedVolumeDataFromAggregates(
+  aggregates: DatasetAggregates
+) {
+  return formatDetailedVolumeData(aggregates.time_slots, {
+    ...aggregates.slot_volume,
+    colors: colorSchemes,
+  });
+}
+
+// Format per-item slot volumes for the charts
+function formatDetailedVolumeData(
+  timeSlots: string[],
+  result: {
+    appetizers: Record<string, number[]>;
+    mains: Record<string, number[]>;
+    desserts: Record<string, number[]>;
+    colors: typeof colorSchemes;
+  }
+) {
   // Format the data for the charts
   const formatChartData = (category: "appetizers" | "mains" | "desserts") => {
     return timeSlots.map((time, index) => {
@@ -47,3 +47,16 @@ export interface MenuAnalytics {
   mains: MenuItemCount[];
   desserts: MenuItemCount[];
 }
+
+// Precomputed aggregates written by data/scripts/analytics/aggregates.py
+export interface DatasetAggregates {
+  version: number;
+  dataset_hash: string;
+  reservations: number;
+  time_slots: string[];
+  item_counts: Record<string, number>;
+  item_covers: Record<string, number>;
+  tasting_menu_covers: number;
+  course_covers: Record<"appetizers" | "mains" | "desserts", Record<string, number>>;
+  slot_volume: Record<"appetizers" | "mains" | "desserts", Record<string, number[]>>;
+}
@@ -149,6 +149,11 @@ export interface AgentAnalysis {
     kitchen_notes?: KitchenNote[];
   };
   chef_notes?: KitchenNote[];
+  // Present when the briefing was completed without some agents (see data/scripts/agents/sla.py)
+  degraded?: {
+    missing_stages: string[];
+    coordinator_fallback: boolean;
+  };
 }
 
 export interface Reservation {